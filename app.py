@@ -4,20 +4,48 @@ import warnings
 # multiprocessing 관련 경고 숨기기
 warnings.filterwarnings("ignore", category=UserWarning, module="multiprocessing.resource_tracker")
 
-from fastapi import FastAPI, HTTPException, Request, Path, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Path, Query
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Dict, Optional, Any, Union
 import os
+import json
 from dotenv import load_dotenv
-from starlette.responses import JSONResponse
+import time
+import asyncio
+from starlette.responses import JSONResponse, StreamingResponse, PlainTextResponse
 
 # .env 파일 로드 (import 전에 먼저 실행)
 load_dotenv()
 
-from services.recommender import recommend, recommend_with_both_data
+from services.recommender import (
+    recommend, recommend_with_both_data, recommend_batch, recommend_with_both_data_batch,
+    rank_for_survey, rank_with_both_data, stream_survey_text, stream_combined_text,
+    generate_survey_text, generate_combined_text, build_result
+)
 from services.data_fetcher import data_fetcher
+from services.llm_providers import close_provider
+from services.deadline import clear_deadline, start_deadline
+from services.rag_recommender import catalog_holder, pin_catalog, pinned_catalog_version, set_search_params
+from services.catalog_watcher import start_catalog_watcher
+from services.text_jobs import text_job_store
+from services.readiness import readiness
+from services.template_text import TEXT_MODES, set_text_mode
+from services.warmup import start_background_warmup
+from services.logger import get_logger
+from services.metrics import (
+    start_request_timings, format_server_timing, render_prometheus,
+    HTTP_REQUEST_DURATION, HTTP_ERRORS
+)
+
 
 
+logger = get_logger("app")
+
+# 배치 요청 한 번에 받을 수 있는 최대 사용자 수
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "256"))
+
+# 관리자 엔드포인트(/admin/...) 키 (설정하면 X-Admin-Key 헤더가 같아야 호출 가능)
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
 
 # 응답 모델 정의
 class SoundRecommendation(BaseModel):
@@ -29,6 +57,23 @@ class RecommendResponse(BaseModel):
     date: str = Field(..., description="요청 날짜")
     recommendation_text: str = Field(..., description="개인화된 추천 설명 텍스트")
     recommended_sounds: List[SoundRecommendation] = Field(..., description="추천된 사운드 목록")
+    text_job_id: Optional[str] = Field(None, description="async_text=true로 요청한 경우 추천 멘트 생성 작업 ID (GET /recommend/text/{job_id}로 조회)")
+    text_source: Optional[str] = Field(None, description="추천 멘트를 만든 경로 (llm / llm_hedge / cache / template / fallback / deadline_fallback, async_text=true면 null)")
+    catalog_version: Optional[str] = Field(None, description="검색에 사용한 사운드 카탈로그(인덱스 + 사운드 데이터) 버전")
+
+class TextJobResponse(BaseModel):
+    job_id: str = Field(..., description="추천 멘트 생성 작업 ID")
+    status: str = Field(..., description="작업 상태 (pending / done / failed)")
+    recommendation_text: Optional[str] = Field(None, description="완료된 경우 개인화된 추천 설명 텍스트")
+    text_source: Optional[str] = Field(None, description="완료된 경우 추천 멘트를 만든 경로 (llm / llm_hedge / cache / template / fallback)")
+    error: Optional[str] = Field(None, description="실패한 경우 오류 내용")
+
+class CatalogReloadResponse(BaseModel):
+    swapped: bool = Field(..., description="새 스냅샷으로 교체했는지 (파일이 바뀌지 않았으면 false)")
+    previous_version: Optional[str] = Field(None, description="교체 전 카탈로그 버전")
+    version: str = Field(..., description="현재 카탈로그 버전")
+    index_type: str = Field(..., description="인덱스 종류 (flat / ivf_flat / ivf_pq / hnsw)")
+    sounds: int = Field(..., description="카탈로그 사운드 수")
 
 # FastAPI 애플리케이션 생성
 app = FastAPI(
@@ -36,6 +81,20 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 앱 시작 시 모델 / 인덱스 로드와 워밍업을 백그라운드에서 진행 (/ready로 상태 확인)
+@app.on_event("startup")
+async def start_warmup():
+    start_background_warmup()
+    # 카탈로그 파일 감시 (CATALOG_WATCH_INTERVAL > 0인 경우)
+    app.state.catalog_watcher = start_catalog_watcher()
+
+# 앱 종료 시 LLM 커넥션 풀 정리
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    await close_provider()
+    if getattr(app.state, "catalog_watcher", None) is not None:
+        app.state.catalog_watcher.set()
+
 # 에러 로깅 미들웨어
 @app.middleware("http")
 async def log_errors(request: Request, call_next):
@@ -44,41 +103,69 @@ async def log_errors(request: Request, call_next):
         return response
     except HTTPException as e:
         # HTTPException의 경우 상세 정보 로깅
-        print(f"❌ HTTP Error {e.status_code}: {e.detail}")
-        print(f"   URL: {request.url}")
-        print(f"   Method: {request.method}")
-        if request.method == "POST":
-            try:
-                body = await request.body()
-                print(f"   Request Body: {body.decode()}")
-            except:
-                print("   Request Body: Could not read")
+        logger.error("HTTP error", extra={
+            "status_code": e.status_code,
+            "detail": e.detail,
+            "url": str(request.url),
+            "method": request.method,
+            "request_body": await read_body_for_log(request)
+        })
         raise e
     except Exception as e:
         # 기타 예외의 경우
-        print(f"❌ Unexpected Error: {str(e)}")
-        print(f"   URL: {request.url}")
-        print(f"   Method: {request.method}")
+        logger.exception("Unexpected error", extra={"url": str(request.url), "method": request.method})
         raise e
 
+# 요청 지연 시간 측정 + Server-Timing 헤더 미들웨어
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        HTTP_ERRORS.inc(method=request.method, route=route_label(request))
+        raise
+    
+    route = route_label(request)
+    HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, route=route, status=response.status_code)
+    if response.status_code >= 500:
+        HTTP_ERRORS.inc(method=request.method, route=route)
+    
+    # 스트리밍 응답은 헤더가 먼저 나가므로 순위 결정 단계까지만 포함됨
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
+# 지표 라벨용 경로 (경로 파라미터가 들어간 실제 URL 대신 라우트 템플릿 사용)
+def route_label(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
 # Pydantic 검증 에러 핸들러
 @app.exception_handler(422)
 async def validation_exception_handler(request: Request, exc):
-    print(f"❌ Validation Error (422):")
-    print(f"   URL: {request.url}")
-    print(f"   Method: {request.method}")
-    if request.method == "POST":
-        try:
-            body = await request.body()
-            print(f"   Request Body: {body.decode()}")
-        except:
-            print("   Request Body: Could not read")
-    print(f"   Validation Details: {exc.detail}")
+    logger.warning("Validation error (422)", extra={
+        "url": str(request.url),
+        "method": request.method,
+        "request_body": await read_body_for_log(request),
+        "detail": exc.detail
+    })
     return JSONResponse(
         status_code=422,
         content={"detail": exc.detail}
     )
 
+# 에러 로그용 요청 본문 (POST만)
+async def read_body_for_log(request: Request) -> Optional[str]:
+    if request.method != "POST":
+        return None
+    try:
+        body = await request.body()
+        return body.decode()
+    except Exception:
+        return "Could not read"
+
 # 설문 데이터 스키마
 class SurveyData(BaseModel):
     sleepLightUsage: str = Field(..., description="수면 조명 사용 여부")
@@ -447,24 +534,19 @@ class CombinedDataExistingDto(BaseModel):
     sleepData: SleepData
     sounds: Optional[SoundsData] = Field(None, description="선호 사운드 및 이전 추천 결과 (선택사항)")
 
-# API 엔드포인트 정의
-@app.post(
-    "/recommend", 
-    tags=["추천 서비스"],
-    summary="설문 기반 수면 사운드 추천 (설문조사 데이터만)",
-    description="사용자의 설문조사 데이터만을 전송받아 수면 사운드를 추천합니다. 사용 시나리오: 클라이언트가 설문조사 데이터만 가지고 있는 경우 (첫 사용자). 입력 데이터: 수면 선호도, 스트레스 레벨, 수면 목표 등 설문조사 결과. 추천 방식: RAG(Retrieval-Augmented Generation) 기반 유사도 검색 + LLM 개인화 텍스트 생성",
-    response_model=RecommendResponse
-)
-def get_recommendation(request: UserSurveyDto) -> Dict:
-    """
-    설문조사 데이터를 기반으로 수면 사운드를 추천합니다.
-    
-    Args:
-        request: 사용자 설문조사 데이터
-        
-    Returns:
-        사용자 ID와 함께 개인화된 추천 텍스트와 추천 사운드 목록
-    """
+# 배치 추천 입력 스키마
+class BatchUserSurveyDto(BaseModel):
+    requests: List[UserSurveyDto] = Field(..., min_length=1, max_length=BATCH_MAX_SIZE, description="사용자별 설문 기반 추천 요청 목록")
+
+class BatchCombinedDataDto(BaseModel):
+    requests: List[CombinedDataExistingDto] = Field(..., min_length=1, max_length=BATCH_MAX_SIZE, description="사용자별 통합 추천 요청 목록 (sounds가 없으면 신규 사용자로 처리)")
+
+# 배치 응답 한 줄 (NDJSON)
+class BatchRecommendItem(RecommendResponse):
+    index: int = Field(..., description="요청 목록에서의 위치")
+
+# 요청 DTO를 추천 로직이 사용하는 평탄한 dict로 변환
+def flatten_survey_request(request: UserSurveyDto) -> Dict:
     user_input = request.dict()
     
     # survey 데이터를 최상위로 평탄화
@@ -481,22 +563,114 @@ def get_recommendation(request: UserSurveyDto) -> Dict:
                 user_input[key] = value
         del user_input["sounds"]
     
-    result = recommend(user_input)
+    return user_input
+
+def flatten_combined_request(request: Union[CombinedDataNewDto, CombinedDataExistingDto]) -> Dict:
+    user_input = request.dict()
+    
+    # survey, sleepData를 최상위로 평탄화
+    survey_data = user_input.get("survey", {})
+    sleep_data = user_input.get("sleepData", {})
+    sounds_data = user_input.get("sounds", {})
+    user_input.update(survey_data)
+    user_input.update(sleep_data)
+    
+    # sounds 데이터가 있으면 빈 배열인 필드들은 제거하고 추가
+    if sounds_data:
+        for key, value in sounds_data.items():
+            if value is not None and len(value) > 0:
+                user_input[key] = value
+    
+    del user_input["survey"]
+    del user_input["sleepData"]
+    user_input.pop("sounds", None)
+    
+    return user_input
+
+# previousRecommendations가 없으면 신규 사용자 로직 사용
+def is_new_user(user_input: Dict) -> bool:
+    return not (user_input.get("previousRecommendations") and len(user_input.get("previousRecommendations", [])) > 0)
+
+def build_response(user_input: Dict, result: Dict, text_job_id: Optional[str] = None) -> Dict:
     return {
         "userID": user_input.get("userID", "unknown"),
         "date": user_input.get("date", ""),
         "recommendation_text": result["recommendation_text"],
-        "recommended_sounds": result["recommended_sounds"]
+        "recommended_sounds": result["recommended_sounds"],
+        "text_job_id": text_job_id,
+        "text_source": result.get("text_source"),
+        "catalog_version": pinned_catalog_version()
     }
 
+ASYNC_TEXT_QUERY_DESCRIPTION = "true이면 추천 사운드 순위만 즉시 반환하고, 추천 멘트는 백그라운드에서 생성합니다. 응답의 text_job_id로 GET /recommend/text/{job_id}를 조회하세요. (이때 recommendation_text는 빈 문자열)"
+DEADLINE_QUERY_DESCRIPTION = "요청 처리 예산(ms). 번역 / LLM 멘트가 예산 안에 끝나지 않으면 건너뛰거나 기본 멘트로 대체하고 사운드 목록을 먼저 응답합니다. (생략 시 RECOMMEND_DEADLINE_MS, async_text=true면 순위 결정 단계에만 적용)"
+
+# 추천 요청의 검색 범위 설정
+# - 요청이 처음 사용하는 카탈로그 스냅샷을 고정 (처리 중에 카탈로그가 교체되어도 같은 버전 사용)
+# - 대규모 카탈로그용 근사 검색 인덱스(ivf_flat / ivf_pq / hnsw)의 요청별 검색 파라미터 (flat 인덱스에서는 무시)
+async def retrieval_scope(
+    nprobe: Optional[int] = Query(None, ge=1, description="IVF 인덱스에서 검색할 클러스터 수 (생략 시 FAISS_NPROBE, 클수록 정확하고 느림)"),
+    ef_search: Optional[int] = Query(None, ge=1, description="HNSW 인덱스의 검색 후보 수 efSearch (생략 시 FAISS_EF_SEARCH, 클수록 정확하고 느림)")
+):
+    pin_catalog()
+    set_search_params(nprobe, ef_search)
+
+# 추천 멘트 생성 방식 (생략 시 TEXT_MODE)
+# - template이면 LLM을 호출하지 않고 설문 / 수면 평가 / 사운드 설명으로 만든 템플릿 멘트 사용 (text_source="template")
+async def text_scope(
+    text_mode: Optional[str] = Query(None, pattern=f"^({'|'.join(TEXT_MODES)})$", description="추천 멘트 생성 방식: llm(LLM 생성) / template(LLM 없이 템플릿 멘트, 1ms 미만) / auto(LLM 동시 호출이 포화되거나 서킷 브레이커가 열리면 템플릿). 생략 시 TEXT_MODE")
+):
+    set_text_mode(text_mode)
+
+# API 엔드포인트 정의
+@app.post(
+    "/recommend", 
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="설문 기반 수면 사운드 추천 (설문조사 데이터만)",
+    description="사용자의 설문조사 데이터만을 전송받아 수면 사운드를 추천합니다. 사용 시나리오: 클라이언트가 설문조사 데이터만 가지고 있는 경우 (첫 사용자). 입력 데이터: 수면 선호도, 스트레스 레벨, 수면 목표 등 설문조사 결과. 추천 방식: RAG(Retrieval-Augmented Generation) 기반 유사도 검색 + LLM 개인화 텍스트 생성",
+    response_model=RecommendResponse
+)
+async def get_recommendation(
+    request: UserSurveyDto,
+    async_text: bool = Query(False, description=ASYNC_TEXT_QUERY_DESCRIPTION),
+    deadline_ms: Optional[int] = Query(None, ge=1, description=DEADLINE_QUERY_DESCRIPTION)
+) -> Dict:
+    """
+    설문조사 데이터를 기반으로 수면 사운드를 추천합니다.
+    
+    Args:
+        request: 사용자 설문조사 데이터
+        
+    Returns:
+        사용자 ID와 함께 개인화된 추천 텍스트와 추천 사운드 목록
+    """
+    user_input = flatten_survey_request(request)
+    start_deadline(deadline_ms)
+    
+    if async_text:
+        # 순위만 먼저 반환하고 멘트는 백그라운드 작업으로 생성 (요청 예산과 무관하게 끝까지 생성)
+        prompt_for_rag, ranked_sounds = await rank_for_survey(user_input)
+        clear_deadline()
+        job_id = text_job_store.submit(generate_survey_text(user_input, prompt_for_rag, ranked_sounds))
+        return build_response(user_input, build_result("", ranked_sounds), text_job_id=job_id)
+    
+    result = await recommend(user_input)
+    return build_response(user_input, result)
+
 @app.post(
     "/recommend/combined/new", 
     tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
     summary="수면 데이터 + 설문 데이터 기반 통합 추천 (기존 추천결과 없음)",
     description="수면 데이터와 설문 데이터를 모두 전송받아 첫 번째 추천을 제공합니다. 사용 시나리오: 클라이언트가 수면 데이터와 설문 데이터를 모두 가지고 있지만, 기존 추천 결과가 없는 경우. 입력 데이터: 수면 패턴 정보 + 설문조사 결과 (previousRecommendations 필드 제외). 추천 방식: 수면 데이터 분석 + 설문 선호도 반영 + 신규 추천 알고리즘",
     response_model=RecommendResponse
 )
-def get_new_combined_recommendation(request: CombinedDataNewDto) -> Dict:
+async def get_new_combined_recommendation(
+    request: CombinedDataNewDto,
+    async_text: bool = Query(False, description=ASYNC_TEXT_QUERY_DESCRIPTION),
+    deadline_ms: Optional[int] = Query(None, ge=1, description=DEADLINE_QUERY_DESCRIPTION)
+) -> Dict:
     """
     수면 데이터와 설문 데이터를 활용하여 첫 번째 추천을 제공합니다.
     기존 추천 결과가 없는 경우를 위한 엔드포인트입니다.
@@ -507,34 +681,30 @@ def get_new_combined_recommendation(request: CombinedDataNewDto) -> Dict:
     Returns:
         사용자 ID와 함께 신규 추천 알고리즘 기반 추천 텍스트와 추천 사운드 목록
     """
-    user_input = request.dict()
-    
-    # survey, sleepData를 최상위로 평탄화
-    survey_data = user_input.get("survey", {})
-    sleep_data = user_input.get("sleepData", {})
-    user_input.update(survey_data)
-    user_input.update(sleep_data)
-    del user_input["survey"]
-    del user_input["sleepData"]
+    user_input = flatten_combined_request(request)
+    start_deadline(deadline_ms)
     
     # 신규 사용자로 처리 (previousRecommendations가 없으므로)
-    result = recommend_with_both_data(user_input, is_new_user=True)
+    if async_text:
+        return await combined_with_text_job(user_input, is_new_user=True)
     
-    return {
-        "userID": user_input.get("userID", "unknown"),
-        "date": user_input.get("date", ""),
-        "recommendation_text": result["recommendation_text"],
-        "recommended_sounds": result["recommended_sounds"]
-    }
+    result = await recommend_with_both_data(user_input, is_new_user=True)
+    
+    return build_response(user_input, result)
 
 @app.post(
     "/recommend/combined", 
     tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
     summary="수면 데이터 + 설문 데이터 + 기존 추천결과 기반 통합 추천",
     description="수면 데이터, 설문 데이터, 기존 추천 결과를 모두 전송받아 추천을 업데이트합니다. 사용 시나리오: 클라이언트가 수면 데이터, 설문 데이터, 기존 추천 결과를 모두 가지고 있는 경우. 입력 데이터: 수면 패턴 정보 + 설문조사 결과 + 기존 추천 결과 (previousRecommendations 필드 필수). 추천 방식: 수면 데이터 분석 + 설문 선호도 반영 + 기존 추천 결과 학습 + 개선된 추천 알고리즘",
     response_model=RecommendResponse
 )
-def get_combined_recommendation(request: CombinedDataExistingDto) -> Dict:
+async def get_combined_recommendation(
+    request: CombinedDataExistingDto,
+    async_text: bool = Query(False, description=ASYNC_TEXT_QUERY_DESCRIPTION),
+    deadline_ms: Optional[int] = Query(None, ge=1, description=DEADLINE_QUERY_DESCRIPTION)
+) -> Dict:
     """
     수면 데이터, 설문 데이터, 기존 추천 결과를 모두 활용하여 추천을 업데이트합니다.
     기존 추천 결과가 있는 경우를 위한 엔드포인트입니다.
@@ -545,39 +715,245 @@ def get_combined_recommendation(request: CombinedDataExistingDto) -> Dict:
     Returns:
         사용자 ID와 함께 기존 추천 결과를 학습한 개선된 추천 텍스트와 추천 사운드 목록
     """
-    user_input = request.dict()
+    user_input = flatten_combined_request(request)
+    start_deadline(deadline_ms)
     
-    # survey, sleepData, sounds를 최상위로 평탄화
-    survey_data = user_input.get("survey", {})
-    sleep_data = user_input.get("sleepData", {})
-    sounds_data = user_input.get("sounds", {})
-    user_input.update(survey_data)
-    user_input.update(sleep_data)
+    # previousRecommendations가 있는지 확인 (없으면 신규 로직 사용)
+    if async_text:
+        return await combined_with_text_job(user_input, is_new_user=is_new_user(user_input))
     
-    # sounds 데이터가 있으면 빈 배열인 필드들은 제거하고 추가
-    if sounds_data:
-        for key, value in sounds_data.items():
-            if value is not None and len(value) > 0:
-                user_input[key] = value
+    result = await recommend_with_both_data(user_input, is_new_user=is_new_user(user_input))
     
-    del user_input["survey"]
-    del user_input["sleepData"]
-    del user_input["sounds"]
+    return build_response(user_input, result)
+
+# 통합 추천의 순위만 먼저 반환하고 멘트는 백그라운드 작업으로 생성
+async def combined_with_text_job(user_input: Dict, is_new_user: bool) -> Dict:
+    prompt_for_rag, ranked_sounds = await rank_with_both_data(user_input, is_new_user=is_new_user)
+    clear_deadline()
+    job_id = text_job_store.submit(generate_combined_text(user_input, prompt_for_rag, ranked_sounds, is_new_user))
+    return build_response(user_input, build_result("", ranked_sounds), text_job_id=job_id)
+
+@app.get(
+    "/recommend/text/{job_id}",
+    tags=["추천 서비스"],
+    summary="백그라운드 추천 멘트 조회",
+    description="async_text=true로 요청한 추천의 멘트 생성 결과를 조회합니다. status가 pending이면 아직 생성 중이며, done이면 recommendation_text가 채워집니다. 완료 후 일정 시간(TEXT_JOB_TTL_SECONDS)이 지난 작업은 404를 반환합니다.",
+    response_model=TextJobResponse
+)
+async def get_recommendation_text_job(job_id: str = Path(..., description="추천 응답의 text_job_id")) -> Dict:
+    """
+    백그라운드 추천 멘트 생성 작업의 상태와 결과를 반환합니다.
+    """
+    job = text_job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="존재하지 않거나 만료된 작업입니다.")
+    return job
+
+@app.post(
+    "/recommend/batch",
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="설문 기반 배치 추천 (여러 사용자)",
+    description="여러 사용자의 설문조사 데이터를 한 번에 전송받아 추천합니다. 사용 시나리오: 메인 서버가 야간 수면 데이터 동기화 이후 여러 사용자의 추천을 한꺼번에 요청하는 경우. 임베딩은 한 번의 배치 연산, 검색은 한 번의 행렬 검색으로 처리하며, 결과는 사용자별 추천 멘트가 완성되는 순서대로 NDJSON(한 줄에 한 사용자)으로 스트리밍됩니다. 각 줄의 index는 요청 목록에서의 위치이며, 실패한 사용자는 error 필드가 담긴 줄로 내려갑니다.",
+    response_class=StreamingResponse
+)
+async def get_batch_recommendation(request: BatchUserSurveyDto) -> StreamingResponse:
+    """
+    여러 사용자의 설문조사 데이터를 기반으로 추천하고 NDJSON으로 스트리밍합니다.
+    """
+    user_inputs = [flatten_survey_request(r) for r in request.requests]
     
-    # previousRecommendations가 있는지 확인
-    if user_input.get("previousRecommendations") and len(user_input.get("previousRecommendations", [])) > 0:
-        result = recommend_with_both_data(user_input, is_new_user=False)
+    async def ndjson_lines():
+        async for index, result in recommend_batch(user_inputs):
+            yield batch_line(index, user_inputs[index], result)
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.post(
+    "/recommend/combined/batch",
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="수면 데이터 + 설문 데이터 기반 배치 통합 추천 (여러 사용자)",
+    description="여러 사용자의 수면 데이터와 설문 데이터(선택적으로 기존 추천 결과)를 한 번에 전송받아 추천합니다. 사용자별로 previousRecommendations가 있으면 기존 사용자 로직, 없으면 신규 사용자 로직을 사용합니다. 결과는 NDJSON(한 줄에 한 사용자)으로 완성되는 순서대로 스트리밍되며, 실패한 사용자는 error 필드가 담긴 줄로 내려갑니다.",
+    response_class=StreamingResponse
+)
+async def get_batch_combined_recommendation(request: BatchCombinedDataDto) -> StreamingResponse:
+    """
+    여러 사용자의 통합 데이터를 기반으로 추천하고 NDJSON으로 스트리밍합니다.
+    """
+    user_inputs = [flatten_combined_request(r) for r in request.requests]
+    new_user_flags = [is_new_user(u) for u in user_inputs]
+    
+    async def ndjson_lines():
+        async for index, result in recommend_with_both_data_batch(user_inputs, new_user_flags):
+            yield batch_line(index, user_inputs[index], result)
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+# 배치 결과 한 건을 NDJSON 한 줄로 직렬화 (실패 시 error 필드)
+def batch_line(index: int, user_input: Dict, result: Union[Dict, Exception]) -> str:
+    if isinstance(result, Exception):
+        logger.error("Batch item failed", extra={"index": index, "error": str(result)})
+        line = json.dumps({
+            "index": index,
+            "userID": user_input.get("userID", "unknown"),
+            "error": str(result)
+        }, ensure_ascii=False)
     else:
-        # 만약 previousRecommendations가 없으면 신규 로직 사용
-        result = recommend_with_both_data(user_input, is_new_user=True)
+        line = BatchRecommendItem(index=index, **build_response(user_input, result)).model_dump_json()
+    return line + "\n"
+
+# SSE 이벤트 한 건 직렬화
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 순위 목록을 먼저 보내고, 추천 멘트를 조각 단위로 이어서 보내는 SSE 응답
+def sse_recommendation(user_input: Dict, ranked_sounds: List[Dict], text_chunks) -> StreamingResponse:
+    async def events():
+        # 1. 순위 결정 결과 (플레이어가 바로 재생을 시작할 수 있도록 먼저 전송)
+        yield sse_event("sounds", {
+            "userID": user_input.get("userID", "unknown"),
+            "date": user_input.get("date", ""),
+            "recommended_sounds": [SoundRecommendation(**s).model_dump() for s in ranked_sounds],
+            "catalog_version": pinned_catalog_version()
+        })
+        
+        # 2. 추천 멘트 조각
+        full_text = []
+        try:
+            async for chunk in text_chunks:
+                full_text.append(chunk)
+                yield sse_event("text", {"delta": chunk})
+        except Exception as e:
+            logger.error("Streaming error", extra={"error": str(e)})
+            yield sse_event("error", {"detail": str(e)})
+            return
+        
+        # 3. 완료 (전체 멘트 포함)
+        yield sse_event("done", {"recommendation_text": "".join(full_text)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+SSE_DESCRIPTION = " 응답은 Server-Sent Events(text/event-stream)로 전송됩니다: 먼저 'sounds' 이벤트로 추천 사운드 순위를 보내고, 이어서 'text' 이벤트({\"delta\": ...})로 추천 멘트를 생성되는 대로 조각 단위로 보낸 뒤, 마지막에 'done' 이벤트({\"recommendation_text\": 전체 멘트})로 끝납니다. 멘트 생성 중 오류가 나면 'error' 이벤트가 전송됩니다."
+
+@app.post(
+    "/recommend/stream",
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="설문 기반 수면 사운드 추천 (SSE 스트리밍)",
+    description="/recommend의 스트리밍 버전입니다." + SSE_DESCRIPTION,
+    response_class=StreamingResponse
+)
+async def get_recommendation_stream(request: UserSurveyDto) -> StreamingResponse:
+    """
+    설문조사 데이터를 기반으로 추천하고, 순위와 추천 멘트를 SSE로 스트리밍합니다.
+    """
+    user_input = flatten_survey_request(request)
+    
+    prompt_for_rag, ranked_sounds = await rank_for_survey(user_input)
+    return sse_recommendation(
+        user_input, ranked_sounds,
+        stream_survey_text(user_input, prompt_for_rag, ranked_sounds)
+    )
+
+@app.post(
+    "/recommend/combined/new/stream",
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="수면 데이터 + 설문 데이터 기반 통합 추천 (기존 추천결과 없음, SSE 스트리밍)",
+    description="/recommend/combined/new의 스트리밍 버전입니다." + SSE_DESCRIPTION,
+    response_class=StreamingResponse
+)
+async def get_new_combined_recommendation_stream(request: CombinedDataNewDto) -> StreamingResponse:
+    """
+    수면 데이터와 설문 데이터로 첫 번째 추천을 제공하고 SSE로 스트리밍합니다.
+    """
+    user_input = flatten_combined_request(request)
+    
+    prompt_for_rag, ranked_sounds = await rank_with_both_data(user_input, is_new_user=True)
+    return sse_recommendation(
+        user_input, ranked_sounds,
+        stream_combined_text(user_input, prompt_for_rag, ranked_sounds, is_new_user=True)
+    )
+
+@app.post(
+    "/recommend/combined/stream",
+    tags=["추천 서비스"],
+    dependencies=[Depends(retrieval_scope), Depends(text_scope)],
+    summary="수면 데이터 + 설문 데이터 + 기존 추천결과 기반 통합 추천 (SSE 스트리밍)",
+    description="/recommend/combined의 스트리밍 버전입니다." + SSE_DESCRIPTION,
+    response_class=StreamingResponse
+)
+async def get_combined_recommendation_stream(request: CombinedDataExistingDto) -> StreamingResponse:
+    """
+    수면 데이터, 설문 데이터, 기존 추천 결과로 추천을 업데이트하고 SSE로 스트리밍합니다.
+    """
+    user_input = flatten_combined_request(request)
+    new_user = is_new_user(user_input)
     
+    prompt_for_rag, ranked_sounds = await rank_with_both_data(user_input, is_new_user=new_user)
+    return sse_recommendation(
+        user_input, ranked_sounds,
+        stream_combined_text(user_input, prompt_for_rag, ranked_sounds, is_new_user=new_user)
+    )
+
+# 카탈로그 다시 읽기 (인덱스 / 사운드 데이터 파일을 교체한 뒤 호출, 서버 재시작 불필요)
+@app.post(
+    "/admin/catalog/reload",
+    tags=["시스템"],
+    summary="사운드 카탈로그 다시 읽기",
+    description="FAISS 인덱스와 사운드 데이터 파일을 다시 읽어 새 카탈로그 스냅샷으로 교체합니다. 새 스냅샷을 모두 만든 뒤 교체하므로 처리 중인 요청은 이전 버전으로 끝까지 응답합니다. 파일이 바뀌지 않았으면 force=true가 아닌 한 다시 읽지 않습니다. 읽기에 실패하면 기존 카탈로그를 유지하고 500을 반환합니다. ADMIN_API_KEY가 설정되어 있으면 X-Admin-Key 헤더가 필요합니다.",
+    response_model=CatalogReloadResponse
+)
+async def reload_catalog(
+    force: bool = Query(False, description="파일이 바뀌지 않았어도 다시 읽기"),
+    x_admin_key: Optional[str] = Header(None, description="ADMIN_API_KEY와 같은 값")
+) -> Dict:
+    if ADMIN_API_KEY and x_admin_key != ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="관리자 키가 올바르지 않습니다.")
+    previous_version = catalog_holder.loaded_version
+    try:
+        # 큰 인덱스를 읽는 동안 CPU 스레드풀(검색 / 임베딩)을 막지 않도록 기본 스레드풀에서 실행
+        engine, swapped = await asyncio.to_thread(catalog_holder.reload, force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"카탈로그를 다시 읽지 못했습니다: {e}")
     return {
-        "userID": user_input.get("userID", "unknown"),
-        "date": user_input.get("date", ""),
-        "recommendation_text": result["recommendation_text"],
-        "recommended_sounds": result["recommended_sounds"]
+        "swapped": swapped,
+        "previous_version": previous_version,
+        "version": engine.version,
+        "index_type": engine.index_type,
+        "sounds": len(engine)
     }
 
+# 지표 엔드포인트 (Prometheus 스크랩용)
+@app.get(
+    "/metrics",
+    tags=["시스템"],
+    summary="Prometheus 지표",
+    description="단계별 지연 시간 히스토그램(translate, prompt, embed, search, score, llm), 단계별 오류 수, LLM fallback 수, 라우트별 HTTP 지연 시간을 Prometheus 텍스트 형식으로 반환합니다.",
+    response_class=PlainTextResponse
+)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 준비 상태 확인 엔드포인트 (readiness probe용)
+@app.get(
+    "/ready",
+    tags=["시스템"],
+    summary="서버 준비 상태 확인",
+    description="임베딩 모델, FAISS 인덱스, LLM 자격 증명, 워밍업 추론의 컴포넌트별 준비 상태와 로드 소요 시간(초)을 반환합니다. 모두 준비되면 200, 아니면 503을 반환합니다. 단순 생존 확인은 / 를 사용하세요."
+)
+def get_readiness() -> JSONResponse:
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "components": readiness.snapshot()}
+    )
+
 # 루트 엔드포인트 (상태 확인용)
 @app.get(
     "/", 
@@ -0,0 +1,114 @@
+# fakes.py
+# 벤치마크용 오프라인 대체 구현 (모델 / Bedrock 없이 실행)
+# - FakeEmbeddingBackend: 문장 해시로 시드를 정한 결정적 384차원 단위 벡터 (같은 문장 → 같은 벡터)
+# - StubBedrockClient: LLM 백엔드와 같은 invoke / invoke_stream 인터페이스로 고정 응답을 즉시 돌려줌
+#   (동시 호출 상한 / 서킷 브레이커를 거치지 않아 파이프라인 자체의 비용만 측정)
+# - install_fakes() / install_local_llm(): 전역 임베딩 백엔드와 LLM 백엔드(services/llm_providers.py)를 교체
+#   부하 테스트는 실제 LLM 백엔드처럼 동작하는 local 백엔드(LocalLLMBackend)를 사용
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from services import embedding_backends, llm_providers
+from services.embedding_backends import EMBEDDING_DIM
+from services.llm_providers import LocalLLMBackend
+
+# 스텁 추천 멘트 (스트리밍 시 STREAM_CHUNK_CHARS 글자씩 나눠 보냄)
+STUB_RECOMMENDATION_TEXT = (
+    "오늘 하루도 고생 많으셨어요. 잔잔한 빗소리와 부드러운 파도 소리가 "
+    "지친 마음을 천천히 감싸 안아줄 거예요. 편안한 밤 보내세요."
+)
+STREAM_CHUNK_CHARS = 16
+
+
+class FakeEmbeddingBackend:
+    """모델 없이 문장마다 결정적인 단위 벡터를 만드는 임베딩 백엔드 (embedding_backends의 백엔드 인터페이스)"""
+
+    name = "fake"
+    fingerprint = "fake:sha256-normal"
+
+    def __init__(self, delay_ms: float = 0.0):
+        # 모델 추론 시간을 흉내 낼 때 문장 배치당 대기 시간 (ms)
+        self.delay_ms = delay_ms
+
+    def load(self):
+        pass
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if self.delay_ms > 0:
+            time.sleep(self.delay_ms / 1000)
+        vectors = np.empty((len(texts), EMBEDDING_DIM), dtype="float32")
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM)
+            vectors[row] = vector / np.linalg.norm(vector)
+        return vectors
+
+
+class StubBedrockClient:
+    """
+    고정 응답을 돌려주는 Bedrock 클라이언트.
+    번역 요청(max_tokens가 작은 요청)에는 영어 문구를, 그 외에는 STUB_RECOMMENDATION_TEXT를 돌려줍니다.
+    """
+
+    name = "stub"
+    fingerprint = "stub"
+
+    def __init__(self, delay_ms: float = 0.0):
+        # 호출당 응답 대기 시간 (ms, 0이어도 이벤트 루프에 한 번 양보)
+        self.delay_ms = delay_ms
+        self.calls = 0
+
+    def load(self):
+        # 자격 증명 등 준비할 것이 없음 (워밍업의 llm_credentials 단계가 바로 준비 완료)
+        pass
+
+    def utilization(self) -> float:
+        return 0.0
+
+    def circuit_open(self) -> bool:
+        return False
+
+    async def invoke(self, body: str, read_timeout: Optional[float] = None) -> Dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay_ms / 1000)
+        return {"content": [{"type": "text", "text": _stub_text(body)}]}
+
+    async def invoke_stream(self, body: str) -> AsyncIterator[Dict]:
+        self.calls += 1
+        await asyncio.sleep(self.delay_ms / 1000)
+        text = _stub_text(body)
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            yield {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text[start:start + STREAM_CHUNK_CHARS]}}
+
+    async def close(self):
+        pass
+
+
+def _is_translation(body: str) -> bool:
+    # translate_korean_to_english는 max_tokens=64로 요청
+    return json.loads(body).get("max_tokens", 0) <= 64
+
+
+def _stub_text(body: str) -> str:
+    return "calm ambient sounds" if _is_translation(body) else STUB_RECOMMENDATION_TEXT
+
+
+def install_fakes(embed_delay_ms: float = 0.0, llm_delay_ms: float = 0.0) -> StubBedrockClient:
+    """전역 임베딩 백엔드와 Bedrock 클라이언트를 대체 구현으로 바꾸고 스텁 클라이언트를 반환합니다."""
+    embedding_backends._backend = FakeEmbeddingBackend(embed_delay_ms)
+    stub = StubBedrockClient(llm_delay_ms)
+    llm_providers._provider = stub
+    return stub
+
+
+def install_local_llm(**settings) -> LocalLLMBackend:
+    """LLM 백엔드를 settings(LocalLLMBackend 인자)로 만든 local 백엔드로 바꾸고 반환합니다."""
+    backend = LocalLLMBackend(**settings)
+    llm_providers._provider = backend
+    return backend
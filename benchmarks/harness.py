@@ -0,0 +1,201 @@
+# harness.py
+# 단계별 마이크로 벤치마크 측정 / 저장 / 비교
+# - 지연 시간: 워밍업 후 호출마다 perf_counter로 측정 → p50 / p90 / p99 / 평균 / 최소 / 최대 (µs)
+# - 할당: 별도 반복에서 tracemalloc으로 호출당 최대 추가 메모리(peak)와 남은 메모리(retained)를 측정
+#   (tracemalloc은 호출을 느리게 하므로 지연 시간 측정과 따로 실행)
+# - 결과는 JSON으로 저장하고, 저장된 기준(baseline)과 비교해 회귀를 표시
+
+import gc
+import inspect
+import json
+import os
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class Case:
+    """
+    벤치마크 단계 하나.
+    args(i): i번째 호출의 인자 (측정 시간에 포함되지 않음)
+    func(*args): 측정할 호출 (코루틴 함수도 가능)
+    """
+    name: str
+    func: Callable
+    args: Callable[[int], Tuple]
+    description: str = ""
+
+
+async def measure(case: Case, iterations: int, warmup: int, alloc_iterations: int) -> Dict[str, Any]:
+    """case를 warmup번 실행한 뒤 iterations번 시간을, alloc_iterations번 할당을 측정합니다."""
+    for i in range(warmup):
+        await _call(case, case.args(i))
+
+    # 입력을 미리 만들어 두고, GC가 측정 구간에 끼어들지 않도록 끈 채로 측정
+    inputs = [case.args(warmup + i) for i in range(iterations)]
+    latencies = np.empty(iterations, dtype=np.float64)
+    gc.collect()
+    gc.disable()
+    try:
+        for i, args in enumerate(inputs):
+            started = time.perf_counter()
+            await _call(case, args)
+            latencies[i] = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    result = {"iterations": iterations, **latency_stats(latencies * 1e6)}
+    if alloc_iterations > 0:
+        result.update(await _measure_allocations(case, warmup + iterations, alloc_iterations))
+    return result
+
+
+async def _call(case: Case, args: Tuple):
+    result = case.func(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def latency_stats(latencies_us: np.ndarray) -> Dict[str, float]:
+    p50, p90, p99 = np.percentile(latencies_us, [50, 90, 99])
+    return {
+        "p50_us": round(float(p50), 2),
+        "p90_us": round(float(p90), 2),
+        "p99_us": round(float(p99), 2),
+        "mean_us": round(float(latencies_us.mean()), 2),
+        "min_us": round(float(latencies_us.min()), 2),
+        "max_us": round(float(latencies_us.max()), 2)
+    }
+
+
+async def _measure_allocations(case: Case, offset: int, iterations: int) -> Dict[str, float]:
+    inputs = [case.args(offset + i) for i in range(iterations)]
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for args in inputs:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = await _call(case, args)
+            current, peak = tracemalloc.get_traced_memory()
+            del result
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib": round(float(np.mean(peaks)) / 1024, 2),
+        "alloc_retained_kib": round(float(np.mean(retained)) / 1024, 2)
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """결과를 비교할 때 같은 환경인지 확인하기 위한 실행 환경 정보"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def build_report(stages: Dict[str, Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "options": options,
+        "stages": stages
+    }
+
+
+def save_report(report: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_stages(stages: Dict[str, Dict[str, Any]]):
+    print(f"{'stage':<28} {'p50 µs':>10} {'p90 µs':>10} {'p99 µs':>10} {'mean µs':>10} {'peak KiB':>10} {'kept KiB':>10}")
+    for name, stats in stages.items():
+        print(
+            f"{name:<28} {stats['p50_us']:>10.1f} {stats['p90_us']:>10.1f} {stats['p99_us']:>10.1f} {stats['mean_us']:>10.1f}"
+            f" {_optional(stats.get('alloc_peak_kib')):>10} {_optional(stats.get('alloc_retained_kib')):>10}"
+        )
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.10,
+    min_delta_us: float = 5.0,
+    min_delta_kib: float = 1.0
+) -> List[Dict[str, Any]]:
+    """
+    단계별로 기준 대비 변화를 계산합니다.
+    p50 / p90 지연 시간이나 할당 peak가 threshold 비율 이상, 그리고 최소 차이 이상 늘어나면 회귀로 표시합니다.
+    (작은 단계의 측정 잡음으로 회귀가 표시되지 않도록 절대 차이 기준을 함께 사용)
+    """
+    rows = []
+    base_stages = baseline.get("stages", {})
+    for name, stats in current["stages"].items():
+        base = base_stages.get(name)
+        if base is None:
+            rows.append({"stage": name, "status": "new", "changes": {}})
+            continue
+        changes, regressed, improved = {}, False, False
+        for metric, min_delta in (("p50_us", min_delta_us), ("p90_us", min_delta_us), ("alloc_peak_kib", min_delta_kib)):
+            if base.get(metric) is None or stats.get(metric) is None:
+                continue
+            delta = stats[metric] - base[metric]
+            ratio = delta / base[metric] if base[metric] > 0 else 0.0
+            changes[metric] = (base[metric], stats[metric], ratio)
+            if abs(delta) >= min_delta and abs(ratio) >= threshold:
+                regressed |= delta > 0
+                improved |= delta < 0
+        status = "regression" if regressed else "improved" if improved else "ok"
+        rows.append({"stage": name, "status": status, "changes": changes})
+    for name in base_stages:
+        if name not in current["stages"]:
+            rows.append({"stage": name, "status": "missing", "changes": {}})
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any], current: Dict[str, Any]):
+    for section in ("environment", "options"):
+        base_section = baseline.get(section, {})
+        if base_section != current[section]:
+            print(f"Warning: baseline {section} differs, differences may not be meaningful")
+            for key, value in current[section].items():
+                if base_section.get(key) != value:
+                    print(f"  {key}: {base_section.get(key)} -> {value}")
+    print(f"{'stage':<28} {'p50 µs (base → now)':>26} {'p90 µs (base → now)':>26} {'peak KiB':>20}  status")
+    for row in rows:
+        cells = [_change_cell(row["changes"].get(metric)) for metric in ("p50_us", "p90_us")]
+        print(f"{row['stage']:<28} {cells[0]:>26} {cells[1]:>26} {_change_cell(row['changes'].get('alloc_peak_kib'), 20):>20}  "
+              f"{row['status'].upper() if row['status'] == 'regression' else row['status']}")
+
+
+def _change_cell(change: Optional[Tuple[float, float, float]], width: int = 26) -> str:
+    if change is None:
+        return "-"
+    base, now, ratio = change
+    cell = f"{base:.1f} → {now:.1f} ({ratio:+.0%})"
+    return cell if len(cell) <= width else f"{now:.1f} ({ratio:+.0%})"
+
+
+def _optional(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
@@ -0,0 +1,356 @@
+# loadgen.py
+# 추천 API 부하 테스트 (/recommend, /recommend/combined/new, /recommend/combined)
+#
+# 실행 (프로젝트 루트에서):
+#   # 앱을 같은 프로세스에서 실행 (LLM은 로컬 대체), 동시 요청 수를 늘려가며 포화 지점 확인
+#   python3 -m benchmarks.loadgen --concurrency 1 4 16 64 --duration 20 --llm-latency-ms 1500
+#   # 초당 도착률 고정(open-loop, 포아송 도착)으로 트레이스 재생
+#   python3 -m benchmarks.loadgen --rate 5 10 20 40 --trace traffic.jsonl --url http://localhost:8000
+#   # LLM 대체를 붙인 로컬 서버 (다른 터미널에서 --url로 부하)
+#   python3 -m benchmarks.loadgen --serve --port 8000 --llm-latency-ms 1500 --llm-distribution lognormal --llm-spread 0.5
+#
+# - 요청: --trace의 JSONL(benchmarks/traffic.py 형식)을 순환 재생, 없으면 설문 선택지로 합성 (--save-trace로 저장 가능)
+# - 단계(동시 요청 수 또는 도착률)마다 처리량 / p50·p95·p99 지연 시간 / 오류율 / 멘트 출처(LLM·fallback)를 보고하고,
+#   오류율·기본 멘트 비율·p99(--slo-ms)·처리량 증가율 기준으로 포화 지점을 찾음 → benchmarks/results/load.json
+# - open-loop 지연 시간은 예정된 도착 시각부터 측정 (서버가 밀려도 요청을 늦게 보내 지연을 숨기지 않음)
+# - 같은 프로세스 모드는 부하 생성기와 앱이 이벤트 루프를 나눠 쓰므로, 정확한 수치는 --serve + --url로 측정
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddingBackend, install_local_llm
+from benchmarks.harness import environment, save_report
+from benchmarks.traffic import DEFAULT_MIX, RequestSpec, load_trace, parse_mix, save_trace, synthesize
+from services import embedding_backends
+from services.llm_providers import LATENCY_DISTRIBUTIONS
+from services.rag_recommender import SOUND_POOL_PATH
+from services.template_text import TEXT_MODES
+
+DEFAULT_OUTPUT = "benchmarks/results/load.json"
+
+# 동시 요청 수 단계에서 포화로 볼 처리량 증가율 (이전 단계 대비)
+MIN_THROUGHPUT_GAIN = 0.10
+
+# 도착률 단계에서 포화로 볼 처리량 / 도착률 비율
+MIN_RATE_ACHIEVED = 0.90
+
+
+@dataclass
+class Outcome:
+    path: str
+    latency: float
+    status: str
+    text_source: Optional[str] = None
+    # 단계 시작부터 응답 완료까지 (초)
+    finished: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status.startswith("2")
+
+
+async def send(client: httpx.AsyncClient, spec: RequestSpec, timeout: float) -> Tuple[str, Optional[str]]:
+    """요청 하나를 보내고 (상태, 멘트 출처)를 반환합니다. 전송 실패는 예외 이름을 상태로 사용합니다."""
+    try:
+        response = await client.post(spec.path, json=spec.body, params=spec.params, timeout=timeout)
+    except httpx.TimeoutException:
+        return "timeout", None
+    except httpx.HTTPError as e:
+        return type(e).__name__, None
+    if response.status_code != 200:
+        return str(response.status_code), None
+    return "200", response.json().get("text_source")
+
+
+async def closed_loop(client: httpx.AsyncClient, requests: Iterator[RequestSpec], concurrency: int,
+                      duration: float, timeout: float) -> Tuple[List[Outcome], float]:
+    """concurrency개 작업자가 duration초 동안 응답을 받는 즉시 다음 요청을 보냅니다."""
+    outcomes: List[Outcome] = []
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    async def worker():
+        while time.perf_counter() < stop_at:
+            spec = next(requests)
+            sent = time.perf_counter()
+            status, text_source = await send(client, spec, timeout)
+            now = time.perf_counter()
+            outcomes.append(Outcome(spec.path, now - sent, status, text_source, now - started))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return outcomes, time.perf_counter() - started
+
+
+async def open_loop(client: httpx.AsyncClient, requests: Iterator[RequestSpec], rate: float, duration: float,
+                    timeout: float, max_in_flight: int, seed: int) -> Tuple[List[Outcome], float]:
+    """
+    초당 rate개(포아송 도착)로 duration초 동안 요청을 보냅니다. 응답을 기다리지 않고 예정된 시각에 보내며,
+    진행 중인 요청이 max_in_flight개면 보내지 않고 "dropped"로 기록합니다.
+    """
+    outcomes: List[Outcome] = []
+    rng = random.Random(seed)
+    in_flight = 0
+    tasks = []
+    started = time.perf_counter()
+
+    async def one(spec: RequestSpec, scheduled: float):
+        nonlocal in_flight
+        try:
+            status, text_source = await send(client, spec, timeout)
+        finally:
+            in_flight -= 1
+        now = time.perf_counter()
+        outcomes.append(Outcome(spec.path, now - scheduled, status, text_source, now - started))
+
+    scheduled = started
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled >= started + duration:
+            break
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        spec = next(requests)
+        if in_flight >= max_in_flight:
+            outcomes.append(Outcome(spec.path, 0.0, "dropped", finished=scheduled - started))
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(one(spec, scheduled)))
+
+    await asyncio.gather(*tasks)
+    return outcomes, time.perf_counter() - started
+
+
+def summarize(outcomes: List[Outcome], elapsed: float, window: float) -> dict:
+    """
+    단계 하나의 처리량 / 지연 시간 / 오류율 / 멘트 출처 요약 (지연 시간은 성공한 요청 기준)
+    처리량은 window초 안에 끝난 성공 요청 수 / window (open-loop는 보내는 구간, 밀린 요청이 끝나는 꼬리 구간 제외)
+    """
+    succeeded = [o for o in outcomes if o.ok]
+    completed = sum(1 for o in succeeded if o.finished <= window)
+    text_sources = Counter(o.text_source or "none" for o in succeeded)
+    fallbacks = text_sources["fallback"] + text_sources["deadline_fallback"]
+    summary = {
+        "requests": len(outcomes),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(completed / window, 2) if window > 0 else 0.0,
+        "error_rate": round(1 - len(succeeded) / len(outcomes), 4) if outcomes else 0.0,
+        "fallback_rate": round(fallbacks / len(succeeded), 4) if succeeded else 0.0,
+        "latency_ms": latency_percentiles([o.latency for o in succeeded]),
+        "statuses": dict(Counter(o.status for o in outcomes)),
+        "text_sources": dict(text_sources),
+        "endpoints": {}
+    }
+    for path in sorted({o.path for o in outcomes}):
+        endpoint = [o for o in outcomes if o.path == path]
+        endpoint_ok = [o.latency for o in endpoint if o.ok]
+        summary["endpoints"][path] = {
+            "requests": len(endpoint),
+            "error_rate": round(1 - len(endpoint_ok) / len(endpoint), 4),
+            "latency_ms": latency_percentiles(endpoint_ok)
+        }
+    return summary
+
+
+def latency_percentiles(latencies: List[float]) -> Optional[Dict[str, float]]:
+    if not latencies:
+        return None
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1),
+            "mean": round(float(values.mean()), 1), "max": round(float(values.max()), 1)}
+
+
+def find_saturation(steps: List[dict], mode: str, slo_ms: Optional[float], max_error_rate: float,
+                    max_fallback_rate: float) -> dict:
+    """
+    부하를 늘려가며 처음으로 다음 중 하나에 해당하는 단계를 포화 지점으로 봅니다.
+    - 오류율이 max_error_rate 초과 / 기본 멘트 비율이 max_fallback_rate 초과 (LLM 동시 호출 상한 / 예산 초과) / p99가 slo_ms 초과
+    - 동시 요청 수 단계: 처리량이 이전 단계보다 MIN_THROUGHPUT_GAIN 미만으로 증가
+    - 도착률 단계: 처리량이 도착률의 MIN_RATE_ACHIEVED 미만
+    그 직전 단계를 견딜 수 있는 최대 부하로 보고합니다.
+    """
+    previous = None
+    for step in steps:
+        reasons = []
+        if step["error_rate"] > max_error_rate:
+            reasons.append(f"error rate {step['error_rate']:.1%}")
+        if step["fallback_rate"] > max_fallback_rate:
+            reasons.append(f"fallback text rate {step['fallback_rate']:.1%}")
+        p99 = step["latency_ms"]["p99"] if step["latency_ms"] else None
+        if slo_ms is not None and (p99 is None or p99 > slo_ms):
+            reasons.append(f"p99 {p99} ms > SLO {slo_ms:g} ms")
+        if mode == "rate" and step["throughput_rps"] < step["level"] * MIN_RATE_ACHIEVED:
+            reasons.append(f"throughput {step['throughput_rps']} rps < {MIN_RATE_ACHIEVED:.0%} of offered {step['level']:g} rps")
+        if (mode == "concurrency" and previous is not None
+                and step["throughput_rps"] < previous["throughput_rps"] * (1 + MIN_THROUGHPUT_GAIN)):
+            reasons.append(f"throughput {previous['throughput_rps']} → {step['throughput_rps']} rps")
+        if reasons:
+            return {"level": step["level"], "reasons": reasons, **_sustainable(previous)}
+        previous = step
+    return {"level": None, "reasons": [], **_sustainable(previous)}
+
+
+def _sustainable(step: Optional[dict]) -> dict:
+    if step is None:
+        return {"max_sustainable_level": None, "max_sustainable_rps": None}
+    return {"max_sustainable_level": step["level"], "max_sustainable_rps": step["throughput_rps"]}
+
+
+def print_steps(steps: List[dict], mode: str):
+    label = "concurrency" if mode == "concurrency" else "rate/s"
+    print(f"{label:>11} {'requests':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8} {'fallback':>9}")
+    for step in steps:
+        latency = step["latency_ms"] or {"p50": float("nan"), "p95": float("nan"), "p99": float("nan")}
+        print(f"{step['level']:>11g} {step['requests']:>9} {step['throughput_rps']:>8.1f} {latency['p50']:>9.1f} "
+              f"{latency['p95']:>9.1f} {latency['p99']:>9.1f} {step['error_rate']:>8.1%} {step['fallback_rate']:>9.1%}")
+
+
+def print_saturation(saturation: dict, mode: str):
+    label = "concurrency" if mode == "concurrency" else "rate"
+    if saturation["level"] is None:
+        print(f"\nSaturation not reached (highest {label} {saturation['max_sustainable_level']:g}: "
+              f"{saturation['max_sustainable_rps']} rps)")
+        return
+    print(f"\nSaturation at {label} {saturation['level']:g}: {'; '.join(saturation['reasons'])}")
+    if saturation["max_sustainable_level"] is not None:
+        print(f"Max sustainable: {label} {saturation['max_sustainable_level']:g} → {saturation['max_sustainable_rps']} rps")
+
+
+def sound_filenames(path: str = SOUND_POOL_PATH) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [sound["filename"] for sound in json.load(f)]
+
+
+def install_stand_ins(args):
+    install_local_llm(**local_llm_settings(args))
+    if args.fake_embedder:
+        embedding_backends._backend = FakeEmbeddingBackend()
+
+
+def local_llm_settings(args) -> dict:
+    return {
+        "latency_ms": args.llm_latency_ms, "distribution": args.llm_distribution, "spread": args.llm_spread,
+        "token_ms": args.llm_token_ms, "translate_latency_ms": args.translate_latency_ms,
+        "error_rate": args.llm_error_rate, "timeout_rate": args.llm_timeout_rate, "seed": args.seed
+    }
+
+
+def make_client(args, connections: int) -> httpx.AsyncClient:
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections))
+    # 같은 프로세스의 앱 (startup 훅 대신 워밍업 요청이 모델 / 카탈로그를 로드)
+    from app import app
+    install_stand_ins(args)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadgen")
+
+
+async def run_steps(args, requests: List[RequestSpec]) -> Tuple[str, List[dict]]:
+    mode = "rate" if args.rate else "concurrency"
+    levels = args.rate or args.concurrency
+    connections = args.max_in_flight if mode == "rate" else max(levels)
+    specs = itertools.cycle(requests)
+    steps = []
+    async with make_client(args, connections) as client:
+        for _ in range(args.warmup_requests):
+            await send(client, next(specs), args.timeout)
+        for level in levels:
+            print(f"  {mode} {level:g}: {args.duration:g}s ...", flush=True)
+            if mode == "rate":
+                outcomes, elapsed = await open_loop(client, specs, level, args.duration, args.timeout, args.max_in_flight, args.seed)
+                window = args.duration
+            else:
+                outcomes, elapsed = await closed_loop(client, specs, int(level), args.duration, args.timeout)
+                window = elapsed
+            steps.append({"level": level, **summarize(outcomes, elapsed, window)})
+            if args.pause:
+                await asyncio.sleep(args.pause)
+    return mode, steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 API 부하 테스트 (트레이스 재생 / 설문 합성)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64], help="동시 요청 수 단계 (closed-loop)")
+    load.add_argument("--rate", type=float, nargs="+", help="초당 도착률 단계 (open-loop, 포아송 도착)")
+    parser.add_argument("--duration", type=float, default=20.0, help="단계별 측정 시간 (초)")
+    parser.add_argument("--pause", type=float, default=1.0, help="단계 사이 대기 시간 (초)")
+    parser.add_argument("--warmup-requests", type=int, default=10, help="측정 전 순차 요청 수 (모델 / 카탈로그 로드)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="요청 타임아웃 (초)")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open-loop에서 동시에 진행할 수 있는 최대 요청 수")
+    parser.add_argument("--trace", help="재생할 JSONL 트레이스 (없으면 합성)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="합성 요청의 엔드포인트 비율 (예: /recommend=0.5,/recommend/combined=0.5)")
+    parser.add_argument("--synthesize", type=int, default=2000, help="합성할 요청 수 (순환 재생)")
+    parser.add_argument("--save-trace", help="합성한 요청을 JSONL 트레이스로 저장")
+    parser.add_argument("--deadline-ms", type=int, help="모든 요청에 붙일 deadline_ms 쿼리 파라미터")
+    parser.add_argument("--text-mode", choices=TEXT_MODES, help="모든 요청에 붙일 text_mode 쿼리 파라미터 (llm / template / auto)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="대상 서버 (예: http://localhost:8000, 없으면 같은 프로세스에서 앱 실행)")
+    parser.add_argument("--llm-latency-ms", type=float, default=1500.0, help="local LLM 백엔드의 첫 토큰까지 시간 (분포의 중앙값)")
+    parser.add_argument("--llm-distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="첫 토큰까지 시간 분포")
+    parser.add_argument("--llm-spread", type=float, default=0.0, help="분포 폭 (uniform: ± ms, normal: 표준편차 ms, lognormal: sigma)")
+    parser.add_argument("--llm-token-ms", type=float, default=0.0, help="토큰 사이 간격 (ms)")
+    parser.add_argument("--translate-latency-ms", type=float, help="번역 호출의 첫 토큰까지 시간 (기본: --llm-latency-ms)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="LLM 호출 실패(503 / 스트림 오류) 주입 비율")
+    parser.add_argument("--llm-timeout-rate", type=float, default=0.0, help="LLM 호출 타임아웃 주입 비율")
+    parser.add_argument("--fake-embedder", action="store_true", help="임베딩 모델 대신 결정적 가짜 임베더 사용")
+    parser.add_argument("--slo-ms", type=float, help="포화 판단에 쓸 p99 지연 시간 기준")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="포화 판단에 쓸 오류율 기준")
+    parser.add_argument("--max-fallback-rate", type=float, default=0.05, help="포화 판단에 쓸 기본 멘트(LLM 대체) 비율 기준")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    parser.add_argument("--serve", action="store_true", help="LLM 대체를 붙인 앱을 uvicorn으로 실행 (부하는 보내지 않음)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        from app import app
+        install_stand_ins(args)
+        uvicorn.run(app, host=args.host, port=args.port)
+        return
+
+    if args.trace:
+        requests = load_trace(args.trace)
+        print(f"Replaying {len(requests)} requests from {args.trace}")
+    else:
+        requests = synthesize(args.synthesize, args.mix, sound_filenames(), args.seed)
+        print(f"Synthesized {len(requests)} requests ({', '.join(f'{p}={w:g}' for p, w in args.mix.items())})")
+        if args.save_trace:
+            save_trace(requests, args.save_trace)
+            print(f"Trace saved to {args.save_trace}")
+    if args.deadline_ms:
+        requests = [RequestSpec(r.path, r.body, {**r.params, "deadline_ms": str(args.deadline_ms)}) for r in requests]
+    if args.text_mode:
+        requests = [RequestSpec(r.path, r.body, {**r.params, "text_mode": args.text_mode}) for r in requests]
+
+    target = args.url or f"in-process app (local LLM backend {local_llm_settings(args)})"
+    print(f"Target: {target}")
+    mode, steps = asyncio.run(run_steps(args, requests))
+    saturation = find_saturation(steps, mode, args.slo_ms, args.max_error_rate, args.max_fallback_rate)
+
+    print()
+    print_steps(steps, mode)
+    print_saturation(saturation, mode)
+    save_report({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "options": {key: value for key, value in vars(args).items() if key not in ("serve", "host", "port")},
+        "mode": mode,
+        "steps": steps,
+        "saturation": saturation
+    }, args.output)
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# run.py
+# 추천 파이프라인 단계별 마이크로 벤치마크 (모델 / Bedrock 없이 오프라인 실행)
+#
+# 실행 (프로젝트 루트에서):
+#   python3 -m benchmarks.run                         # 전체 단계 측정 → benchmarks/results/latest.json
+#   python3 -m benchmarks.run --save-baseline         # 측정 결과를 기준으로 저장 (benchmarks/baseline.json)
+#   python3 -m benchmarks.run --compare               # 기준과 비교해 회귀가 있으면 종료 코드 1
+#   python3 -m benchmarks.run --stages embed_text recommend --iterations 500
+#
+# 임베딩은 결정적 가짜 임베더, LLM(번역 / 추천 멘트)은 고정 응답 스텁으로 대체합니다. (benchmarks/fakes.py)
+# 검색은 실제 카탈로그(data/sound_index.faiss + data/sound_pool.json, --index / --sound-pool로 변경)를 사용합니다.
+# 측정값은 실제 모델 / Bedrock 시간을 뺀 파이프라인 자체의 비용이며, --embed-delay-ms / --llm-delay-ms로 흉내 낼 수 있습니다.
+
+import argparse
+import asyncio
+import random
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddingBackend, install_fakes
+from benchmarks.harness import (
+    Case, build_report, compare_reports, load_report, measure, print_comparison, print_stages, save_report
+)
+from benchmarks.workload import combined_input, survey_input
+from services.embedding_service import embed_text
+from services.rag_recommender import catalog_holder, recommend_by_vector, search_candidates
+from services.recommender import (
+    combined_template_text, combined_weights, rank_candidates, rank_combined_sounds, recommend, recommend_with_both_data,
+    split_combined_input
+)
+from services.score_calculator import compute_final_scores
+from utils.prompt_builder import assemble_prompt, build_combined_prompt, build_prompt, combine_prompts, summarize_sleep_data
+
+DEFAULT_OUTPUT = "benchmarks/results/latest.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+# 배치 점수 계산 단계의 사용자 수
+BATCH_USERS = 64
+
+
+def build_cases(seed: int, filenames: List[str]) -> List[Case]:
+    """측정할 단계 목록. 입력은 (시드, 단계, 호출 번호)로 정해지므로 실행마다 같습니다."""
+    encoder = FakeEmbeddingBackend()
+
+    def survey(case: str, i: int) -> dict:
+        return survey_input(random.Random(f"{seed}:{case}:{i}"), f"{case}-{i}")
+
+    def combined(case: str, i: int) -> dict:
+        return combined_input(random.Random(f"{seed}:{case}:{i}"), f"{case}-{i}", filenames)
+
+    def query_vector(case: str, i: int) -> np.ndarray:
+        return encoder.encode([assemble_prompt(survey(case, i))])[0]
+
+    def final_scores_args(i: int) -> tuple:
+        weights_input = combined("compute_final_scores", i)
+        return (
+            recommend_by_vector(query_vector("compute_final_scores", i)),
+            weights_input["preferredSounds"],
+            {"prev_score": 70, "curr_score": weights_input["current"]["sleepScore"],
+             "main_sounds": weights_input["previousRecommendations"][:1],
+             "sub_sounds": weights_input["previousRecommendations"][1:]},
+            weights_input["preferenceBalance"]
+        )
+
+    def template_args(i: int) -> tuple:
+        user_input = combined("template_text", i)
+        prompt_for_rag = combine_prompts(summarize_sleep_data(split_combined_input(user_input)[0]), "")
+        return user_input, prompt_for_rag, recommend_by_vector(query_vector("template_text", i)), i % 2 == 0
+
+    def batch_args(i: int) -> tuple:
+        keys = [f"{i}-{user}" for user in range(BATCH_USERS)]
+        vectors = encoder.encode([assemble_prompt(survey("rank_batch", key)) for key in keys])
+        return search_candidates(vectors), [combined_weights(combined("rank_batch", key), False) for key in keys]
+
+    return [
+        Case("build_prompt", build_prompt, lambda i: (survey("build_prompt", i),),
+             "설문 → RAG 쿼리 문장 (기타 항목 번역 포함)"),
+        Case("build_combined_prompt", build_combined_prompt,
+             lambda i: split_combined_input(combined("build_combined_prompt", i)),
+             "수면 요약 + 설문 → 통합 프롬프트"),
+        Case("embed_text", embed_text, lambda i: (f"{assemble_prompt(survey('embed_text', i))} #{i}",),
+             "쿼리 임베딩 (캐시 miss, 가짜 임베더)"),
+        Case("embed_text_cached", embed_text, lambda i: (assemble_prompt(survey("embed_text_cached", 0)),),
+             "쿼리 임베딩 (캐시 hit)"),
+        Case("search_candidates", search_candidates, lambda i: (query_vector("search", i),),
+             "벡터 검색 (후보 배열)"),
+        Case("recommend_by_vector", recommend_by_vector, lambda i: (query_vector("search", i),),
+             "벡터 검색 + 사운드 dict 생성"),
+        Case("compute_final_scores", compute_final_scores, final_scores_args,
+             "사운드 dict 후보 점수 계산 / 정렬 (사용자 1명)"),
+        Case("rank_combined_sounds", rank_combined_sounds,
+             lambda i: (combined("rank", i), search_candidates(query_vector("rank", i)), False),
+             "후보 배열 점수 계산 / 정렬 (서비스 경로, 사용자 1명)"),
+        Case(f"rank_candidates[{BATCH_USERS}]", rank_candidates, batch_args,
+             f"(사용자 {BATCH_USERS}명 × 후보) 점수 행렬 / 정렬"),
+        Case("template_text", combined_template_text, template_args,
+             "템플릿 멘트 (수면 평가 + 설문 + Top 3 사운드, LLM 없이)"),
+        Case("recommend", recommend, lambda i: (survey("recommend", i),),
+             "설문 기반 추천 전체 (LLM 스텁)"),
+        Case("recommend_with_both_data", recommend_with_both_data,
+             lambda i: (combined("recommend_with_both_data", i), i % 2 == 0),
+             "통합 추천 전체 (LLM 스텁, 신규 / 기존 사용자 교대)"),
+    ]
+
+
+async def run_cases(cases: List[Case], iterations: int, warmup: int, alloc_iterations: int) -> Dict[str, dict]:
+    stages = {}
+    for case in cases:
+        print(f"  {case.name}: {case.description}", flush=True)
+        stages[case.name] = await measure(case, iterations, warmup, alloc_iterations)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 파이프라인 단계별 마이크로 벤치마크")
+    parser.add_argument("--stages", nargs="+", help="측정할 단계 이름 (기본: 전체)")
+    parser.add_argument("--iterations", type=int, default=200, help="단계별 측정 호출 수")
+    parser.add_argument("--warmup", type=int, default=20, help="측정 전 워밍업 호출 수")
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="할당 측정 호출 수 (0이면 측정 안 함)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embed-delay-ms", type=float, default=0.0, help="가짜 임베더의 encode 호출당 대기 시간")
+    parser.add_argument("--llm-delay-ms", type=float, default=0.0, help="LLM 스텁의 호출당 대기 시간")
+    parser.add_argument("--index", default=catalog_holder.index_path, help="FAISS 인덱스 파일")
+    parser.add_argument("--sound-pool", default=catalog_holder.sound_pool_path, help="사운드 데이터 파일")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준 결과 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="결과를 기준으로도 저장")
+    parser.add_argument("--compare", action="store_true", help="기준과 비교해 회귀가 있으면 종료 코드 1")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 볼 증가 비율")
+    parser.add_argument("--min-delta-us", type=float, default=5.0, help="회귀로 볼 최소 지연 시간 증가 (µs)")
+    args = parser.parse_args()
+
+    install_fakes(args.embed_delay_ms, args.llm_delay_ms)
+    catalog_holder.index_path, catalog_holder.sound_pool_path = args.index, args.sound_pool
+    engine = catalog_holder.current()
+    print(f"Catalog: {len(engine)} sounds ({engine.index_type}, version {engine.version})")
+
+    cases = build_cases(args.seed, [sound["filename"] for sound in engine.sound_pool])
+    if args.stages:
+        unknown = set(args.stages) - {case.name for case in cases}
+        if unknown:
+            parser.error(f"알 수 없는 단계: {', '.join(sorted(unknown))} (가능: {', '.join(case.name for case in cases)})")
+        cases = [case for case in cases if case.name in args.stages]
+
+    print(f"Running {len(cases)} stages x {args.iterations} iterations (warmup {args.warmup}, allocations {args.alloc_iterations})")
+    stages = asyncio.run(run_cases(cases, args.iterations, args.warmup, args.alloc_iterations))
+    report = build_report(stages, {
+        "iterations": args.iterations, "warmup": args.warmup, "alloc_iterations": args.alloc_iterations,
+        "seed": args.seed, "embed_delay_ms": args.embed_delay_ms, "llm_delay_ms": args.llm_delay_ms,
+        "catalog_sounds": len(engine), "index_type": engine.index_type
+    })
+
+    print()
+    print_stages(stages)
+    save_report(report, args.output)
+    print(f"\nResults saved to {args.output}")
+    if args.save_baseline:
+        save_report(report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        baseline = load_report(args.baseline)
+        rows = compare_reports(baseline, report, args.threshold, args.min_delta_us)
+        print(f"\nCompared with {args.baseline} ({baseline.get('created')}):")
+        print_comparison(rows, baseline, report)
+        regressions = [row["stage"] for row in rows if row["status"] == "regression"]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
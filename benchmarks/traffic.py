@@ -0,0 +1,110 @@
+# traffic.py
+# 부하 테스트 요청 목록 (benchmarks/loadgen.py)
+# - JSONL 트레이스: 한 줄에 요청 하나 {"path": "/recommend", "body": {...}, "params": {...}(선택)}
+# - 합성: 설문 선택지(utils/survey_enums.py)와 카탈로그 filename으로 API 스키마(app.py DTO)에 맞는 요청을 만듦
+#   엔드포인트 비율은 mix로 지정 (예: {"/recommend": 0.5, "/recommend/combined/new": 0.2, "/recommend/combined": 0.3})
+
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List
+
+from benchmarks.workload import sleep_record
+from services.translation_service import SEED_TRANSLATIONS
+from utils.survey_enums import FORM_MULTI_SELECT_FIELDS, MULTI_SELECT_FIELDS, SURVEY_ENUMS, SURVEY_FORM_ENUMS
+
+ENDPOINTS = ("/recommend", "/recommend/combined/new", "/recommend/combined")
+
+DEFAULT_MIX = {"/recommend": 0.5, "/recommend/combined/new": 0.2, "/recommend/combined": 0.3}
+
+
+@dataclass
+class RequestSpec:
+    path: str
+    body: dict
+    params: Dict[str, str] = field(default_factory=dict)
+
+
+def load_trace(path: str) -> List[RequestSpec]:
+    """JSONL 트레이스를 읽습니다. 빈 줄은 건너뛰고, 형식이 맞지 않는 줄은 줄 번호와 함께 ValueError."""
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                spec = RequestSpec(record["path"], record["body"], record.get("params") or {})
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{line_number}: 트레이스 형식이 아닙니다 ({e!r}) - {{\"path\", \"body\"}}가 필요합니다.")
+            if not spec.path.startswith("/"):
+                raise ValueError(f"{path}:{line_number}: path는 /로 시작해야 합니다: {spec.path}")
+            requests.append(spec)
+    if not requests:
+        raise ValueError(f"{path}: 요청이 없습니다.")
+    return requests
+
+
+def save_trace(requests: Iterable[RequestSpec], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for spec in requests:
+            f.write(json.dumps(asdict(spec), ensure_ascii=False) + "\n")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """"/recommend=0.5,/recommend/combined=0.5" 형식의 엔드포인트 비율"""
+    mix = {}
+    for part in text.split(","):
+        path, _, weight = part.partition("=")
+        if path.strip() not in ENDPOINTS or not weight:
+            raise ValueError(f"엔드포인트 비율 형식이 아닙니다: {part} (가능한 경로: {', '.join(ENDPOINTS)})")
+        mix[path.strip()] = float(weight)
+    return mix
+
+
+def synthesize(count: int, mix: Dict[str, float], filenames: List[str], seed: int = 42) -> List[RequestSpec]:
+    """mix 비율대로 엔드포인트를 고른 요청 count개 (시드가 같으면 같은 요청 목록)"""
+    rng = random.Random(seed)
+    paths, weights = list(mix), list(mix.values())
+    requests = []
+    for index in range(count):
+        path = rng.choices(paths, weights)[0]
+        body = {"userID": f"load-{index}", "date": "2025-07-15T00:00:00.000+00:00", "survey": survey_form(rng, index)}
+        if path != "/recommend":
+            body["sleepData"] = {"previous": sleep_record(rng) if rng.random() < 0.8 else None, "current": sleep_record(rng)}
+        if path == "/recommend/combined" or (path == "/recommend" and rng.random() < 0.5):
+            body["sounds"] = sounds_data(rng, filenames)
+        requests.append(RequestSpec(path, body))
+    return requests
+
+
+def survey_form(rng: random.Random, index: int) -> dict:
+    """SurveyData 스키마의 모든 항목을 채운 설문"""
+    survey = {}
+    for name, choices in {**SURVEY_ENUMS, **SURVEY_FORM_ENUMS}.items():
+        if name == "noisePreferenceOther":
+            continue
+        if name in MULTI_SELECT_FIELDS or name in FORM_MULTI_SELECT_FIELDS:
+            survey[name] = rng.sample(choices, rng.randint(1, min(3, len(choices))))
+        else:
+            survey[name] = rng.choice(choices)
+
+    roll = rng.random()
+    if roll < 0.3:
+        survey["noisePreferenceOther"] = rng.choice(sorted(SEED_TRANSLATIONS))
+    elif roll < 0.4:
+        # 번역 사전에 없는 자유 입력 → LLM 번역
+        survey["noisePreferenceOther"] = f"잔잔한 소리 {index}번"
+    else:
+        survey["noisePreferenceOther"] = ""
+    survey["emotionalSleepInterferenceOther"] = ""
+    survey["calmingSoundTypeOther"] = ""
+    survey["preferenceBalance"] = round(rng.random(), 2)
+    return survey
+
+
+def sounds_data(rng: random.Random, filenames: List[str]) -> dict:
+    return {
+        "preferredSounds": rng.sample(filenames, min(len(filenames), rng.randint(1, 3))),
+        "previousRecommendations": rng.sample(filenames, min(len(filenames), 3))
+    }
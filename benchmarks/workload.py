@@ -0,0 +1,48 @@
+# workload.py
+# 벤치마크 입력 생성 (시드가 같으면 항상 같은 입력)
+# - 설문: utils/survey_enums.py 선택지에서 무작위 선택, 기타 항목은 로컬 번역 사전 / LLM 번역(스텁) 경로를 섞음
+# - 통합 추천: 설문 + 수면 데이터(previous 없는 사용자 포함) + 카탈로그 filename에서 고른 선호 / 이전 추천 사운드
+# - key는 호출마다 다르게 넘겨 번역 / 멘트 캐시에 걸리지 않게 함 (사용자 ID와 LLM 번역 문장에 사용)
+
+import random
+from typing import List
+
+from scripts.phrase_table_benchmark import random_survey
+from services.translation_service import SEED_TRANSLATIONS
+
+
+def survey_input(rng: random.Random, key: str) -> dict:
+    """평탄화된 설문 기반 추천 입력 (app.py가 recommend()에 넘기는 형태)"""
+    survey, _ = random_survey(rng)
+    roll = rng.random()
+    if roll < 0.3:
+        # 로컬 번역 사전
+        survey["noisePreferenceOther"] = rng.choice(sorted(SEED_TRANSLATIONS))
+    elif roll < 0.4:
+        # 사전에 없는 문장 → LLM 번역 (입력마다 달라 번역 캐시에 걸리지 않음)
+        survey["noisePreferenceOther"] = f"잔잔한 소리 {key}"
+    else:
+        survey["noisePreferenceOther"] = ""
+    return {"userID": f"bench-{key}", **survey}
+
+
+def sleep_record(rng: random.Random) -> dict:
+    deep, rem, awake = rng.uniform(0.08, 0.25), rng.uniform(0.15, 0.26), rng.uniform(0.04, 0.2)
+    return {
+        "sleepScore": rng.randint(50, 95),
+        "deepSleepRatio": round(deep, 3),
+        "remSleepRatio": round(rem, 3),
+        "lightSleepRatio": round(max(0.0, 1.0 - deep - rem - awake), 3),
+        "awakeRatio": round(awake, 3)
+    }
+
+
+def combined_input(rng: random.Random, key: str, filenames: List[str]) -> dict:
+    """평탄화된 통합 추천 입력 (설문 + 수면 데이터 + 사운드 데이터)"""
+    user_input = survey_input(rng, key)
+    user_input["current"] = sleep_record(rng)
+    user_input["previous"] = sleep_record(rng) if rng.random() < 0.8 else None
+    user_input["preferredSounds"] = rng.sample(filenames, min(len(filenames), rng.randint(0, 5)))
+    user_input["previousRecommendations"] = rng.sample(filenames, min(len(filenames), 3))
+    user_input["preferenceBalance"] = round(rng.random(), 2)
+    return user_input
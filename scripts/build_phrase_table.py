@@ -0,0 +1,66 @@
+# build_phrase_table.py
+# 조합 임베딩 모드(QUERY_EMBEDDING_MODE=compositional)용 문구 테이블 생성
+# 설문 선택지(utils/survey_enums.py)마다 쿼리 문구를 만들어 미리 임베딩해 둠
+#
+# 실행 (프로젝트 루트에서):
+#   python3 -m scripts.build_phrase_table [--surveys requests.jsonl] [--output data/survey_phrase_table.npz]
+#
+# --surveys: 한 줄에 설문 JSON 하나 (또는 {"survey": {...}}) - 선택지 목록에 없는 값을 실제 요청에서 보충
+
+import argparse
+import json
+
+from services.embedding_backends import get_backend
+from services.query_embedding import PHRASE_TABLE_PATH, PhraseTable, phrase_sentence
+from services.translation_service import translate_locally
+from utils.prompt_builder import EMPTY_SURVEY_QUERY, SURVEY_PHRASES
+from utils.survey_enums import SURVEY_ENUMS
+
+
+def collect_values(surveys_path: str = None) -> dict:
+    """필드별 선택지 목록 (survey_enums + 요청 로그에서 찾은 값)"""
+    values = {field: list(SURVEY_ENUMS.get(field, [])) for field, _ in SURVEY_PHRASES}
+    if not surveys_path:
+        return values
+
+    with open(surveys_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            survey = json.loads(line)
+            survey = survey.get("survey", survey)
+            for field in values:
+                value = survey.get(field)
+                if field == "noisePreferenceOther" and value:
+                    # 자유 입력은 LLM 없이 번역되는 값만 미리 계산 가능
+                    value = translate_locally(" ".join(value.split()))
+                items = value if isinstance(value, list) else [value]
+                for item in items:
+                    if item and str(item) not in values[field]:
+                        values[field].append(str(item))
+    return values
+
+
+def build_phrase_table(surveys_path: str = None, output_path: str = PHRASE_TABLE_PATH):
+    values = collect_values(surveys_path)
+    phrases = [EMPTY_SURVEY_QUERY]
+    for field, template in SURVEY_PHRASES:
+        phrases.extend(template.format(value) for value in values[field])
+    phrases = list(dict.fromkeys(phrases))
+
+    backend = get_backend()
+    print(f"Embedding {len(phrases)} phrases with {backend.name} backend...")
+    vectors = backend.encode([phrase_sentence(p) for p in phrases])
+
+    PhraseTable(phrases, vectors, model=backend.fingerprint).save(output_path)
+    for field, _ in SURVEY_PHRASES:
+        print(f"  {field}: {len(values[field])} values")
+    print(f"Phrase table with {len(phrases)} phrases saved to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="조합 임베딩용 문구 테이블 생성")
+    parser.add_argument("--surveys", help="선택지를 보충할 설문 JSONL 파일")
+    parser.add_argument("--output", default=PHRASE_TABLE_PATH)
+    args = parser.parse_args()
+    build_phrase_table(args.surveys, args.output)
@@ -0,0 +1,237 @@
+# bulk_embedder.py
+# 대규모 카탈로그용 병렬 임베딩 (index_builder.py --bulk)
+# - 사운드 JSON을 한 원소씩 스트리밍으로 읽어 임베딩할 문장만 배치로 묶음 (파일 전체를 메모리에 올리지 않음)
+# - 배치를 프로세스 풀에 나눠 인코딩: 프로세스마다 모델 한 개, torch 스레드 수는 프로세스마다 --torch-threads
+# - 결과 벡터는 메모리 매핑된 .npy(<출력>.partial)에 도착하는 대로 기록하고, 끝난 배치 번호를 진행 파일에 남김
+#   → 중단된 빌드를 다시 실행하면 끝난 배치는 건너뜀 (사운드 파일 / 모델 / 배치 구성이 같을 때만)
+# - 진행률과 처리량(sounds/s)을 주기적으로 출력
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import signal
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from scripts.embed_generator import MODEL_ID
+from scripts.embedding_store import EmbeddingStore, SoundKey, sound_key
+
+# 배치 하나에 묶는 문장 수
+BULK_BATCH_SIZE = 256
+
+# 진행률 출력 주기 (초)
+PROGRESS_INTERVAL = 5.0
+
+# JSON 배열 원소 사이의 공백 / 쉼표
+_SEPARATOR = re.compile(r"\s*,?\s*")
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """최상위가 배열인 JSON 파일을 원소 하나씩 읽습니다. (chunk_size 글자씩 읽어 파싱)"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size)
+        start = buffer.find("[")
+        if start < 0 or buffer[:start].strip():
+            raise ValueError(f"{path}: 최상위가 배열인 JSON이 아닙니다.")
+        position, eof = start + 1, False
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if buffer.startswith("]", position):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                # 버퍼 끝에서 끝난 값은 잘린 것일 수 있으므로 더 읽은 뒤 다시 파싱
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield item
+            position = end
+
+
+# --- 작업 프로세스 ---
+
+def _init_worker(torch_threads: int):
+    # Ctrl+C는 부모 프로세스만 처리 (남은 배치를 취소하고 작업 프로세스를 멈춤)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # 프로세스마다 모델 한 개를 로드 (torch 연산 스레드 수는 CPU 코어를 프로세스끼리 나눠 쓰도록 제한)
+    import torch
+    torch.set_num_threads(torch_threads)
+    from scripts.embed_generator import get_model
+    get_model()
+
+
+def _encode_batch(batch: int, texts: List[str]) -> Tuple[int, np.ndarray]:
+    from scripts.embed_generator import get_model
+    # 실패를 0 벡터로 대신하지 않고 예외를 그대로 전달 (빌드 중단 → 다시 실행하면 이어서 진행)
+    return batch, np.asarray(get_model().encode(texts, batch_size=len(texts)), dtype="float32")
+
+
+# --- 진행 파일 ---
+
+class _Progress:
+    """
+    끝난 배치 번호를 한 줄씩 추가하는 진행 파일. 첫 줄은 빌드 구성의 fingerprint이며,
+    구성이 다르면 이전 진행 상황과 .partial 벡터를 버리고 처음부터 시작합니다.
+    """
+
+    def __init__(self, path: str, fingerprint: str, resume: bool):
+        self.path = path
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path, "r") as f:
+                lines = f.read().split()
+            if lines and lines[0] == fingerprint:
+                self.done = {int(line) for line in lines[1:]}
+        if not self.done:
+            with open(path, "w") as f:
+                f.write(fingerprint + "\n")
+        self._file = open(path, "a")
+
+    def mark(self, batch: int):
+        self._file.write(f"{batch}\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.add(batch)
+
+    def close(self):
+        self._file.close()
+
+
+def _fingerprint(sound_pool_path: str, missing: np.ndarray, count: int, dim: int, batch_size: int) -> str:
+    stat = os.stat(sound_pool_path)
+    digest = hashlib.sha256(f"{MODEL_ID}|{stat.st_size}:{stat.st_mtime_ns}|{count}|{dim}|{batch_size}".encode())
+    digest.update(missing.tobytes())
+    return digest.hexdigest()
+
+
+def bulk_embed(
+    sound_pool_path: str,
+    vectors_path: str,
+    dim: int,
+    store: Optional[EmbeddingStore] = None,
+    workers: int = 1,
+    batch_size: int = BULK_BATCH_SIZE,
+    torch_threads: int = 1,
+    resume: bool = True
+) -> List[SoundKey]:
+    """
+    사운드 전체의 (N, dim) 임베딩을 vectors_path(.npy)로 만들고 사운드 키 목록을 반환합니다.
+    저장소에 있는 사운드는 복사만 하고, 나머지를 batch_size개씩 workers개 프로세스로 인코딩합니다.
+    작업 파일은 vectors_path.partial / vectors_path.progress이며 완료되면 vectors_path로 교체됩니다.
+    """
+    # 1. 사운드 키 목록 (filename, effect 해시)와 임베딩이 필요한 위치
+    keys = [sound_key(item) for item in iter_json_array(sound_pool_path)]
+    stored = [store.lookup(key) if store is not None else None for key in keys]
+    missing = np.array([position for position, vector in enumerate(stored) if vector is None], dtype=np.int64)
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+
+    partial_path = f"{vectors_path}.partial"
+    progress = _Progress(
+        f"{vectors_path}.progress",
+        _fingerprint(sound_pool_path, missing, len(keys), dim, batch_size),
+        resume and os.path.exists(partial_path)
+    )
+    if progress.done:
+        vectors = np.lib.format.open_memmap(partial_path, mode="r+")
+        print(f"Resuming: {len(progress.done)}/{len(batches)} batches already embedded")
+    else:
+        vectors = np.lib.format.open_memmap(partial_path, mode="w+", dtype="float32", shape=(len(keys), dim))
+        for position, vector in enumerate(stored):
+            if vector is not None:
+                vectors[position] = vector
+    del stored
+    print(f"Reusing {len(keys) - len(missing)} stored embeddings, "
+          f"embedding {len(missing)} sounds in {len(batches)} batches with {workers} workers x {torch_threads} torch threads...")
+
+    # 2. 남은 배치의 문장을 스트리밍으로 모아 프로세스 풀에 제출 (진행 중인 배치는 workers의 2배까지)
+    remaining = [batch for batch in range(len(batches)) if batch not in progress.done]
+    if remaining:
+        meter = _Throughput(sum(len(batches[batch]) for batch in remaining))
+        context = multiprocessing.get_context("spawn")  # torch는 fork 후 사용이 안전하지 않음
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(torch_threads,))
+        try:
+            pending = set()
+            for batch, texts in _batch_texts(sound_pool_path, batches, remaining):
+                pending.add(pool.submit(_encode_batch, batch, texts))
+                if len(pending) >= workers * 2:
+                    pending = _drain(pending, FIRST_COMPLETED, batches, vectors, progress, meter)
+            _drain(pending, ALL_COMPLETED, batches, vectors, progress, meter)
+        except BaseException:
+            # 중단 / 실패 시 남은 배치를 버리고 종료 (끝난 배치는 진행 파일에 남아 있으므로 다시 실행하면 이어서 진행)
+            pool.shutdown(wait=False, cancel_futures=True)
+            progress.close()
+            print(f"Stopped after {len(progress.done)}/{len(batches)} batches, run again to resume")
+            raise
+        pool.shutdown()
+        meter.report(final=True)
+
+    vectors.flush()
+    del vectors
+    progress.close()
+    os.replace(partial_path, vectors_path)
+    os.remove(progress.path)
+    return keys
+
+
+def _batch_texts(sound_pool_path: str, batches: List[np.ndarray], remaining: List[int]) -> Iterator[Tuple[int, List[str]]]:
+    # 배치는 위치 오름차순이므로 파일을 한 번만 훑으면서 남은 배치에 속한 사운드의 effect만 모음
+    items = enumerate(iter_json_array(sound_pool_path))
+    for batch in remaining:
+        texts = []
+        for position in batches[batch].tolist():
+            for index, item in items:
+                if index == position:
+                    texts.append(item["effect"])
+                    break
+        yield batch, texts
+
+
+def _drain(pending: set, return_when, batches, vectors, progress: _Progress, meter: "_Throughput") -> set:
+    done, pending = wait(pending, return_when=return_when)
+    for future in done:
+        batch, encoded = future.result()
+        vectors[batches[batch]] = encoded
+        # 벡터를 디스크에 쓴 뒤에 완료로 기록 (중단되어도 기록된 배치는 온전함)
+        vectors.flush()
+        progress.mark(batch)
+        meter.add(len(encoded))
+    return pending
+
+
+class _Throughput:
+    """진행률 / 처리량 출력"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def add(self, count: int):
+        self.done += count
+        if time.perf_counter() - self.last_report >= PROGRESS_INTERVAL:
+            self.report()
+
+    def report(self, final: bool = False):
+        now = time.perf_counter()
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else float("inf")
+        if final:
+            print(f"Embedded {self.done} sounds in {elapsed:.1f}s ({rate:.0f} sounds/s)")
+        else:
+            print(f"  {self.done}/{self.total} sounds ({self.done / self.total:.1%}), {rate:.0f} sounds/s, ETA {eta:.0f}s")
@@ -1,17 +1,51 @@
 # embed_generator.py
 
-from sentence_transformers import SentenceTransformer
+import logging
+import threading
 import numpy as np
 
-model = SentenceTransformer("BAAI/bge-small-en-v1.5")
+# 인덱스 빌더처럼 단독 실행될 수도 있으므로 표준 logging만 사용
+# (서버에서는 services.logger가 scripts.* 로거에 JSON 핸들러를 붙여줌)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+
+# 임베딩 저장소 / 캐시 키에 쓰는 모델 id (모델이 바뀌면 저장된 임베딩을 재사용하지 않음)
+MODEL_ID = f"torch:{MODEL_NAME}"
+
+# torch / sentence-transformers import와 모델 로드는 무거우므로 첫 사용 시점까지 미룸
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """SentenceTransformer 모델을 반환합니다. (최초 호출 시 한 번만 로드)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
 
 # 주어진 입력(자연어)를 384차원의 임베딩 벡터로 변환
 def generate_embedding(text: str) -> np.ndarray:
     try:
         # float32타입 382차원 벡터를 리턴
-        return model.encode(text).astype("float32")
+        return get_model().encode(text).astype("float32")
     
     # 예외처리
     except Exception as e:
-        print(f"[ERROR] 임베딩 생성 실패: {e}")
-        return np.zeros(384, dtype="float32")  # fallback
\ No newline at end of file
+        logger.error("임베딩 생성 실패", extra={"error": str(e)})
+        return np.zeros(384, dtype="float32")  # fallback
+
+# 여러 문장을 한 번의 배치 encode로 (N, 384) 임베딩 행렬로 변환
+def generate_embeddings(texts: list, batch_size: int = 32) -> np.ndarray:
+    try:
+        return get_model().encode(texts, batch_size=batch_size).astype("float32")
+
+    # 예외처리
+    except Exception as e:
+        logger.error("배치 임베딩 생성 실패", extra={"error": str(e)})
+        return np.zeros((len(texts), 384), dtype="float32")  # fallback
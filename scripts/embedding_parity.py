@@ -0,0 +1,91 @@
+# embedding_parity.py
+# ONNX / int8 백엔드 임베딩이 torch 임베딩과 얼마나 다른지 사운드 풀 기준으로 확인
+#
+# 실행 (프로젝트 루트에서, export_onnx 이후):
+#   python3 -m scripts.embedding_parity [--backends onnx onnx-int8] [--top-k 5]
+#
+# 출력 항목:
+#   cosine      - 같은 문장에 대한 torch 벡터와의 코사인 유사도 (평균 / 최소)
+#   top-k       - torch로 만든 사운드 벡터(=FAISS 인덱스)에서 검색했을 때 torch 쿼리 결과와 겹치는 비율 (평균 / 최소)
+#   ms/text     - 문장 하나당 평균 임베딩 시간
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.embedding_backends import create_backend
+from services.rag_recommender import SOUND_POOL_PATH
+
+# 사운드 설명 외에 실제 서비스와 비슷한 형태의 쿼리 문장
+SAMPLE_QUERIES = [
+    "A user seeking better sleep.",
+    "A user who wants to achieve the goal of 'fallAsleepFast' is experiencing sleep issues like 'wakeOften' "
+    "and has a 'high' stress level. They find 'rain' sounds most calming.",
+    "A user who wants to achieve the goal of 'deepSleep' and has a 'low' stress level. "
+    "They find 'nature' sounds most calming. and also likes 'pop songs'.",
+    "A user who is experiencing sleep issues like 'anxiety, insomnia' They find 'music' sounds most calming.",
+]
+
+
+def load_texts(sound_pool_path: str):
+    with open(sound_pool_path, "r", encoding="utf-8") as f:
+        sound_pool = json.load(f)
+    # 인덱스 빌더와 같은 필드(effect)를 임베딩
+    return [item["effect"] for item in sound_pool]
+
+
+def encode_timed(backend, texts):
+    backend.load()
+    backend.encode(texts[:1])  # 첫 실행 워밍업은 측정에서 제외
+    start = time.perf_counter()
+    vectors = backend.encode(texts)
+    elapsed = time.perf_counter() - start
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors, elapsed * 1000 / len(texts)
+
+
+def top_k(query_vectors, pool_vectors, k):
+    scores = query_vectors @ pool_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="torch 대비 ONNX 임베딩 차이 확인")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--sound-pool", default=SOUND_POOL_PATH)
+    args = parser.parse_args()
+
+    pool_texts = load_texts(args.sound_pool)
+    query_texts = pool_texts + SAMPLE_QUERIES
+    k = min(args.top_k, len(pool_texts))
+
+    print(f"Embedding {len(query_texts)} texts with torch...")
+    reference, reference_ms = encode_timed(create_backend("torch"), query_texts)
+    pool_vectors = reference[:len(pool_texts)]
+    reference_top = top_k(reference, pool_vectors, k)
+
+    print(f"{'backend':<10} {'cos mean':>9} {'cos min':>9} {'top-k mean':>11} {'top-k min':>10} {'ms/text':>8}")
+    print(f"{'torch':<10} {1.0:>9.5f} {1.0:>9.5f} {1.0:>11.3f} {1.0:>10.3f} {reference_ms:>8.2f}")
+
+    for name in args.backends:
+        vectors, ms_per_text = encode_timed(create_backend(name), query_texts)
+        cosines = np.sum(vectors * reference, axis=1)
+
+        # 서비스와 같은 조건: 쿼리만 새 백엔드, 사운드 벡터는 torch로 빌드된 인덱스
+        candidate_top = top_k(vectors, pool_vectors, k)
+        overlaps = np.array([
+            len(set(a) & set(b)) / k for a, b in zip(reference_top, candidate_top)
+        ])
+
+        print(f"{name:<10} {cosines.mean():>9.5f} {cosines.min():>9.5f} "
+              f"{overlaps.mean():>11.3f} {overlaps.min():>10.3f} {ms_per_text:>8.2f}")
+
+        worst = int(np.argmin(cosines))
+        print(f"  worst cosine: {cosines[worst]:.5f} ({query_texts[worst][:60]!r})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# embedding_store.py
+# 인덱스 빌더용 사운드 임베딩 저장소 (data/sound_pool_embedded.json + data/sound_pool_embedded.npy)
+# - (filename, 임베딩한 문장의 해시, 모델 id)가 같은 사운드는 저장된 벡터를 재사용 → 새로 추가되거나 바뀐 사운드만 임베딩
+# - json: {"model": 모델 id, "dim": 384, "vectors_file": {"size", "mtime_ns"}, "index_file": {"path", "size", "mtime_ns"} | null,
+#          "sounds": [{"filename": ..., "text_hash": ...}, ...]}
+#   index_file은 이 벡터로 마지막으로 써 둔 FAISS 인덱스 (인덱스 빌더가 기존 인덱스를 이어 쓸 수 있는지 확인하는 데 사용)
+# - npy: 같은 순서의 (N, dim) float32 벡터 (마지막 빌드의 카탈로그 순서 = 인덱스 id 순서)
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = "data/sound_pool_embedded.json"
+
+# (filename, 문장 해시)
+SoundKey = Tuple[str, str]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sound_key(sound: dict, field: str = "effect") -> SoundKey:
+    """사운드 한 개의 저장소 키 (filename이 같아도 임베딩할 문장이 바뀌면 다른 키)"""
+    return sound["filename"], text_hash(sound[field])
+
+
+class EmbeddingStore:
+    """
+    모델 id 하나에 대한 사운드 임베딩 저장소.
+    파일이 없거나 비어 있거나, 다른 모델로 만든 저장소면 빈 저장소로 시작합니다.
+    """
+
+    def __init__(self, path: str, model_id: str):
+        self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".npy"
+        self.model_id = model_id
+        self.keys: List[SoundKey] = []
+        self.vectors: Optional[np.ndarray] = None
+        # 현재 keys / vectors로 써 둔 인덱스 파일 (없거나 쓰기 전에 중단되었으면 None)
+        self.index_file: Optional[dict] = None
+        self._rows: Dict[SoundKey, int] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("model") != self.model_id:
+            logger.warning("Embedding store was built with a different model, re-embedding everything",
+                           extra={"stored_model": manifest.get("model"), "model": self.model_id})
+            return
+        keys = [(sound["filename"], sound["text_hash"]) for sound in manifest.get("sounds", [])]
+        try:
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+            written = manifest.get("vectors_file") == _file_signature(self.vectors_path)
+        except (OSError, ValueError):
+            vectors, written = None, False
+        if vectors is None or not written or len(vectors) != len(keys):
+            # 저장 도중 중단된 경우 등 json과 벡터 파일이 맞지 않으면 사용하지 않음
+            logger.warning("Embedding store is incomplete, re-embedding everything", extra={"path": self.path})
+            return
+        self.keys = keys
+        self.vectors = vectors
+        self.index_file = manifest.get("index_file")
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, key: SoundKey) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        return None if row is None else self.vectors[row]
+
+    def save(self, keys: List[SoundKey], vectors: np.ndarray):
+        """
+        저장소를 keys / vectors(현재 카탈로그 순서)로 바꿉니다. 카탈로그에서 빠진 사운드는 함께 지워집니다.
+        벡터 파일을 먼저 쓰고 json을 나중에 교체하므로, 중간에 중단되면 다음 실행에서 불완전한 저장소로 판단합니다.
+        (json에 적힌 벡터 파일 크기 / 수정 시각이 실제 파일과 다름)
+        인덱스 기록(index_file)은 지워지므로, 인덱스를 쓴 뒤 record_index로 다시 남겨야 합니다.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        _replace_file(self.vectors_path, lambda f: np.save(f, vectors))
+        self._commit(keys)
+
+    def adopt(self, keys: List[SoundKey], vectors_file: str):
+        """이미 완성된 (N, dim) .npy 파일을 복사 없이 저장소 벡터 파일로 옮깁니다. (대량 빌드 결과)"""
+        os.replace(vectors_file, self.vectors_path)
+        self._commit(keys)
+
+    def record_index(self, index_path: str):
+        """현재 keys / vectors로 index_path의 인덱스를 다 썼다고 기록합니다. (인덱스 파일 교체 후 호출)"""
+        self.index_file = index_signature(index_path)
+        self._write_manifest()
+
+    def _commit(self, keys: List[SoundKey]):
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        if len(vectors) != len(keys):
+            raise ValueError(f"벡터 수({len(vectors)})와 사운드 수({len(keys)})가 다릅니다.")
+        self.keys = list(keys)
+        self.vectors = vectors
+        self.index_file = None
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._write_manifest()
+
+    def _write_manifest(self):
+        manifest = {
+            "model": self.model_id,
+            "dim": int(self.vectors.shape[1]),
+            "vectors_file": _file_signature(self.vectors_path),
+            "index_file": self.index_file,
+            "sounds": [{"filename": filename, "text_hash": digest} for filename, digest in self.keys]
+        }
+        _replace_file(self.path, lambda f: f.write(json.dumps(manifest, ensure_ascii=False).encode("utf-8")))
+
+
+def index_signature(index_path: str) -> dict:
+    """인덱스 파일의 경로 / 크기 / 수정 시각 (저장소가 기록한 인덱스와 같은 파일인지 비교)"""
+    return {"path": os.path.abspath(index_path), **_file_signature(index_path)}
+
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _replace_file(path: str, write):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
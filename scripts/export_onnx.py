@@ -0,0 +1,68 @@
+# export_onnx.py
+# SentenceTransformer(bge-small-en-v1.5)의 BERT 인코더를 ONNX로 내보내고, int8 동적 양자화 버전도 함께 생성
+#
+# 실행 (프로젝트 루트에서):
+#   python3 -m scripts.export_onnx
+#
+# 결과물 (ONNX_MODEL_DIR):
+#   model.onnx       - fp32 모델 (EMBEDDING_BACKEND=onnx)
+#   model.int8.onnx  - int8 동적 양자화 모델 (EMBEDDING_BACKEND=onnx-int8)
+#   tokenizer.json   - tokenizers 라이브러리용 토크나이저
+
+import os
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from scripts.embed_generator import get_model
+from services.embedding_backends import (
+    ONNX_INT8_MODEL_FILE,
+    ONNX_MODEL_DIR,
+    ONNX_MODEL_FILE,
+)
+
+OPSET_VERSION = 17
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+
+    print("Loading SentenceTransformer model...")
+    sentence_model = get_model()
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+
+    # 더미 입력으로 그래프를 추적 (배치 / 시퀀스 길이는 동적 축으로 지정)
+    sample = tokenizer(["A user seeking better sleep."], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    print(f"Exporting ONNX model to {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET_VERSION,
+            do_constant_folding=True,
+        )
+
+    # 백엔드는 transformers 없이 tokenizers만으로 토큰화하므로 tokenizer.json만 있으면 됨
+    tokenizer.save_pretrained(output_dir)
+
+    print(f"Quantizing to int8: {int8_path}...")
+    quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+
+    for path in (model_path, int8_path):
+        print(f"  {path}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    print("Done. 임베딩 차이는 python3 -m scripts.embedding_parity 로 확인하세요.")
+
+
+if __name__ == "__main__":
+    export_onnx()
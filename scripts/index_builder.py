@@ -1,30 +1,268 @@
 # index_builder.py
+# 사운드 카탈로그 FAISS 인덱스 생성 (flat / ivf_flat / ivf_pq / hnsw - services/ann_index.py)
+#
+# 실행 (프로젝트 루트에서):
+#   python3 -m scripts.index_builder [--index-type hnsw] [--report]
+#
+# 임베딩은 저장소(scripts/embedding_store.py, --embedding-store)에 남겨 두고, 다음 실행에서는 새로 추가되거나 effect가 바뀐 사운드만 임베딩
+# 사운드가 카탈로그 뒤에 추가되기만 했고 인덱스 종류가 같으면 기존 인덱스에 새 벡터만 추가 (--rebuild면 항상 새로 생성)
+# --vectors-from: 이미 만든 flat 인덱스에서 벡터를 꺼내 사용 (임베딩을 다시 계산하지 않고 인덱스 종류만 바꿀 때)
+# --bulk: 대규모 카탈로그용 병렬 임베딩 (scripts/bulk_embedder.py, 프로세스 풀 + memmap, 중단 후 다시 실행하면 이어서 진행)
+# --report: 정확 검색(flat) 대비 recall@k / 쿼리당 지연 시간을 nprobe / efSearch별로 출력
+#
+# 결과 파일은 임시 파일에 쓴 뒤 교체하므로 실행 중인 서버는 완성된 파일만 보게 됨
+# (교체 후 POST /admin/catalog/reload 또는 CATALOG_WATCH_INTERVAL 감시로 반영)
+
+import argparse
+import json
+import os
+import time
+from typing import List, Optional, Tuple
 
 import faiss
 import numpy as np
-import json
-from embed_generator import generate_embedding
 
-def build_faiss_index(sound_pool_path: str, index_path: str):
+from scripts.bulk_embedder import BULK_BATCH_SIZE, bulk_embed
+from scripts.embed_generator import MODEL_ID, get_model
+from scripts.embedding_store import DEFAULT_STORE_PATH, EmbeddingStore, SoundKey, index_signature, sound_key
+from services.ann_index import (
+    FAISS_EF_CONSTRUCTION, FAISS_HNSW_M, FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_PQ_BITS, FAISS_PQ_M,
+    INDEX_TYPES, build_index, index_type_of, search_parameters
+)
+from services.embedding_backends import EMBEDDING_DIM
+
+# 임베딩 배치 크기
+EMBED_BATCH_SIZE = 64
+
+# --bulk 기본 작업 프로세스 수 (프로세스마다 torch 스레드는 코어 수 / 프로세스 수)
+BULK_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
+# 리포트에서 비교할 검색 파라미터 후보
+NPROBE_SWEEP = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256, 512)
+
+
+def embed_sound_pool(sound_pool: list, store: Optional[EmbeddingStore] = None) -> np.ndarray:
+    """
+    각 사운드의 effect를 (N, 384) float32 임베딩 행렬로 변환합니다.
+    저장소에 같은 키(filename, effect 해시, 모델)가 있으면 재사용하고, 나머지만 배치로 임베딩합니다.
+    """
+    vectors = np.zeros((len(sound_pool), EMBEDDING_DIM), dtype='float32')
+    missing = []
+    for position, item in enumerate(sound_pool):
+        stored = store.lookup(sound_key(item)) if store is not None else None
+        if stored is None:
+            missing.append(position)
+        else:
+            vectors[position] = stored
+    print(f"Reusing {len(sound_pool) - len(missing)} stored embeddings, embedding {len(missing)} new or changed sounds...")
+
+    if missing:
+        start = time.perf_counter()
+        # 실패를 0 벡터로 대신하면 저장소에 남으므로 빌드 스크립트에서는 예외를 그대로 전달
+        encoded = get_model().encode([sound_pool[position]['effect'] for position in missing], batch_size=EMBED_BATCH_SIZE)
+        vectors[missing] = np.asarray(encoded, dtype='float32')
+        print(f"Embedded {len(missing)} sounds in {time.perf_counter() - start:.1f}s")
+    return vectors
+
+
+def append_to_index(index_path: str, index_type: str, previous_keys: List[SoundKey], keys: List[SoundKey],
+                    vectors: np.ndarray, previous_index: Optional[dict] = None) -> Optional[faiss.Index]:
+    """
+    이전 빌드의 사운드 순서가 현재 카탈로그의 앞부분과 같으면 (사운드가 뒤에 추가되기만 했으면)
+    기존 인덱스에 새 벡터만 추가해 반환합니다. 바뀌거나 빠진 사운드가 있거나 인덱스 종류가 다르면 None.
+    previous_index(저장소에 기록된 인덱스 파일)가 index_path의 현재 파일과 다르면 None
+    - 저장소만 갱신되고 인덱스를 쓰기 전에 중단되었거나, 다른 곳에서 만든 인덱스를 가리키는 경우
+    IVF 인덱스는 기존 클러스터를 그대로 쓰므로 많이 추가된 뒤에는 --rebuild로 다시 학습하는 것이 좋습니다.
+    """
+    count = len(previous_keys)
+    if not count or keys[:count] != previous_keys or not os.path.exists(index_path):
+        return None
+    if previous_index is None or previous_index != index_signature(index_path):
+        print(f"{index_path} was not built from the stored embeddings, rebuilding")
+        return None
+    index = faiss.read_index(index_path)
+    if index.ntotal != count or index_type_of(index) != index_type:
+        return None
+    if len(keys) > count:
+        index.add(np.ascontiguousarray(vectors[count:]))
+    return index
+
+
+def bulk_embed_sound_pool(sound_pool_path: str, index_path: str, store: Optional[EmbeddingStore],
+                          workers: int = BULK_WORKERS, batch_size: int = BULK_BATCH_SIZE,
+                          torch_threads: Optional[int] = None, resume: bool = True) -> Tuple[List[SoundKey], np.ndarray]:
+    """
+    bulk_embedder로 전체 임베딩을 만들고 (사운드 키, memmap 벡터)를 반환합니다.
+    저장소를 쓰면 결과 파일을 그대로 저장소 벡터 파일로 옮기고, 아니면 <인덱스>.vectors.npy로 남깁니다.
+    """
+    base = os.path.splitext(store.path if store is not None else index_path)[0]
+    vectors_path = f"{base}.bulk.npy" if store is not None else f"{base}.vectors.npy"
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    keys = bulk_embed(sound_pool_path, vectors_path, EMBEDDING_DIM, store,
+                      workers=workers, batch_size=batch_size, torch_threads=torch_threads, resume=resume)
+    if store is None:
+        print(f"Embeddings saved to {vectors_path}")
+        return keys, np.load(vectors_path, mmap_mode='r')
+    store.adopt(keys, vectors_path)
+    return keys, store.vectors
+
+
+def build_faiss_index(sound_pool_path: str, index_path: str, index_type: str = FAISS_INDEX_TYPE,
+                      vectors_from: str = None, report: bool = False, embedding_store: str = DEFAULT_STORE_PATH,
+                      rebuild: bool = False, bulk: bool = False, bulk_options: Optional[dict] = None,
+                      **index_options):
+    previous_keys: List[SoundKey] = []
+    previous_index: Optional[dict] = None
+    store: Optional[EmbeddingStore] = None
+    if vectors_from:
+        sound_pool = _load_sound_pool(sound_pool_path)
+        keys = [sound_key(item) for item in sound_pool]
+        source = faiss.read_index(vectors_from)
+        vectors = source.reconstruct_n(0, source.ntotal)
+        if len(vectors) != len(sound_pool):
+            raise ValueError(f"{vectors_from}의 벡터 수({len(vectors)})와 사운드 수({len(sound_pool)})가 다릅니다.")
+    else:
+        store = EmbeddingStore(embedding_store, MODEL_ID) if embedding_store else None
+        if store is not None:
+            previous_keys, previous_index = list(store.keys), store.index_file
+        if bulk:
+            # 사운드 데이터는 bulk_embedder가 스트리밍으로 읽고, 저장소도 함께 갱신
+            keys, vectors = bulk_embed_sound_pool(sound_pool_path, index_path, store, **(bulk_options or {}))
+        else:
+            sound_pool = _load_sound_pool(sound_pool_path)
+            keys = [sound_key(item) for item in sound_pool]
+            vectors = embed_sound_pool(sound_pool, store)
+            if store is not None:
+                store.save(keys, vectors)
+        if store is not None:
+            # 카탈로그에서 빠졌거나 effect가 바뀐 사운드의 이전 벡터는 저장소에서 지워짐
+            removed = len(set(previous_keys) - set(keys))
+            print(f"Embedding store saved to {embedding_store} ({len(keys)} sounds, {removed} stale entries dropped)")
+
+    index = None if rebuild else append_to_index(index_path, index_type, previous_keys, keys, vectors, previous_index)
+    if index is not None:
+        added = len(keys) - len(previous_keys)
+        if not added:
+            # 다시 쓰지 않으므로 서버의 카탈로그 버전도 그대로
+            print(f"{index_path} is up to date ({index.ntotal} vectors)")
+        else:
+            write_index_atomic(index, index_path)
+            print(f"Appended {added} vectors to {index_path} ({index.ntotal} total)")
+    else:
+        # FAISS 인덱스 생성 및 저장
+        print(f"Building FAISS {index_type} index...")
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, **index_options)
+        print(f"Built in {time.perf_counter() - start:.1f}s")
+        write_index_atomic(index, index_path)
+        print(f"FAISS index with {len(vectors)} vectors saved to {index_path}")
+    if store is not None:
+        # 인덱스까지 다 쓴 뒤에만 기록하므로, 그 전에 중단되면 다음 실행은 기존 인덱스를 이어 쓰지 않고 다시 생성
+        store.record_index(index_path)
+
+    if report:
+        recall_report(vectors, index)
+
+
+def _load_sound_pool(sound_pool_path: str) -> list:
     # 원본 데이터 로드
     print(f"Loading sound data from {sound_pool_path}...")
     with open(sound_pool_path, 'r', encoding='utf-8') as f:
-        sound_pool = json.load(f)
+        return json.load(f)
+
+
+def write_index_atomic(index: faiss.Index, index_path: str):
+    """
+    같은 디렉터리의 임시 파일에 쓴 뒤 os.replace로 교체합니다.
+    서버가 mmap으로 열어 둔 기존 파일은 그대로 남아 있으므로 이전 스냅샷도 계속 읽을 수 있습니다.
+    """
+    tmp_path = f"{index_path}.tmp-{os.getpid()}"
+    try:
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, index_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-    # 각 사운드의 effect를 임베딩 벡터로 변환
-    print("Generating embeddings for each sound...")
-    embeddings = [generate_embedding(item['effect']) for item in sound_pool]
-    vectors = np.array(embeddings, dtype='float32') # (N, 384) shape의 float32 배열
 
-    # FAISS 인덱스 생성 및 저장
-    print("Building FAISS index...")
-    index = faiss.IndexFlatL2(vectors.shape[1]) # 384차원, l2 거리 기반 인덱스
-    index.add(vectors)
-    faiss.write_index(index, index_path)
-    print(f"FAISS index with {len(vectors)} vectors saved to {index_path}")
+def recall_report(vectors: np.ndarray, index: faiss.Index, k: int = 10, queries: int = 1000, seed: int = 42):
+    """정확 검색 결과 대비 recall@k와 쿼리당 지연 시간 (카탈로그 벡터에 잡음을 섞은 쿼리 사용)"""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(vectors), size=queries)
+    noisy = vectors[picks] + rng.normal(0, 0.05, size=(queries, vectors.shape[1])).astype('float32')
+    noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+    k = min(k, len(vectors))
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    exact_ms = _latency_ms(exact, noisy, k, None)
+    _, truth = exact.search(noisy, k)
+
+    if isinstance(index, faiss.IndexIVF):
+        sweep = [("nprobe", n, search_parameters(index, nprobe=n)) for n in NPROBE_SWEEP if n <= index.nlist]
+    elif isinstance(index, faiss.IndexHNSW):
+        sweep = [("efSearch", ef, search_parameters(index, ef_search=ef)) for ef in EF_SEARCH_SWEEP]
+    else:
+        sweep = [("-", "-", None)]
+
+    print(f"\nrecall@{k} vs exact search ({queries} queries, exact {exact_ms:.3f} ms/query)")
+    print(f"{'param':>9} {'value':>6} {'recall':>8} {'ms/query':>9} {'speedup':>8}")
+    for name, value, params in sweep:
+        _, found = index.search(noisy, k, params=params)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)])
+        ms = _latency_ms(index, noisy, k, params)
+        print(f"{name:>9} {value:>6} {recall:>8.4f} {ms:>9.3f} {exact_ms / ms:>7.1f}x")
+
+
+def _latency_ms(index: faiss.Index, queries: np.ndarray, k: int, params) -> float:
+    # 서비스는 요청마다 쿼리 한 개씩 검색하므로 한 개씩 측정
+    sample = queries[:200]
+    start = time.perf_counter()
+    for query in sample:
+        index.search(query[None, :], k, params=params)
+    return (time.perf_counter() - start) * 1000 / len(sample)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="사운드 카탈로그 FAISS 인덱스 생성")
+    parser.add_argument("--sound-pool", default="data/sound_pool.json")     # 여기서 원본 데이터 읽음
+    parser.add_argument("--output", default="data/sound_index.faiss")       # 여기다가 결과물 저장
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE)
+    parser.add_argument("--nlist", type=int, default=FAISS_NLIST, help="IVF 클러스터 수 (0이면 자동)")
+    parser.add_argument("--pq-m", type=int, default=FAISS_PQ_M)
+    parser.add_argument("--pq-bits", type=int, default=FAISS_PQ_BITS)
+    parser.add_argument("--hnsw-m", type=int, default=FAISS_HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=FAISS_EF_CONSTRUCTION)
+    parser.add_argument("--vectors-from", help="벡터를 꺼내 쓸 기존 flat 인덱스 경로")
+    parser.add_argument("--report", action="store_true", help="정확 검색 대비 recall / 지연 시간 리포트 출력")
+    parser.add_argument("--embedding-store", default=DEFAULT_STORE_PATH, help="임베딩 저장소 경로 (빈 문자열이면 사용 안 함)")
+    parser.add_argument("--rebuild", action="store_true", help="기존 인덱스에 추가하지 않고 항상 새로 생성")
+    parser.add_argument("--bulk", action="store_true", help="대규모 카탈로그용 병렬 임베딩 (프로세스 풀 + memmap, 이어서 진행 가능)")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="--bulk 작업 프로세스 수")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="--bulk 배치 크기")
+    parser.add_argument("--torch-threads", type=int, default=None, help="--bulk 프로세스당 torch 스레드 수 (기본: 코어 수 / 프로세스 수)")
+    parser.add_argument("--restart", action="store_true", help="--bulk 중단된 빌드를 이어서 하지 않고 처음부터")
+    args = parser.parse_args()
+
     build_faiss_index(
-        "data/sound_pool.json",     # 여기서 원본 데이터 읽음
-        "data/sound_index.faiss"    # 여기다가 결과물 저장
-    )
\ No newline at end of file
+        args.sound_pool,
+        args.output,
+        args.index_type,
+        vectors_from=args.vectors_from,
+        report=args.report,
+        embedding_store=args.embedding_store,
+        rebuild=args.rebuild,
+        bulk=args.bulk,
+        bulk_options={
+            "workers": args.workers,
+            "batch_size": args.batch_size,
+            "torch_threads": args.torch_threads,
+            "resume": not args.restart
+        },
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        pq_bits=args.pq_bits,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction
+    )
@@ -0,0 +1,99 @@
+# phrase_table_benchmark.py
+# 조합 임베딩(문구 테이블)과 전체 문장 임베딩의 검색 결과 일치율 / 속도 비교
+#
+# 실행 (프로젝트 루트에서, build_phrase_table 이후):
+#   python3 -m scripts.phrase_table_benchmark [--samples 500] [--top-k 3 5 10]
+#
+# 무작위 설문(utils/survey_enums.py 선택지)마다 두 방식으로 쿼리 벡터를 만들고
+# 실제 검색 경로(search_candidates: 서비스와 같은 top_k로 검색 + 카테고리 다양성)로 받은 추천 순서를
+# 앞에서부터 k개씩 잘라 비교합니다.
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from services.embedding_backends import get_backend
+from services.query_embedding import PHRASE_TABLE_PATH, PhraseTable
+from services.rag_recommender import search_candidates
+from utils.prompt_builder import join_phrases, survey_field_values
+from utils.survey_enums import MULTI_SELECT_FIELDS, SURVEY_ENUMS
+
+
+def random_survey(rng: random.Random) -> tuple:
+    """무작위 설문과 (번역된) noisePreferenceOther 값"""
+    survey = {}
+    for field, choices in SURVEY_ENUMS.items():
+        if field == "noisePreferenceOther" or rng.random() < 0.1:
+            continue
+        if field in MULTI_SELECT_FIELDS:
+            survey[field] = rng.sample(choices, rng.randint(1, min(3, len(choices))))
+        else:
+            survey[field] = rng.choice(choices)
+    translated = rng.choice(SURVEY_ENUMS["noisePreferenceOther"]) if rng.random() < 0.3 else ""
+    return survey, translated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="조합 임베딩 vs 전체 문장 임베딩 비교")
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--table", default=PHRASE_TABLE_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    table = PhraseTable.load(args.table)
+    backend = get_backend()
+    print(f"Phrase table: {len(table)} phrases ({table.model}), query backend: {backend.fingerprint}")
+
+    field_values_list, prompts = [], []
+    for _ in range(args.samples):
+        survey, translated = random_survey(rng)
+        field_values = survey_field_values(survey, translated)
+        field_values_list.append(field_values)
+        prompts.append(join_phrases(field_values))
+
+    # 전체 문장 임베딩 (요청 하나씩 처리하는 서비스 조건과 맞춰 한 문장씩 측정)
+    backend.encode(prompts[:1])
+    start = time.perf_counter()
+    exact = np.array([backend.encode([prompt])[0] for prompt in prompts], dtype="float32")
+    exact_ms = (time.perf_counter() - start) * 1000 / len(prompts)
+
+    start = time.perf_counter()
+    composed = [table.compose(field_values) for field_values in field_values_list]
+    compose_ms = (time.perf_counter() - start) * 1000 / len(prompts)
+
+    covered = [i for i, vector in enumerate(composed) if vector is not None]
+    print(f"Coverage: {len(covered)}/{len(prompts)} surveys composable")
+    if not covered:
+        return
+
+    exact = exact[covered]
+    composed = np.array([composed[i] for i in covered], dtype="float32")
+    cosines = np.sum(exact * composed, axis=1) / (
+        np.linalg.norm(exact, axis=1) * np.linalg.norm(composed, axis=1)
+    )
+
+    # 서비스와 같은 깊이(search_candidates 기본 top_k)로 검색한 뒤 다양성 필터를 거친 순서에서 k개씩 자름
+    exact_results, composed_results = (
+        [candidates.sounds(row) for row in range(len(candidates))]
+        for candidates in (search_candidates(exact), search_candidates(composed))
+    )
+
+    print(f"Query vector cosine: mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+    print(f"Latency per query: exact {exact_ms:.2f} ms, compositional {compose_ms:.4f} ms")
+    print(f"{'k':>4} {'overlap mean':>13} {'overlap min':>12} {'top-1 match':>12}")
+    for k in args.top_k:
+        overlaps = []
+        for a, b in zip(exact_results, composed_results):
+            a_ids = {s["filename"] for s in a[:k]}
+            b_ids = {s["filename"] for s in b[:k]}
+            overlaps.append(len(a_ids & b_ids) / max(len(a_ids), 1))
+        top1 = np.mean([a[0]["filename"] == b[0]["filename"] for a, b in zip(exact_results, composed_results)])
+        print(f"{k:>4} {np.mean(overlaps):>13.3f} {np.min(overlaps):>12.3f} {top1:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# ranking_parity.py
+# 행렬 검색 엔진(RetrievalEngine)과 (사용자 × 후보) 점수 행렬이 기존 FAISS 검색 / 후보별 점수 계산 루프와
+# 같은 추천 순서 / 점수를 내는지 확인
+#
+# 실행 (프로젝트 루트에서):
+#   python3 -m scripts.ranking_parity [--queries 2000] [--top-k 22 10 5] [--seed 0]
+#
+# 임베딩 모델 없이 카탈로그 벡터로 쿼리를 만듭니다. 서비스 쿼리 임베딩과 같이 정규화한 벡터를 사용합니다.
+# (기존 L2 거리 점수는 노름에 따라 달라지고 새 엔진은 코사인 기준이므로, 두 경로는 단위 벡터에서 같음)
+#   catalog  - 사운드 벡터 그대로 (자기 자신이 1위)
+#   noisy    - 사운드 벡터에 작은 잡음 (비슷한 유사도가 몰리는 경우)
+#   random   - 무작위 방향
+# 기준 경로는 변경 전 구현을 그대로 옮긴 것
+#   retrieval - FAISS IndexFlatL2 검색 → 1/(1+d) → 카테고리별 상위 2개 (dict 그룹화 / 정렬)
+#   scoring   - 위 결과에 후보별 루프로 similarity + alpha * 선호도 + beta * 효과성 → 정렬
+#               (쿼리마다 무작위 선호 사운드 / 이전 추천 / 점수 변화 / preferenceBalance, 20%는 유사도 순서 그대로)
+#               새 경로는 전체 쿼리를 한 번에 score_matrix / rank_order (배치 추천과 같은 방식)
+#
+# 출력 항목:
+#   order     - 추천 filename 순서가 완전히 같은 쿼리 비율
+#   tie-only  - 순서가 다른 쿼리 중 바뀐 자리의 점수 차이가 --tolerance 이하 (float32 반올림 차이)인 쿼리 수
+#   max |Δs|  - 같은 사운드의 점수 (retrieval은 similarity_score, scoring은 최종 점수) 최대 차이
+# 동점이 아닌 순서 차이나 허용치를 넘는 점수 차이가 있으면 종료 코드 1
+
+import argparse
+import json
+import random
+import sys
+
+import faiss
+import numpy as np
+
+from services.rag_recommender import INDEX_PATH, SOUND_POOL_PATH, build_engine
+from services.score_calculator import UserWeights, choose_weights, compute_effectiveness, rank_order, score_matrix, softmax_rank_weights
+
+
+def baseline_recommend(index: faiss.Index, sound_pool: list, query_vectors: np.ndarray, top_k: int) -> list:
+    """변경 전 recommend_by_vectors (FAISS 검색 + _diversify)"""
+    D, I = index.search(np.ascontiguousarray(query_vectors, dtype="float32"), top_k)
+    S = 1.0 / (1.0 + D)
+    return [_baseline_diversify(scores, indices, top_k, sound_pool) for scores, indices in zip(S, I)]
+
+
+def _baseline_diversify(scores: np.ndarray, indices: np.ndarray, top_k: int, sound_pool: list) -> list:
+    results = []
+    for similarity_score, index in zip(scores, indices):
+        if index < 0:
+            continue
+        sound = sound_pool[index].copy()
+        sound['similarity_score'] = similarity_score
+        results.append(sound)
+
+    categories = {}
+    for sound in results:
+        categories.setdefault(sound.get('category', '기타'), []).append(sound)
+
+    diverse_results = []
+    for sounds in categories.values():
+        diverse_results.extend(sorted(sounds, key=lambda x: x['similarity_score'], reverse=True)[:2])
+    diverse_results = sorted(diverse_results, key=lambda x: x['similarity_score'], reverse=True)
+    return diverse_results[:top_k]
+
+
+def baseline_final_scores(candidates: list, preferred_ids: list, effectiveness_input: dict, balance=None) -> list:
+    """변경 전 compute_final_scores (후보별 dict 조회 루프 + sorted)"""
+    alpha, beta = choose_weights(balance=balance)
+    pref_weights = softmax_rank_weights(preferred_ids)
+    eff_weights = compute_effectiveness(**effectiveness_input)
+    scored = []
+    for sound in candidates:
+        sid = sound["filename"]
+        score = sound.get("similarity_score", 0) + alpha * pref_weights.get(sid, 0) + beta * eff_weights.get(sid, 0)
+        scored.append({"id": sid, "score": score})
+    return sorted(scored, key=lambda x: x["score"], reverse=True)
+
+
+def random_user(rng: random.Random, filenames: list):
+    """(preferred_ids, effectiveness_input, balance) 또는 유사도 순서 그대로인 사용자(None)"""
+    if rng.random() < 0.2:
+        return None
+    # 카탈로그에 없는 사운드도 가끔 섞음 (정수 코드 -1 경로)
+    names = filenames + ["unknown.mp3"]
+    previous = rng.sample(names, rng.randint(0, 3))
+    return (
+        rng.sample(names, rng.randint(0, 5)),
+        {
+            "prev_score": rng.randint(0, 100),
+            "curr_score": rng.randint(0, 100),
+            "main_sounds": previous[:1],
+            "sub_sounds": previous[1:]
+        },
+        rng.choice([None, round(rng.random(), 2)])
+    )
+
+
+def make_queries(vectors: np.ndarray, count: int, rng: np.random.Generator) -> dict:
+    """쿼리 종류별 정규화된 (N, d) 벡터"""
+    picks = rng.integers(0, len(vectors), size=count)
+    queries = {
+        "catalog": vectors,
+        "noisy": vectors[picks] + rng.normal(0, 0.05, size=(count, vectors.shape[1])),
+        "random": rng.normal(0, 1, size=(count, vectors.shape[1]))
+    }
+    return {kind: (q / np.linalg.norm(q, axis=1, keepdims=True)).astype("float32") for kind, q in queries.items()}
+
+
+def retrieval_rows(index, engine, sound_pool, query_vectors, top_k, rng) -> tuple:
+    """쿼리별 (filename, similarity_score) 목록 - (기준, 새 경로)"""
+    as_pairs = lambda sounds: [(sound["filename"], float(sound["similarity_score"])) for sound in sounds]
+    expected = baseline_recommend(index, sound_pool, query_vectors, top_k)
+    actual = engine.recommend(query_vectors, top_k)
+    return [as_pairs(sounds) for sounds in expected], [as_pairs(sounds) for sounds in actual]
+
+
+def scoring_rows(index, engine, sound_pool, query_vectors, top_k, rng) -> tuple:
+    """쿼리별 (filename, 최종 점수) 목록 - (기준, 새 경로)"""
+    filenames = [sound["filename"] for sound in sound_pool]
+    users = [random_user(rng, filenames) for _ in range(len(query_vectors))]
+
+    expected = []
+    for sounds, user in zip(baseline_recommend(index, sound_pool, query_vectors, top_k), users):
+        if user is None:
+            expected.append([(sound["filename"], float(sound["similarity_score"])) for sound in sounds])
+        else:
+            expected.append([(item["id"], float(item["score"])) for item in baseline_final_scores(sounds, *user)])
+
+    candidates = engine.candidates(query_vectors, top_k)
+    weights = [UserWeights.similarity_only() if user is None else UserWeights(*user) for user in users]
+    scores = score_matrix(candidates.similarity, candidates.filename_codes, weights, engine.filename_codes_of)
+    order = rank_order(scores)
+    actual = []
+    for row in range(len(candidates)):
+        sounds = candidates.sounds(row, order[row])
+        actual.append([(sound["filename"], float(score)) for sound, score in zip(sounds, scores[row, order[row]].tolist())])
+    return expected, actual
+
+
+def compare(expected: list, actual: list, tolerance: float) -> tuple:
+    """(filename, 점수) 목록 비교 → (순서 일치, 동점 차이만 있음, 같은 사운드의 최대 점수 차이)"""
+    expected_scores, actual_scores = dict(expected), dict(actual)
+    common = expected_scores.keys() & actual_scores.keys()
+    max_delta = max((abs(expected_scores[name] - actual_scores[name]) for name in common), default=0.0)
+    if [name for name, _ in expected] == [name for name, _ in actual]:
+        return True, False, max_delta
+    # 바뀐 자리의 기준 점수가 서로 허용치 안이면 동점 순서 차이
+    tie_only = len(expected) == len(actual) and all(
+        abs(a[1] - b[1]) <= tolerance for a, b in zip(expected, actual) if a[0] != b[0]
+    )
+    return False, tie_only, max_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="행렬 검색 / 점수 계산 vs 기존 FAISS 검색 / 점수 루프 비교")
+    parser.add_argument("--queries", type=int, default=2000, help="noisy / random 쿼리 수 (각각)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[22, 10, 5], help="22는 서비스 기본값, 카탈로그보다 작으면 argpartition 경로")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="float32 연산 순서 차이로 허용하는 점수 차이")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--sound-pool", default=SOUND_POOL_PATH)
+    args = parser.parse_args()
+
+    with open(args.sound_pool, "r", encoding="utf-8") as f:
+        sound_pool = json.load(f)
+    index = faiss.read_index(args.index)
+    engine = build_engine(index, sound_pool)
+    vectors = index.reconstruct_n(0, index.ntotal)
+    queries = make_queries(vectors, args.queries, np.random.default_rng(args.seed))
+    print(f"Catalog: {len(sound_pool)} sounds, {len(engine.category_names)} categories, index {engine.index_type}")
+
+    failed = False
+    rng = random.Random(args.seed)
+    print(f"{'path':<10} {'queries':<9} {'top_k':>5} {'n':>6} {'order':>8} {'tie-only':>9} {'max |Δs|':>10}")
+    for path, rows in (("retrieval", retrieval_rows), ("scoring", scoring_rows)):
+        for top_k in args.top_k:
+            for kind, query_vectors in queries.items():
+                expected, actual = rows(index, engine, sound_pool, query_vectors, top_k, rng)
+                results = [compare(e, a, args.tolerance) for e, a in zip(expected, actual)]
+                same = sum(r[0] for r in results)
+                ties = sum(r[1] for r in results)
+                max_delta = max(r[2] for r in results)
+                print(f"{path:<10} {kind:<9} {top_k:>5} {len(results):>6} {same / len(results):>8.2%} {ties:>9} {max_delta:>10.2e}")
+                failed |= same + ties < len(results) or max_delta > args.tolerance
+
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
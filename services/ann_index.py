@@ -0,0 +1,99 @@
+# ann_index.py
+# 사운드 카탈로그용 FAISS 인덱스 종류 (정확 검색 / 근사 최근접 이웃)
+# - flat: IndexFlatL2 (정확 검색, 기본) → 서버에서는 NumPy 행렬 검색(rag_recommender.RetrievalEngine)으로 처리
+# - ivf_flat: 벡터를 nlist개 클러스터로 나누고 검색 시 가까운 nprobe개 클러스터만 비교
+# - ivf_pq: ivf_flat + 벡터를 PQ 코드로 압축 (메모리 절약, 거리는 근사값)
+# - hnsw: 그래프 기반 검색, efSearch가 클수록 정확하고 느림
+# 모두 L2 거리 (임베딩이 정규화되어 있으므로 코사인 순서와 같음)
+
+import math
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# 인덱스 빌더(scripts/index_builder.py) 기본값
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))  # 0이면 카탈로그 크기로 자동 결정
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))  # 서브 벡터 수 (384 / 48 = 8차원씩)
+FAISS_PQ_BITS = int(os.getenv("FAISS_PQ_BITS", "8"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+
+# 검색 시 기본값 (요청마다 nprobe / ef_search 쿼리 파라미터로 덮어쓸 수 있음)
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+
+def default_nlist(count: int) -> int:
+    """클러스터 수: 4·√N, 클러스터마다 학습 벡터가 39개 이상 되도록 제한"""
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str = FAISS_INDEX_TYPE,
+    nlist: int = FAISS_NLIST,
+    pq_m: int = FAISS_PQ_M,
+    pq_bits: int = FAISS_PQ_BITS,
+    hnsw_m: int = FAISS_HNSW_M,
+    ef_construction: int = FAISS_EF_CONSTRUCTION
+) -> faiss.Index:
+    """(N, D) 벡터로 index_type 인덱스를 학습 / 생성합니다. 인덱스 id는 벡터 순서(sound_pool 순서)와 같습니다."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    count, dim = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(count)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            if dim % pq_m:
+                raise ValueError(f"벡터 차원({dim})이 FAISS_PQ_M({pq_m})으로 나누어떨어지지 않습니다.")
+            if count < 2 ** pq_bits:
+                raise ValueError(f"ivf_pq 학습에는 벡터가 {2 ** pq_bits}개 이상 필요합니다. (현재 {count}개)")
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+        index.train(vectors)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        raise ValueError(f"지원하지 않는 인덱스 종류입니다: {index_type} (사용 가능: {', '.join(INDEX_TYPES)})")
+
+    index.add(vectors)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """읽어온 인덱스의 종류 이름"""
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    raise ValueError(f"지원하지 않는 인덱스 종류입니다: {type(index).__name__}")
+
+
+def search_parameters(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None
+) -> Optional[faiss.SearchParameters]:
+    """
+    검색 한 번에만 적용되는 파라미터 (인덱스 객체를 바꾸지 않으므로 동시 요청끼리 간섭 없음)
+    IVF는 nprobe, HNSW는 efSearch를 사용하고, 값이 없으면 FAISS_NPROBE / FAISS_EF_SEARCH
+    """
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=min(nprobe or FAISS_NPROBE, index.nlist))
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or FAISS_EF_SEARCH)
+    return None
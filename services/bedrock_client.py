@@ -0,0 +1,332 @@
+# bedrock_client.py
+# Bedrock 호출 전용 클라이언트
+# - 커넥션 풀 크기 / 동시 호출 수 상한 (세마포어) / 호출별 connect·read 타임아웃
+# - 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 동안 Bedrock을 호출하지 않고 바로 실패 → 호출 측은 기본 멘트로 대체
+# - 상태는 모두 /metrics로 노출
+# - 동시 호출 상한 / 서킷 브레이커 / 지표는 GuardedLLMClient에 있어 로컬 LLM 백엔드(services/llm_providers.py)도 함께 사용
+
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import quote
+
+import boto3
+import httpx
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.eventstream import EventStreamBuffer
+
+from services.logger import get_logger
+from services.metrics import Counter, Gauge, Histogram
+
+logger = get_logger(__name__)
+
+# Bedrock 리전 / 엔드포인트
+REGION_NAME = "us-east-1"
+BEDROCK_ENDPOINT = f"https://bedrock-runtime.{REGION_NAME}.amazonaws.com"
+
+# Claude 3 Haiku
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+# 워커 하나가 동시에 유지할 수 있는 Bedrock 연결 수 (커넥션 풀 상한)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+
+# 워커 하나가 동시에 보내는 Bedrock 호출 수 상한 / 자리가 날 때까지 기다리는 최대 시간 (초)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_ACQUIRE_TIMEOUT = float(os.getenv("LLM_ACQUIRE_TIMEOUT", "2"))
+
+# 호출 타임아웃 (초) - read는 응답 바이트 사이의 최대 간격
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+
+# 서킷 브레이커: 연속 실패 횟수 기준 / 열린 뒤 다시 시도해보기까지의 시간 (초)
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+LLM_CALLS = Counter(
+    "llm_calls_total",
+    "LLM calls by outcome (success, error, timeout, circuit_open, busy).",
+    ["kind", "outcome"]
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "LLM call duration including the whole response stream.",
+    ["kind"]
+)
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM calls currently holding a concurrency slot.")
+LLM_WAITING = Gauge("llm_waiting", "Calls waiting for an LLM concurrency slot.")
+LLM_MAX_CONCURRENCY_GAUGE = Gauge("llm_max_concurrency", "Configured LLM concurrency cap.")
+LLM_CIRCUIT_STATE = Gauge("llm_circuit_state", "Circuit breaker state (0=closed, 1=half_open, 2=open).")
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_transitions_total",
+    "Circuit breaker state changes.",
+    ["state"]
+)
+
+
+class LLMUnavailableError(Exception):
+    """Bedrock을 호출하지 않고 바로 실패한 경우 (reason: circuit_open | busy)"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def fallback_reason(error: Exception) -> str:
+    """기본 멘트로 대체된 이유 (LLM_FALLBACKS 라벨)"""
+    if isinstance(error, LLMUnavailableError):
+        return error.reason
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    return "error"
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold번 쌓이면 열림(open) → reset_seconds 동안 호출 차단.
+    그 뒤 한 번의 시험 호출(half_open)이 성공하면 닫히고, 실패하면 다시 열립니다.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        LLM_CIRCUIT_STATE.set(0)
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지. half_open에서는 시험 호출 하나만 허용합니다."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def release(self):
+        """성공 / 실패로 판단할 수 없이 끝난 호출 (취소 등)의 시험 호출 자리를 반납합니다."""
+        self._probe_in_flight = False
+
+    def _transition(self, state: str):
+        logger.warning("LLM circuit breaker state changed", extra={"from_state": self.state, "to_state": state})
+        self.state = state
+        LLM_CIRCUIT_STATE.set(self._STATE_VALUES[state])
+        LLM_CIRCUIT_TRANSITIONS.inc(state=state)
+
+
+def _is_breaker_failure(error: Exception) -> bool:
+    # Bedrock이 느리거나 죽은 경우만 실패로 셈 (요청 본문 오류 같은 4xx는 제외)
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, RuntimeError))
+
+
+class GuardedLLMClient:
+    """
+    LLM 백엔드 공통: 동시 호출 상한 + 서킷 브레이커 + 호출 지표.
+    하위 클래스는 invoke / invoke_stream에서 _acquire로 자리를 얻고, 끝나면 결과와 함께 _release를 호출합니다.
+    """
+
+    # 백엔드 이름 (LLM_BACKEND 값) / 같은 요청에 같은 응답을 내는 모델인지 구분하는 값 (멘트 캐시 키에 사용)
+    name = ""
+    fingerprint = ""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+        self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._in_flight = 0
+        self._waiting = 0
+        LLM_MAX_CONCURRENCY_GAUGE.set(LLM_MAX_CONCURRENCY)
+
+    def utilization(self) -> float:
+        """(사용 중 + 자리를 기다리는 호출 수) / 동시 호출 상한 (1 이상이면 대기 중인 호출이 있음)"""
+        return (self._in_flight + self._waiting) / LLM_MAX_CONCURRENCY
+
+    def circuit_open(self) -> bool:
+        """서킷 브레이커가 열려 호출이 바로 실패하는 상태인지"""
+        return self.breaker.state == CircuitBreaker.OPEN
+
+    def load(self):
+        """워밍업에서 호출 전에 필요한 준비를 합니다. (실패하면 예외)"""
+
+    async def close(self):
+        """앱 종료 시 연결 등을 정리합니다."""
+
+    async def _acquire(self, kind: str):
+        """서킷 브레이커와 동시 호출 상한을 통과해야 호출할 수 있습니다."""
+        if not self.breaker.allow():
+            LLM_CALLS.inc(kind=kind, outcome="circuit_open")
+            raise LLMUnavailableError("circuit_open", "LLM circuit breaker is open")
+        LLM_WAITING.inc()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), LLM_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            LLM_CALLS.inc(kind=kind, outcome="busy")
+            raise LLMUnavailableError("busy", f"No LLM slot within {LLM_ACQUIRE_TIMEOUT}s")
+        finally:
+            LLM_WAITING.dec()
+            self._waiting -= 1
+        LLM_IN_FLIGHT.inc()
+        self._in_flight += 1
+
+    def _release(self, kind: str, started: float, error: Optional[BaseException]):
+        self._semaphore.release()
+        LLM_IN_FLIGHT.dec()
+        self._in_flight -= 1
+        LLM_CALL_DURATION.observe(time.perf_counter() - started, kind=kind)
+        if error is None:
+            self.breaker.record_success()
+            LLM_CALLS.inc(kind=kind, outcome="success")
+        elif isinstance(error, Exception) and _is_breaker_failure(error):
+            self.breaker.record_failure()
+            LLM_CALLS.inc(kind=kind, outcome=fallback_reason(error))
+        else:
+            # 취소되었거나 요청 자체의 문제 → LLM 백엔드 상태와 무관
+            self.breaker.release()
+            LLM_CALLS.inc(kind=kind, outcome="error" if isinstance(error, Exception) else "cancelled")
+
+
+class BedrockClient(GuardedLLMClient):
+    """SigV4 서명 + 동시 호출 상한 + 서킷 브레이커를 갖춘 Bedrock InvokeModel 비동기 클라이언트"""
+
+    name = "bedrock"
+    fingerprint = MODEL_ID
+
+    def __init__(self):
+        super().__init__()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._aws_session: Optional[boto3.Session] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+            )
+        return self._http_client
+
+    async def close(self):
+        """앱 종료 시 커넥션 풀을 정리합니다."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def load(self):
+        if self.load_credentials() is None:
+            raise RuntimeError("AWS 자격 증명을 찾을 수 없습니다.")
+
+    def load_credentials(self):
+        """
+        boto3 자격 증명 체인(환경변수 / 프로필 / 인스턴스 메타데이터)에서 자격 증명을 찾습니다.
+        첫 조회는 메타데이터 서버 호출로 느릴 수 있어 워밍업에서 미리 호출합니다.
+        """
+        if self._aws_session is None:
+            self._aws_session = boto3.Session(region_name=REGION_NAME)
+        return self._aws_session.get_credentials()
+
+    def _signed_headers(self, url: str, body: bytes, accept: str) -> Dict[str, str]:
+        credentials = self.load_credentials()
+        request = AWSRequest(
+            method="POST",
+            url=url,
+            data=body,
+            headers={"Content-Type": "application/json", "Accept": accept}
+        )
+        # 자격 증명이 없으면 NoCredentialsError 발생
+        SigV4Auth(
+            credentials.get_frozen_credentials() if credentials else None,
+            "bedrock",
+            REGION_NAME
+        ).add_auth(request)
+        return dict(request.headers.items())
+
+    async def invoke(self, body: str, read_timeout: Optional[float] = None) -> Dict:
+        """InvokeModel을 호출하고 응답 JSON을 반환합니다."""
+        url = f"{BEDROCK_ENDPOINT}/model/{quote(MODEL_ID, safe='')}/invoke"
+        payload = body.encode("utf-8")
+        timeout = httpx.Timeout(read_timeout or LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+        await self._acquire("invoke")
+        started, error = time.perf_counter(), None
+        try:
+            response = await self._client().post(
+                url,
+                content=payload,
+                headers=self._signed_headers(url, payload, "application/json"),
+                timeout=timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release("invoke", started, error)
+
+    async def invoke_stream(self, body: str) -> AsyncIterator[Dict]:
+        """
+        InvokeModelWithResponseStream을 호출하고,
+        AWS event-stream 응답을 디코딩해 Claude 스트리밍 이벤트(dict)를 순서대로 내보냅니다.
+        스트림이 끝날 때까지 동시 호출 자리를 차지합니다.
+        """
+        url = f"{BEDROCK_ENDPOINT}/model/{quote(MODEL_ID, safe='')}/invoke-with-response-stream"
+        payload = body.encode("utf-8")
+
+        await self._acquire("stream")
+        started, error = time.perf_counter(), None
+        try:
+            headers = self._signed_headers(url, payload, "application/vnd.amazon.eventstream")
+            async with self._client().stream("POST", url, content=payload, headers=headers) as response:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                event_buffer = EventStreamBuffer()
+                async for raw in response.aiter_bytes():
+                    event_buffer.add_data(raw)
+                    for message in event_buffer:
+                        message_type = message.headers.get(":message-type")
+                        if message_type == "exception":
+                            raise RuntimeError(
+                                f"Bedrock stream error ({message.headers.get(':exception-type')}): "
+                                f"{message.payload.decode('utf-8', 'replace')}"
+                            )
+                        if message.headers.get(":event-type") != "chunk":
+                            continue
+                        chunk = json.loads(message.payload)
+                        yield json.loads(base64.b64decode(chunk["bytes"]))
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release("stream", started, error)
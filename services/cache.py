@@ -0,0 +1,170 @@
+# cache.py
+# 프로세스 내 LRU 캐시와 재시작 후에도 유지되는 sqlite 저장소
+# - 히트 / 미스 / 축출 수는 /metrics로 노출 (cache 라벨로 구분)
+# - 디스크 캐시(LazySqliteStore)는 경로가 설정된 경우에만 처음 사용할 때 열고, 오류는 미스 / 저장 생략으로 처리
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from services.logger import get_logger
+from services.metrics import Counter, Gauge
+
+logger = get_logger(__name__)
+
+CACHE_HITS = Counter("cache_hits_total", "Cache lookups that found an entry.", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache lookups that found nothing.", ["cache"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted from a bounded cache.", ["cache"])
+CACHE_ENTRIES = Gauge("cache_entries", "Entries currently held by a cache.", ["cache"])
+CACHE_ERRORS = Counter("cache_errors_total", "Disk cache operations that failed and were skipped.", ["cache", "operation"])
+
+
+class LRUCache:
+    """
+    크기 제한이 있는 스레드 안전 LRU 캐시. max_size가 0이면 아무것도 저장하지 않습니다.
+    ttl_seconds를 주면 저장 후 그 시간이 지난 항목은 없는 것으로 취급합니다.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: Optional[float] = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key → (value, 만료 시각 또는 None)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] is not None and entry[1] <= time.monotonic():
+                    del self._entries[key]
+                else:
+                    value = entry[0]
+                    self._entries.move_to_end(key)
+        if value is None:
+            CACHE_MISSES.inc(cache=self.name)
+        else:
+            CACHE_HITS.inc(cache=self.name)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """get과 같지만 히트 / 미스 수와 LRU 순서를 바꾸지 않습니다. (같은 요청 안에서 다시 확인할 때)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.monotonic()):
+            return None
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        evicted = 0
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+            size = len(self._entries)
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+        CACHE_ENTRIES.set(size, cache=self.name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteStore:
+    """
+    문자열 키 → 바이트 값을 저장하는 sqlite 파일 저장소 (재시작 후에도 유지).
+    여러 스레드에서 하나의 연결을 잠금으로 공유합니다.
+    """
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self._conn.commit()
+        CACHE_ENTRIES.set(self._count(), cache=self.name)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            CACHE_MISSES.inc(cache=self.name)
+            return None
+        CACHE_HITS.inc(cache=self.name)
+        return row[0]
+
+    def put(self, key: str, value: bytes):
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT INTO entries (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+            self._conn.commit()
+        if exists is None:
+            CACHE_ENTRIES.inc(cache=self.name)
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class LazySqliteStore:
+    """
+    path가 설정된 경우에만 처음 사용할 때 SqliteStore를 여는 디스크 캐시. (path가 비어 있으면 항상 미스)
+    열기 / 조회 / 저장 오류(잠김, 손상, 디스크 부족 등)는 로그를 남기고 미스 / 저장 생략으로 처리해 캐시 때문에 요청이 실패하지 않습니다.
+    sqlite 호출은 블로킹이므로 이벤트 루프에서는 asyncio.to_thread로 호출합니다.
+    """
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self._store: Optional[SqliteStore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            store = self._open()
+            return store.get(key) if store is not None else None
+        except Exception as e:
+            CACHE_ERRORS.inc(cache=self.name, operation="get")
+            logger.error("Disk cache lookup failed, treating as a miss", extra={"cache": self.name, "error": str(e)})
+            return None
+
+    def put(self, key: str, value: bytes):
+        try:
+            store = self._open()
+            if store is not None:
+                store.put(key, value)
+        except Exception as e:
+            CACHE_ERRORS.inc(cache=self.name, operation="put")
+            logger.error("Disk cache write failed, skipping", extra={"cache": self.name, "error": str(e)})
+
+    def _open(self) -> Optional[SqliteStore]:
+        # 열기에 실패하면 다음 호출에서 다시 시도
+        if self.path and self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = SqliteStore(self.name, self.path)
+        return self._store
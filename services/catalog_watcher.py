@@ -0,0 +1,60 @@
+# catalog_watcher.py
+# 카탈로그 파일(FAISS 인덱스, 사운드 데이터)이 바뀌면 서버 재시작 없이 다시 읽기
+# - CATALOG_WATCH_INTERVAL초마다 두 파일의 버전(크기 / 수정 시각)을 확인
+# - 쓰는 중인 파일을 읽지 않도록 같은 새 버전이 두 번 연속 보일 때 교체
+# - 읽기에 실패한 버전은 파일이 다시 바뀔 때까지 재시도하지 않음 (기존 스냅샷 유지)
+
+import os
+import threading
+from typing import Optional
+
+from services.rag_recommender import catalog_holder, catalog_source_version
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 파일 확인 주기 (초, 0이면 감시 안 함 - POST /admin/catalog/reload로만 교체)
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+
+
+def watch_catalog(stop: threading.Event, interval: float = CATALOG_WATCH_INTERVAL):
+    """stop이 설정될 때까지 파일 버전을 확인하고, 바뀌었으면 catalog_holder.reload()를 호출합니다."""
+    candidate: Optional[str] = None
+    failed: Optional[str] = None
+    while not stop.wait(interval):
+        loaded = catalog_holder.loaded_version
+        if loaded is None:
+            # 첫 로드는 워밍업 / 첫 요청이 담당
+            continue
+        try:
+            version = catalog_source_version(catalog_holder.index_path, catalog_holder.sound_pool_path)
+        except OSError:
+            # 파일 교체 도중이면 다음 확인 때 다시 봄
+            candidate = None
+            continue
+
+        if version in (loaded, failed):
+            candidate = None
+            continue
+        if version != candidate:
+            candidate = version
+            continue
+
+        candidate = None
+        try:
+            catalog_holder.reload()
+            failed = None
+        except Exception:
+            # 오류 내용은 reload()에서 기록
+            failed = version
+
+
+def start_catalog_watcher(interval: float = CATALOG_WATCH_INTERVAL) -> Optional[threading.Event]:
+    """감시 스레드를 데몬으로 시작하고, 멈출 때 설정할 Event를 반환합니다. (interval이 0 이하면 시작하지 않음)"""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_catalog, args=(stop, interval), name="catalog-watcher", daemon=True)
+    thread.start()
+    logger.info("Catalog watcher started", extra={"interval": interval})
+    return stop
@@ -5,6 +5,10 @@ import os
 from typing import Dict, Optional, Any
 from fastapi import HTTPException
 
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
 class DataFetcher:
     def __init__(self):
         # 메인 서버 URL (환경변수에서 가져오거나 기본값 사용)
@@ -89,7 +93,7 @@ class DataFetcher:
         GET /sleep-data/user/{userID}/last
         """
         # 더미 데이터 반환 (메인서버에서 직접 데이터를 보내므로)
-        print(f"[DataFetcher] Using dummy sleep data for user {user_id}")
+        logger.info("Using dummy sleep data", extra={"user_id": user_id})
         return self._get_dummy_sleep_data(user_id)
     
     async def fetch_survey_data(self, user_id: str) -> Dict[str, Any]:
@@ -98,7 +102,7 @@ class DataFetcher:
         GET /users/survey/{userID}/result
         """
         # 더미 데이터 반환 (메인서버에서 직접 데이터를 보내므로)
-        print(f"[DataFetcher] Using dummy survey data for user {user_id}")
+        logger.info("Using dummy survey data", extra={"user_id": user_id})
         return self._get_dummy_survey_data(user_id)
     
     async def fetch_combined_data(self, user_id: str) -> Dict[str, Any]:
@@ -154,11 +158,11 @@ class DataFetcher:
                 "preferredFeedbackFormat": survey_data.get("preferredFeedbackFormat")
             }
             
-            print(f"[DataFetcher] Combined data for user {user_id}: {combined_data}")
+            logger.debug("Combined data fetched", extra={"user_id": user_id})
             return combined_data
             
         except Exception as e:
-            print(f"[DataFetcher] Error fetching combined data: {e}")
+            logger.error("Error fetching combined data", extra={"user_id": user_id, "error": str(e)})
             raise
 
 # 전역 인스턴스 생성
@@ -0,0 +1,144 @@
+# deadline.py
+# 요청 단위 지연 시간 예산(deadline)과 LLM 헤지 호출
+# - 요청 시작 시 start_deadline()으로 예산을 컨텍스트에 설정하고, 각 단계는 남은 시간 안에서만 기다림
+# - 번역은 예산이 모자라면 건너뛰고, LLM 멘트는 기본 멘트로 대체 → 사운드 목록은 항상 예산 안에 응답
+# - 헤지: 첫 LLM 호출이 LLM_HEDGE_AFTER_MS 안에 끝나지 않으면 같은 호출을 하나 더 보내고 먼저 성공한 쪽을 사용
+
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from services.metrics import Counter
+
+T = TypeVar("T")
+
+# 요청 하나의 기본 예산 (ms, 0이면 제한 없음 - 요청마다 deadline_ms 쿼리 파라미터로 덮어쓸 수 있음)
+RECOMMEND_DEADLINE_MS = int(os.getenv("RECOMMEND_DEADLINE_MS", "0"))
+
+# 남은 예산이 이보다 적으면 LLM을 호출하지 않고 바로 기본 멘트 사용 (ms)
+LLM_MIN_BUDGET_MS = int(os.getenv("LLM_MIN_BUDGET_MS", "300"))
+
+# 첫 LLM 호출 후 이 시간이 지나도 응답이 없으면 헤지 호출 (ms, 0이면 사용 안 함)
+LLM_HEDGE_AFTER_MS = int(os.getenv("LLM_HEDGE_AFTER_MS", "0"))
+
+DEADLINE_EXCEEDED = Counter(
+    "recommend_deadline_exceeded_total",
+    "Pipeline stages cut short because the request deadline ran out.",
+    ["stage"]
+)
+LLM_HEDGES = Counter(
+    "llm_hedge_total",
+    "Hedged LLM calls by outcome (fired, won, lost).",
+    ["outcome"]
+)
+
+
+class DeadlineExceeded(Exception):
+    """요청 예산 안에 단계를 끝낼 수 없을 때 발생"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded before '{stage}' finished")
+        self.stage = stage
+
+
+class Deadline:
+    """요청 하나의 남은 시간 (monotonic 기준)"""
+
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """남은 시간 (초, 0 이상)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def start_deadline(budget_ms: Optional[int] = None) -> Optional[Deadline]:
+    """현재 요청의 예산을 설정합니다. budget_ms가 없으면 RECOMMEND_DEADLINE_MS, 0 이하면 제한 없음."""
+    if budget_ms is None:
+        budget_ms = RECOMMEND_DEADLINE_MS
+    deadline = Deadline(budget_ms) if budget_ms > 0 else None
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def clear_deadline():
+    """현재 컨텍스트의 예산을 해제합니다. (이후 만드는 백그라운드 태스크가 요청 예산을 물려받지 않도록)"""
+    _current_deadline.set(None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def check_deadline(stage: str, min_remaining_ms: int = 0):
+    """남은 예산이 min_remaining_ms 이하이면 DeadlineExceeded를 발생시킵니다."""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.remaining() * 1000 <= min_remaining_ms:
+        DEADLINE_EXCEEDED.inc(stage=stage)
+        raise DeadlineExceeded(stage)
+
+
+async def within_deadline(stage: str, awaitable: Awaitable[T], min_remaining_ms: int = 0) -> T:
+    """
+    남은 예산 안에서만 awaitable을 기다립니다. 예산이 없으면 그대로 기다립니다.
+    시작 전에 예산이 모자라거나 기다리는 중에 다 쓰면 DeadlineExceeded.
+    """
+    try:
+        check_deadline(stage, min_remaining_ms)
+    except DeadlineExceeded:
+        # 실행하지 않은 코루틴이 경고를 남기지 않도록 정리
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except asyncio.TimeoutError:
+        DEADLINE_EXCEEDED.inc(stage=stage)
+        raise DeadlineExceeded(stage)
+
+
+async def hedged(make_call: Callable[[], Awaitable[T]], hedge_after_ms: int = LLM_HEDGE_AFTER_MS) -> Tuple[T, bool]:
+    """
+    make_call()을 실행하고, hedge_after_ms 안에 끝나지 않으면 한 번 더 실행해 먼저 성공한 결과를 사용합니다.
+    (결과, 헤지 호출이 이겼는지)를 반환합니다. 남은 호출은 취소합니다.
+    첫 호출이 헤지 전에 실패하면 재시도하지 않고 그대로 예외를 전달합니다. (재시도 폭주 방지)
+    """
+    primary = asyncio.ensure_future(make_call())
+    if hedge_after_ms <= 0:
+        return await primary, False
+
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after_ms / 1000)
+        if done:
+            return primary.result(), False
+
+        LLM_HEDGES.inc(outcome="fired")
+        pending.add(asyncio.ensure_future(make_call()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    won = task is not primary
+                    LLM_HEDGES.inc(outcome="won" if won else "lost")
+                    return task.result(), won
+                error = task.exception()
+        # 두 호출 모두 실패
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,152 @@
+# embedding_backends.py
+# 쿼리 임베딩 백엔드 (EMBEDDING_BACKEND로 선택)
+# - torch: SentenceTransformer (기존 방식, 인덱스 빌드와 동일)
+# - onnx: scripts/export_onnx.py로 내보낸 ONNX 모델을 onnxruntime으로 실행
+# - onnx-int8: 위 모델을 동적 양자화(int8)한 버전 (CPU 사용량 / 메모리 최소)
+
+import os
+import threading
+from functools import cached_property
+from typing import List
+
+import numpy as np
+
+from scripts.embed_generator import MODEL_ID, MODEL_NAME, get_model
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 사용할 임베딩 백엔드 ("torch" | "onnx" | "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+# export_onnx.py가 모델 / 토크나이저를 저장하는 디렉터리
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/bge-small-en-v1.5-onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+
+# onnxruntime 연산 스레드 수 (0이면 onnxruntime 기본값)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+
+# bge-small 임베딩 차원 / 최대 토큰 길이
+EMBEDDING_DIM = 384
+MAX_SEQ_LENGTH = 512
+
+
+class TorchBackend:
+    """SentenceTransformer(PyTorch)로 임베딩합니다."""
+
+    name = "torch"
+
+    @property
+    def fingerprint(self) -> str:
+        return MODEL_ID
+
+    def load(self):
+        get_model()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return get_model().encode(texts, batch_size=batch_size).astype("float32")
+
+
+class OnnxBackend:
+    """
+    내보낸 BERT 인코더를 onnxruntime으로 실행합니다.
+    SentenceTransformer(bge-small-en-v1.5)와 같은 방식으로 CLS 토큰 벡터를 쓰고 L2 정규화합니다.
+    """
+
+    def __init__(self, name: str, model_file: str, model_dir: str = ONNX_MODEL_DIR):
+        self.name = name
+        self.model_path = os.path.join(model_dir, model_file)
+        self.tokenizer_path = os.path.join(model_dir, ONNX_TOKENIZER_FILE)
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._lock = threading.Lock()
+
+    @cached_property
+    def fingerprint(self) -> str:
+        # 모델을 다시 내보내면 (크기 / 수정 시각이 바뀌면) 캐시된 임베딩을 쓰지 않도록
+        try:
+            stat = os.stat(self.model_path)
+            version = f"{stat.st_size}-{stat.st_mtime_ns}"
+        except OSError:
+            version = "missing"
+        return f"{self.name}:{MODEL_NAME}:{version}"
+
+    def load(self):
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is not None:
+                return
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(
+                    f"ONNX 모델이 없습니다: {self.model_path} (python3 -m scripts.export_onnx 로 먼저 내보내세요)"
+                )
+
+            tokenizer = Tokenizer.from_file(self.tokenizer_path)
+            tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+            tokenizer.enable_padding()
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+            session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+            self._input_names = [node.name for node in session.get_inputs()]
+            self._tokenizer = tokenizer
+            self._session = session
+            logger.info("ONNX embedding model loaded", extra={"backend": self.name, "path": self.model_path})
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        self.load()
+        if not texts:
+            return np.zeros((0, EMBEDDING_DIM), dtype="float32")
+        return np.concatenate([
+            self._encode_batch(texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype="int64"),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype="int64"),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype="int64"),
+        }
+        feeds = {name: inputs[name] for name in self._input_names}
+        last_hidden_state = self._session.run(None, feeds)[0]
+
+        # CLS 풀링 + L2 정규화
+        vectors = last_hidden_state[:, 0].astype("float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def create_backend(name: str):
+    """이름으로 임베딩 백엔드를 생성합니다."""
+    if name == "torch":
+        return TorchBackend()
+    if name == "onnx":
+        return OnnxBackend("onnx", ONNX_MODEL_FILE)
+    if name == "onnx-int8":
+        return OnnxBackend("onnx-int8", ONNX_INT8_MODEL_FILE)
+    raise ValueError(f"알 수 없는 EMBEDDING_BACKEND: {name} (torch | onnx | onnx-int8)")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """설정된 임베딩 백엔드를 반환합니다. (최초 호출 시 한 번만 생성)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(EMBEDDING_BACKEND)
+                logger.info("Embedding backend selected", extra={"backend": _backend.name, "model": MODEL_NAME})
+    return _backend
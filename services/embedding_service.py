@@ -1,11 +1,65 @@
 # embedding_service.py
+# 쿼리 임베딩 + 캐시
+# - 설문 기반 쿼리는 선택지 조합으로 만들어지므로 같은 문장이 반복해서 들어옴
+# - 키: sha256(백엔드 fingerprint + 정규화한 문장), 메모리 LRU → (선택) sqlite 순서로 조회
+
+import hashlib
+import os
+from typing import List, Optional
 
 import numpy as np
-from scripts.embed_generator import generate_embedding
+
+from services.cache import LazySqliteStore, LRUCache
+from services.embedding_backends import EMBEDDING_DIM, get_backend
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 메모리 캐시에 보관할 임베딩 수 (0이면 캐시 사용 안 함, 384차원 기준 1만 개 ≈ 15MB)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+# 디스크 캐시 파일 경로 (비어 있으면 디스크 캐시 사용 안 함, 예: cache/embeddings.sqlite)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+_memory_cache = LRUCache("embedding", EMBEDDING_CACHE_SIZE)
+# 임베딩은 CPU 스레드풀에서 실행되므로 디스크 캐시도 그 스레드에서 바로 호출
+_disk_cache = LazySqliteStore("embedding_disk", EMBEDDING_CACHE_PATH)
+
+
+def cache_key(text: str) -> str:
+    """백엔드(모델)와 공백을 정규화한 문장으로 캐시 키를 만듭니다."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{get_backend().fingerprint}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _lookup(key: str) -> Optional[np.ndarray]:
+    vector = _memory_cache.get(key)
+    if vector is not None:
+        return vector
+
+    blob = _disk_cache.get(key)
+    if blob is not None:
+        vector = np.frombuffer(blob, dtype="float32")
+        _memory_cache.put(key, vector)
+        return vector
+    return None
+
+
+def _store(key: str, vector: np.ndarray) -> np.ndarray:
+    # 캐시된 배열을 공유하므로 호출 측에서 실수로 수정하지 못하게 읽기 전용으로
+    vector = np.array(vector, dtype="float32")
+    vector.flags.writeable = False
+    _memory_cache.put(key, vector)
+
+    if _disk_cache.enabled:
+        _disk_cache.put(key, vector.tobytes())
+    return vector
+
 
 def embed_text(text: str) -> np.ndarray:
     """
-    실제 SentenceTransformer 모델을 사용하여 입력 문장을 임베딩 벡터로 변환
+    설정된 임베딩 백엔드(EMBEDDING_BACKEND)를 사용하여 입력 문장을 임베딩 벡터로 변환
+    (캐시에 있으면 모델을 거치지 않음)
 
     Args:
         text (str): 사용자로부터 입력받은 문장
@@ -13,4 +67,45 @@ def embed_text(text: str) -> np.ndarray:
     Returns:
         np.ndarray: 384차원의 float32 벡터
     """
-    return generate_embedding(text)
\ No newline at end of file
+    try:
+        key = cache_key(text)
+        cached = _lookup(key)
+        if cached is not None:
+            return cached
+        vector = get_backend().encode([text])[0]
+    except Exception as e:
+        logger.error("임베딩 생성 실패", extra={"error": str(e)})
+        return np.zeros(EMBEDDING_DIM, dtype="float32")  # fallback
+    return _store(key, vector)
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    여러 문장을 임베딩합니다. 캐시에 없는 문장만 모아 한 번의 배치 encode 호출로 처리합니다.
+
+    Args:
+        texts (List[str]): 임베딩할 문장 목록
+
+    Returns:
+        np.ndarray: (N, 384) float32 행렬
+    """
+    try:
+        keys = [cache_key(text) for text in texts]
+        vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype="float32")
+
+        # 같은 배치 안의 중복 문장도 한 번만 encode
+        missing = {}
+        for position, key in enumerate(keys):
+            cached = _lookup(key)
+            if cached is not None:
+                vectors[position] = cached
+            else:
+                missing.setdefault(key, []).append(position)
+
+        encoded = get_backend().encode([texts[positions[0]] for positions in missing.values()]) if missing else []
+    except Exception as e:
+        logger.error("배치 임베딩 생성 실패", extra={"error": str(e)})
+        return np.zeros((len(texts), EMBEDDING_DIM), dtype="float32")  # fallback
+
+    for (key, positions), vector in zip(missing.items(), encoded):
+        vectors[positions] = _store(key, vector)
+    return vectors
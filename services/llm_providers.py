@@ -0,0 +1,254 @@
+# llm_providers.py
+# LLM 백엔드 (LLM_BACKEND로 선택) - 추천 멘트 생성 / 자유 입력 번역(services/llm_service.py)이 모두 이 백엔드를 거침
+# - bedrock: Bedrock InvokeModel (services/bedrock_client.py, 기본)
+# - local: 네트워크 없이 요청 본문으로 정해지는 결정적 응답. 응답 시간 분포 / 토큰 단위 스트리밍 / 실패 주입을 설정할 수 있어
+#   AWS 없이 성능 측정 / 부하 테스트 / CI에 사용 (같은 설정과 시드면 같은 호출 순서에 같은 지연 / 실패)
+# 두 백엔드 모두 같은 동시 호출 상한 / 서킷 브레이커 / 지표(GuardedLLMClient)를 거칩니다.
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from services.bedrock_client import LLM_READ_TIMEOUT, BedrockClient, GuardedLLMClient
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 사용할 LLM 백엔드 ("bedrock" | "local")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "bedrock").lower()
+
+# local 백엔드: 첫 토큰까지의 시간 (ms, 분포의 중앙값) / 분포 / 분포 폭
+# 분포 폭: uniform은 ± ms, normal은 표준편차 ms, lognormal은 sigma (예: 0.5면 p95 ≈ 중앙값 × 2.3)
+LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", "800"))
+LOCAL_LLM_LATENCY_DIST = os.getenv("LOCAL_LLM_LATENCY_DIST", "fixed").lower()
+LOCAL_LLM_LATENCY_SPREAD = float(os.getenv("LOCAL_LLM_LATENCY_SPREAD", "0"))
+
+# local 백엔드: 번역 호출의 첫 토큰까지 시간 (비어 있으면 LOCAL_LLM_LATENCY_MS)
+LOCAL_LLM_TRANSLATE_LATENCY_MS = os.getenv("LOCAL_LLM_TRANSLATE_LATENCY_MS", "")
+
+# local 백엔드: 토큰 사이 간격 (ms) - 응답 전체 시간 = 첫 토큰까지 시간 + 토큰 수 × 간격
+LOCAL_LLM_TOKEN_MS = float(os.getenv("LOCAL_LLM_TOKEN_MS", "20"))
+
+# local 백엔드: 실패 주입 비율 (호출마다 error는 503 응답 / 스트림 중간 오류, timeout은 read 타임아웃)
+LOCAL_LLM_ERROR_RATE = float(os.getenv("LOCAL_LLM_ERROR_RATE", "0"))
+LOCAL_LLM_TIMEOUT_RATE = float(os.getenv("LOCAL_LLM_TIMEOUT_RATE", "0"))
+
+LOCAL_LLM_SEED = int(os.getenv("LOCAL_LLM_SEED", "0"))
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# 번역 요청의 max_tokens (llm_service.translate_korean_to_english)
+TRANSLATE_MAX_TOKENS = 64
+
+# 결정적 응답 문구 (요청 본문 해시로 고름)
+_TRANSLATION_WORDS = [
+    "calm", "gentle", "soft", "quiet", "warm", "rain", "ocean", "waves", "forest", "wind",
+    "piano", "birds", "stream", "night", "ambient", "white noise", "fireplace", "humming"
+]
+_OPENINGS = [
+    "오늘 하루도 정말 고생 많으셨어요.",
+    "요즘 잠드는 밤이 길게 느껴지셨죠?",
+    "하루의 끝에서 마음이 조금 무거우셨을 것 같아요.",
+]
+_SOUND_LINES = [
+    "{title}의 잔잔한 흐름이 지친 마음을 천천히 감싸 줄 거예요.",
+    "{title}의 부드러운 결을 따라 숨을 고르다 보면 몸이 한결 가벼워질 거예요.",
+    "{title}의 따뜻한 울림 속에서 오늘의 걱정은 조금씩 멀어질 거예요.",
+]
+_CLOSINGS = [
+    "오늘 밤은 이 소리들과 함께 깊고 편안한 쉼을 누리세요.",
+    "내일 아침엔 조금 더 가벼운 마음으로 눈을 뜨시길 바라요.",
+]
+
+_TITLE_PATTERN = re.compile(r"^- 제목: (.+?), 설명:", re.MULTILINE)
+_KOREAN_PATTERN = re.compile(r'Korean: "(.*)"', re.DOTALL)
+_TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+
+def local_response_text(body: str) -> str:
+    """요청 본문(Claude 메시지 JSON)으로 정해지는 응답 문장. 번역 요청이면 영어 단어, 아니면 추천 사운드 제목을 엮은 추천 멘트."""
+    request = json.loads(body)
+    prompt = request["messages"][0]["content"]
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+
+    if request.get("max_tokens", 0) <= TRANSLATE_MAX_TOKENS:
+        match = _KOREAN_PATTERN.search(prompt)
+        rng = random.Random(match.group(1)) if match else rng
+        return " ".join(rng.sample(_TRANSLATION_WORDS, 3))
+
+    titles = _TITLE_PATTERN.findall(prompt) or ["오늘의 사운드"]
+    lines = [rng.choice(_OPENINGS)]
+    lines += [rng.choice(_SOUND_LINES).format(title=title) for title in titles]
+    lines.append(rng.choice(_CLOSINGS))
+    return " ".join(lines)
+
+
+class LocalLLMBackend(GuardedLLMClient):
+    """
+    Bedrock 대신 로컬에서 응답하는 LLM 백엔드.
+    호출마다 첫 토큰까지 시간을 분포에서 뽑아 기다리고, 이후 토큰마다 token_ms씩 기다립니다.
+    invoke는 전체 응답을 한 번에, invoke_stream은 Claude 스트리밍 이벤트 형식으로 토큰(단어)마다 내보냅니다.
+    응답이 read 타임아웃 안에 오지 않으면 httpx.ReadTimeout으로 실패합니다. (Bedrock과 같은 기준)
+    """
+
+    name = "local"
+    fingerprint = "local:template-v1"
+
+    def __init__(
+        self,
+        latency_ms: float = LOCAL_LLM_LATENCY_MS,
+        distribution: str = LOCAL_LLM_LATENCY_DIST,
+        spread: float = LOCAL_LLM_LATENCY_SPREAD,
+        token_ms: float = LOCAL_LLM_TOKEN_MS,
+        translate_latency_ms: Optional[float] = (
+            float(LOCAL_LLM_TRANSLATE_LATENCY_MS) if LOCAL_LLM_TRANSLATE_LATENCY_MS else None
+        ),
+        error_rate: float = LOCAL_LLM_ERROR_RATE,
+        timeout_rate: float = LOCAL_LLM_TIMEOUT_RATE,
+        seed: int = LOCAL_LLM_SEED
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"알 수 없는 LOCAL_LLM_LATENCY_DIST: {distribution} ({' | '.join(LATENCY_DISTRIBUTIONS)})")
+        if error_rate < 0 or timeout_rate < 0 or error_rate + timeout_rate > 1:
+            raise ValueError(f"실패 주입 비율이 잘못되었습니다: error={error_rate}, timeout={timeout_rate}")
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.spread = spread
+        self.token_ms = token_ms
+        self.translate_latency_ms = translate_latency_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self._rng = random.Random(seed)
+
+    def describe(self) -> Dict:
+        """설정 요약 (로그 / 부하 테스트 결과에 기록)"""
+        return {
+            "latency_ms": self.latency_ms, "distribution": self.distribution, "spread": self.spread,
+            "token_ms": self.token_ms, "translate_latency_ms": self.translate_latency_ms,
+            "error_rate": self.error_rate, "timeout_rate": self.timeout_rate
+        }
+
+    def _first_token_delay(self, body: str) -> float:
+        median = self.latency_ms
+        if self.translate_latency_ms is not None and json.loads(body).get("max_tokens", 0) <= TRANSLATE_MAX_TOKENS:
+            median = self.translate_latency_ms
+        if self.distribution == "uniform":
+            delay = self._rng.uniform(median - self.spread, median + self.spread)
+        elif self.distribution == "normal":
+            delay = self._rng.gauss(median, self.spread)
+        elif self.distribution == "lognormal":
+            delay = median * self._rng.lognormvariate(0.0, self.spread)
+        else:
+            delay = median
+        return max(0.0, delay) / 1000
+
+    def _failure(self, token_count: int) -> Optional[tuple]:
+        """이번 호출에 주입할 실패 (종류, 실패할 토큰 위치) 또는 None"""
+        roll = self._rng.random()
+        if roll < self.error_rate:
+            return "error", self._rng.randrange(token_count)
+        if roll < self.error_rate + self.timeout_rate:
+            return "timeout", self._rng.randrange(token_count)
+        return None
+
+    async def invoke(self, body: str, read_timeout: Optional[float] = None) -> Dict:
+        text = local_response_text(body)
+        tokens = _TOKEN_PATTERN.findall(text)
+        # 분포에서 뽑는 순서를 호출 순서로 고정하기 위해 자리를 얻기 전에 뽑음
+        delay = self._first_token_delay(body) + len(tokens) * self.token_ms / 1000
+        failure = self._failure(len(tokens))
+
+        await self._acquire("invoke")
+        started, error = time.perf_counter(), None
+        try:
+            # 응답 본문은 한 번에 오므로 전체 시간이 read 타임아웃 안에 들어와야 함
+            await _wait(delay, read_timeout or LLM_READ_TIMEOUT, failure)
+            return {
+                "type": "message",
+                "role": "assistant",
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": len(_TOKEN_PATTERN.findall(body)), "output_tokens": len(tokens)}
+            }
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release("invoke", started, error)
+
+    async def invoke_stream(self, body: str) -> AsyncIterator[Dict]:
+        tokens = _TOKEN_PATTERN.findall(local_response_text(body))
+        first_delay = self._first_token_delay(body)
+        failure = self._failure(len(tokens))
+
+        await self._acquire("stream")
+        started, error = time.perf_counter(), None
+        try:
+            yield {"type": "message_start", "message": {"role": "assistant", "content": []}}
+            yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+            for position, token in enumerate(tokens):
+                delay = first_delay if position == 0 else self.token_ms / 1000
+                await _wait(delay, LLM_READ_TIMEOUT, failure if failure and failure[1] == position else None)
+                yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}}
+            yield {"type": "content_block_stop", "index": 0}
+            yield {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(tokens)}}
+            yield {"type": "message_stop"}
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release("stream", started, error)
+
+
+async def _wait(delay: float, read_timeout: float, failure: Optional[tuple]):
+    """delay초 기다립니다. read 타임아웃을 넘거나 실패가 주입된 경우 Bedrock과 같은 종류의 예외를 냅니다."""
+    kind = failure[0] if failure else None
+    if kind == "timeout" or delay > read_timeout:
+        await asyncio.sleep(read_timeout)
+        raise httpx.ReadTimeout("local LLM backend exceeded the read timeout")
+    if kind == "error":
+        request = httpx.Request("POST", "http://local-llm/invoke")
+        response = httpx.Response(503, request=request, text='{"message": "injected failure"}')
+        raise httpx.HTTPStatusError("Server error '503 Service Unavailable' (local LLM failure injection)",
+                                    request=request, response=response)
+    await asyncio.sleep(delay)
+
+
+def create_provider(name: str) -> GuardedLLMClient:
+    """이름으로 LLM 백엔드를 생성합니다."""
+    if name == "bedrock":
+        return BedrockClient()
+    if name == "local":
+        return LocalLLMBackend()
+    raise ValueError(f"알 수 없는 LLM_BACKEND: {name} (bedrock | local)")
+
+
+_provider: Optional[GuardedLLMClient] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> GuardedLLMClient:
+    """설정된 LLM 백엔드를 반환합니다. (최초 호출 시 한 번만 생성)"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_provider(LLM_BACKEND)
+                settings: Dict = _provider.describe() if isinstance(_provider, LocalLLMBackend) else {}
+                logger.info("LLM backend selected", extra={"backend": _provider.name, **settings})
+    return _provider
+
+
+async def close_provider():
+    """앱 종료 시 생성된 백엔드가 있으면 정리합니다."""
+    if _provider is not None:
+        await _provider.close()
@@ -1,25 +1,35 @@
-import boto3
 import json
-from typing import List, Dict, Union
+from typing import AsyncIterator, List, Dict, Union
 
-# Bedrock 클라이언트 초기화
-bedrock_runtime = boto3.client(
-    service_name="bedrock-runtime",
-    region_name="us-east-1"
-)
+from services.bedrock_client import LLMUnavailableError
+from services.llm_providers import get_provider
+from services.logger import get_logger
 
-# Claude 3 Haiku
-MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+logger = get_logger(__name__)
 
-def generate_recommendation_text(
+# 추천 멘트 프롬프트 템플릿 버전 (_build_recommendation_body를 바꾸면 올려서 멘트 캐시를 무효화)
+PROMPT_VERSION = "1"
+
+# 번역은 응답이 짧으므로 read 타임아웃을 짧게 (초)
+TRANSLATE_READ_TIMEOUT = 5.0
+
+
+async def _invoke_model(body: str, read_timeout: float = None) -> Dict:
+    """설정된 LLM 백엔드(LLM_BACKEND)의 InvokeModel을 비동기로 호출하고 응답 JSON을 반환합니다."""
+    return await get_provider().invoke(body, read_timeout=read_timeout)
+
+
+def _invoke_model_stream(body: str) -> AsyncIterator[Dict]:
+    """설정된 LLM 백엔드의 스트리밍 호출로 Claude 스트리밍 이벤트(dict)를 순서대로 내보냅니다."""
+    return get_provider().invoke_stream(body)
+
+
+def _build_recommendation_body(
     user_prompt: Union[str, Dict],
     sound_results: List[Dict],
     user_preferences: Dict
 ) -> str:
-    """
-    사용자 상태 설명과 추천 사운드 정보를 바탕으로,
-    Claude 3 모델에게 감성적인 한국어 추천 멘트를 요청하고 반환합니다.
-    """
+    """추천 멘트 생성을 위한 Claude 요청 본문(JSON 문자열)을 만듭니다."""
 
     if isinstance(user_prompt, dict):
         user_summary = user_prompt.get("summary", "")
@@ -74,7 +84,7 @@ def generate_recommendation_text(
 """
 
     # Claude용 메시지 형식
-    body = json.dumps({
+    return json.dumps({
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": 2048,
         "temperature": 0.7,
@@ -83,26 +93,60 @@ def generate_recommendation_text(
         ]
     })
 
+
+async def generate_recommendation_text(
+    user_prompt: Union[str, Dict],
+    sound_results: List[Dict],
+    user_preferences: Dict
+) -> str:
+    """
+    사용자 상태 설명과 추천 사운드 정보를 바탕으로,
+    Claude 3 모델에게 감성적인 한국어 추천 멘트를 비동기로 요청하고 반환합니다.
+    """
+    body = _build_recommendation_body(user_prompt, sound_results, user_preferences)
+
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=MODEL_ID,
-            accept="application/json",
-            contentType="application/json"
-        )
-        response_body = json.loads(response.get("body").read())
+        response_body = await _invoke_model(body)
         return response_body.get("content", [])[0].get("text", "")
+    except LLMUnavailableError:
+        # 서킷 브레이커 / 동시 호출 상한으로 호출하지 않은 경우는 llm_calls_total 지표로 확인
+        raise
+    except Exception as e:
+        logger.error("Error calling Bedrock API", extra={"backend": get_provider().name, "error": str(e)})
+        raise e
+
+
+async def stream_recommendation_text(
+    user_prompt: Union[str, Dict],
+    sound_results: List[Dict],
+    user_preferences: Dict
+) -> AsyncIterator[str]:
+    """
+    generate_recommendation_text의 스트리밍 버전.
+    LLM 응답 스트림에서 텍스트 조각이 도착하는 대로 내보냅니다.
+    """
+    body = _build_recommendation_body(user_prompt, sound_results, user_preferences)
+
+    try:
+        async for event in _invoke_model_stream(body):
+            # content_block_delta 이벤트에만 텍스트 조각이 담겨 있음
+            if event.get("type") == "content_block_delta":
+                text = event.get("delta", {}).get("text", "")
+                if text:
+                    yield text
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        print(f"Error calling Bedrock API: {e}")
+        logger.error("Error calling Bedrock streaming API", extra={"backend": get_provider().name, "error": str(e)})
         raise e
 
 
 # --------------------------------------------
 # 한글 텍스트 → 영어 번역용 함수 (BGE 임베딩에 쓰임)
 # --------------------------------------------
-def translate_korean_to_english(text: str) -> str:
+async def translate_korean_to_english(text: str) -> str:
     """
-    Bedrock LLM을 사용해 주어진 한국어 텍스트를 영어로 번역한다.
+    LLM(LLM_BACKEND)을 사용해 주어진 한국어 텍스트를 영어로 번역한다. (비동기)
     """
     if not text.strip():
         return ""
@@ -122,14 +166,8 @@ English:"""
     })
 
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=MODEL_ID,
-            accept="application/json",
-            contentType="application/json"
-        )
-        response_body = json.loads(response.get("body").read())
+        response_body = await _invoke_model(body, read_timeout=TRANSLATE_READ_TIMEOUT)
         return response_body.get("content", [])[0].get("text", "").strip()
     except Exception as e:
-        print(f"Error during translation: {e}")
+        logger.error("Error during translation", extra={"backend": get_provider().name, "error": str(e)})
         return text
\ No newline at end of file
@@ -0,0 +1,117 @@
+# logger.py
+# 구조화(JSON) 로깅 설정
+# - 요청 처리 스레드는 큐에 레코드를 넣기만 하고, stdout 쓰기와 JSON 직렬화는 백그라운드 리스너 스레드가 담당
+# - 모듈별 로그 레벨 (LOG_LEVELS), 후보별 디버그 로그 샘플링 (LOG_DEBUG_SAMPLE_RATE)
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+from services.metrics import LOG_RECORDS_DROPPED
+
+# 기본 로그 레벨 (운영에서는 INFO 이상 → DEBUG 로그는 isEnabledFor 검사만 하고 버려짐)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# 모듈별 로그 레벨 (예: "services.recommender=DEBUG,utils.prompt_builder=WARNING")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# 후보 사운드별처럼 요청마다 수십 줄씩 나오는 디버그 로그의 샘플링 비율 (0.0~1.0)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+# 로그 큐 최대 길이 (가득 차면 요청 스레드를 막지 않고 버림)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# 이 패키지들 아래의 로거에 핸들러를 붙임
+APP_LOGGER_ROOTS = ("app", "services", "utils", "scripts")
+
+# LogRecord 기본 속성 (나머지 extra 필드만 JSON에 포함)
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_setup_lock = threading.Lock()
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """로그 레코드를 한 줄 JSON으로 직렬화합니다. extra로 넘긴 필드도 함께 포함합니다."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 기다리지 않고 레코드를 버리는 QueueHandler"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 기본 prepare는 traceback까지 문자열로 만들어 msg에 붙이고 exc_info를 지움
+        # → 메시지 보간만 하고 exc_info는 그대로 넘겨 리스너 스레드의 JsonFormatter가 exc_info 필드로 직렬화
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _configure():
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        # 요청 스레드에서는 메시지 보간만 하고 (_NonBlockingQueueHandler.prepare), JSON / traceback 직렬화는 리스너 스레드에서 수행
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+
+        for root in APP_LOGGER_ROOTS:
+            root_logger = logging.getLogger(root)
+            root_logger.setLevel(LOG_LEVEL)
+            root_logger.addHandler(queue_handler)
+            # uvicorn 등 루트 로거 핸들러로 중복 출력되지 않도록
+            root_logger.propagate = False
+
+        for entry in filter(None, (item.strip() for item in LOG_LEVELS.split(","))):
+            name, _, level = entry.partition("=")
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """모듈 로거를 반환합니다. (처음 호출 시 큐 기반 JSON 로깅을 설정)"""
+    _configure()
+    return logging.getLogger(name)
+
+
+def sampled(rate: float = LOG_DEBUG_SAMPLE_RATE) -> bool:
+    """샘플링 대상인지 여부. 후보별 디버그 로그처럼 양이 많은 로그 앞에서 isEnabledFor와 함께 사용합니다."""
+    return rate >= 1.0 or random.random() < rate
@@ -0,0 +1,179 @@
+# pipeline.py
+# 추천 파이프라인을 단계 의존성 그래프로 실행
+# - 각 단계는 의존하는 단계가 모두 끝나는 즉시 시작 → 서로 독립적인 단계(번역 I/O, 수면 요약, 카탈로그 준비 등)는 겹쳐서 실행
+# - 단계별 소요 시간은 stage_timer로 기록 (히스토그램 + Server-Timing)
+# - 실행이 끝나면 마지막 단계에서부터 가장 늦게 끝난 의존 단계를 거슬러 올라가 임계 경로(critical path)를 계산해 지표로 남김
+
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.logger import get_logger
+from services.metrics import Counter, Histogram, stage_timer
+
+logger = get_logger(__name__)
+
+PIPELINE_DURATION = Histogram(
+    "recommend_pipeline_duration_seconds",
+    "Wall-clock duration of a recommendation stage graph run.",
+    ["pipeline"]
+)
+CRITICAL_PATH_STAGES = Counter(
+    "recommend_critical_path_stage_total",
+    "How often each stage was on the critical path of a pipeline run.",
+    ["pipeline", "stage"]
+)
+
+
+class Stage:
+    """
+    파이프라인 단계 하나.
+    func는 deps에 적힌 이름(앞 단계 결과 또는 실행 입력)을 키워드 인자로 받습니다.
+    cpu=True인 동기 함수는 CPU 스레드풀에서 실행하고, 코루틴을 반환하면 기다립니다.
+    timed=False면 stage_timer를 씌우지 않습니다. (단계 안에서 직접 측정하는 경우)
+    """
+
+    def __init__(self, name: str, func: Callable, deps: Sequence[str] = (), cpu: bool = False, timed: bool = True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.cpu = cpu
+        self.timed = timed
+
+
+class StageGraph:
+    """단계 목록으로 만든 의존성 그래프. 생성 시 이름 중복 / 없는 의존 / 순환을 검사합니다."""
+
+    def __init__(
+        self,
+        name: str,
+        stages: Iterable[Stage],
+        inputs: Sequence[str] = (),
+        cpu_runner: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.cpu_runner = cpu_runner
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages or stage.name in self.inputs:
+                raise ValueError(f"중복된 단계 이름입니다: {stage.name}")
+            self.stages[stage.name] = stage
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[Stage]:
+        order: List[Stage] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"단계 의존성에 순환이 있습니다: {name}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                if dep in self.stages:
+                    visit(dep)
+                elif dep not in self.inputs:
+                    raise ValueError(f"'{name}' 단계의 의존 대상이 없습니다: {dep}")
+            state[name] = "done"
+            order.append(self.stages[name])
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _required(self, targets: Sequence[str]) -> set:
+        """targets를 만드는 데 필요한 단계 이름 집합"""
+        required = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in required or name not in self.stages:
+                continue
+            required.add(name)
+            pending.extend(self.stages[name].deps)
+        return required
+
+    async def run(self, inputs: Dict[str, Any], targets: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        targets(기본: 마지막 단계)에 필요한 단계만 최대한 겹쳐 실행하고 {이름: 결과}를 반환합니다.
+        한 단계가 실패하면 나머지 단계를 취소하고 같은 예외를 다시 발생시킵니다.
+        """
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            raise ValueError(f"'{self.name}' 파이프라인 입력이 없습니다: {missing}")
+        targets = list(targets or [self._order[-1].name])
+        required = self._required(targets)
+
+        results: Dict[str, Any] = dict(inputs)
+        spans: Dict[str, Tuple[float, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage):
+            waiting = [tasks[dep] for dep in stage.deps if dep in tasks]
+            if waiting:
+                await asyncio.gather(*waiting)
+            kwargs = {dep: results[dep] for dep in stage.deps}
+            started = time.perf_counter()
+            try:
+                with stage_timer(stage.name) if stage.timed else nullcontext():
+                    results[stage.name] = await self._call(stage, kwargs)
+            finally:
+                spans[stage.name] = (started, time.perf_counter())
+
+        # 위상 정렬 순서로 만들므로 의존 단계의 태스크가 항상 먼저 생성됨
+        started = time.perf_counter()
+        for stage in self._order:
+            if stage.name in required:
+                tasks[stage.name] = asyncio.create_task(run_stage(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        PIPELINE_DURATION.observe(time.perf_counter() - started, pipeline=self.name)
+
+        self._record_critical_path(targets, spans, started)
+        return results
+
+    async def _call(self, stage: Stage, kwargs: Dict[str, Any]) -> Any:
+        if stage.cpu and self.cpu_runner is not None:
+            return await self.cpu_runner(functools.partial(stage.func, **kwargs))
+        value = stage.func(**kwargs)
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    def critical_path(self, targets: Sequence[str], spans: Dict[str, Tuple[float, float]]) -> List[str]:
+        """가장 늦게 끝난 target에서 시작해, 가장 늦게 끝난 의존 단계를 따라 거슬러 올라간 경로"""
+        current = max(targets, key=lambda name: spans[name][1])
+        path = [current]
+        while True:
+            deps = [dep for dep in self.stages[current].deps if dep in spans]
+            if not deps:
+                break
+            current = max(deps, key=lambda dep: spans[dep][1])
+            path.append(current)
+        path.reverse()
+        return path
+
+    def _record_critical_path(self, targets: Sequence[str], spans: Dict[str, Tuple[float, float]], started: float):
+        path = self.critical_path(targets, spans)
+        for name in path:
+            CRITICAL_PATH_STAGES.inc(pipeline=self.name, stage=name)
+        if logger.isEnabledFor(logging.DEBUG):
+            # 단계별 (시작 ms, 끝 ms) - 실행 시작 기준
+            offsets = {
+                name: [round((s - started) * 1000, 1), round((e - started) * 1000, 1)]
+                for name, (s, e) in spans.items()
+            }
+            logger.debug("Pipeline finished", extra={
+                "pipeline": self.name, "critical_path": path, "stages": offsets
+            })
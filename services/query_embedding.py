@@ -0,0 +1,153 @@
+# query_embedding.py
+# 설문 기반 RAG 쿼리 벡터 생성
+# - exact: 완성된 쿼리 문장 전체를 임베딩 (기본)
+# - compositional: 문구별로 미리 계산해둔 임베딩(문구 테이블)을 평균내어 쿼리 벡터를 만듦 → 모델 실행 없음
+#   리스트 항목은 값마다 문구를 나눠 평균내고, 테이블에 없는 문구가 하나라도 있으면 그 요청만 exact로 처리
+
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_backends import EMBEDDING_DIM, get_backend
+from services.embedding_service import embed_text, embed_texts
+from services.logger import get_logger
+from services.metrics import Counter
+from utils.prompt_builder import EMPTY_SURVEY_QUERY
+
+logger = get_logger(__name__)
+
+# 쿼리 임베딩 방식 ("exact" | "compositional")
+QUERY_EMBEDDING_MODE = os.getenv("QUERY_EMBEDDING_MODE", "exact").lower()
+
+# scripts/build_phrase_table.py가 만드는 문구 테이블
+PHRASE_TABLE_PATH = os.getenv("PHRASE_TABLE_PATH", "data/survey_phrase_table.npz")
+
+QUERY_EMBEDDINGS = Counter(
+    "query_embeddings_total",
+    "Survey query vectors by how they were built.",
+    ["mode"]
+)
+
+FieldValues = List[Tuple[str, str, List[str]]]
+
+
+def phrase_sentence(phrase: str) -> str:
+    """문구 테이블에 넣을 때 임베딩하는 문장 (실제 쿼리와 같은 시작 문구를 붙임)"""
+    return phrase if phrase == EMPTY_SURVEY_QUERY else f"A user who {phrase}"
+
+
+def survey_phrases(field_values: FieldValues) -> List[List[str]]:
+    """필드별 문구 목록. 리스트 값은 값마다 따로 문구를 만듭니다."""
+    return [[template.format(value) for value in values] for _, template, values in field_values]
+
+
+class PhraseTable:
+    """문구 → 미리 계산한 임베딩 벡터"""
+
+    def __init__(self, phrases: List[str], vectors: np.ndarray, model: str = ""):
+        self.vectors = np.ascontiguousarray(vectors, dtype="float32")
+        self.model = model
+        self._rows = {phrase: row for row, phrase in enumerate(phrases)}
+
+    @classmethod
+    def load(cls, path: str) -> "PhraseTable":
+        with np.load(path, allow_pickle=False) as data:
+            return cls([str(p) for p in data["phrases"]], data["vectors"], str(data["model"]))
+
+    def save(self, path: str):
+        phrases = sorted(self._rows, key=self._rows.get)
+        np.savez(path, phrases=np.array(phrases), vectors=self.vectors, model=np.array(self.model))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, phrase: str) -> bool:
+        return phrase in self._rows
+
+    def compose(self, field_values: FieldValues) -> Optional[np.ndarray]:
+        """필드별 문구 벡터를 합쳐 정규화한 쿼리 벡터. 테이블에 없는 문구가 있으면 None."""
+        if not field_values:
+            row = self._rows.get(EMPTY_SURVEY_QUERY)
+            return None if row is None else self.vectors[row]
+
+        total = np.zeros(self.vectors.shape[1], dtype="float32")
+        for phrases in survey_phrases(field_values):
+            rows = [self._rows.get(phrase) for phrase in phrases]
+            if any(row is None for row in rows):
+                return None
+            # 여러 개 고른 항목도 필드 하나의 비중은 같게
+            total += self.vectors[rows].mean(axis=0)
+        return total / max(float(np.linalg.norm(total)), 1e-12)
+
+
+_phrase_table: Optional[PhraseTable] = None
+_phrase_table_error: Optional[str] = None
+_phrase_table_lock = threading.Lock()
+
+
+def load_phrase_table() -> PhraseTable:
+    """
+    문구 테이블을 로드합니다. (최초 호출 시 한 번만, 실패하면 같은 오류를 다시 발생)
+    테이블을 만든 임베딩 백엔드 / 모델(fingerprint)이 현재 백엔드와 다르면 카탈로그와 다른 벡터 공간이므로 실패로 처리합니다.
+    """
+    global _phrase_table, _phrase_table_error
+    if _phrase_table is None:
+        with _phrase_table_lock:
+            if _phrase_table is None:
+                if _phrase_table_error is not None:
+                    raise RuntimeError(_phrase_table_error)
+                try:
+                    table = PhraseTable.load(PHRASE_TABLE_PATH)
+                    fingerprint = get_backend().fingerprint
+                    if table.model != fingerprint:
+                        raise ValueError(f"다른 임베딩 모델로 만든 테이블입니다 (테이블: {table.model}, 현재: {fingerprint})")
+                    _phrase_table = table
+                except Exception as e:
+                    _phrase_table_error = (
+                        f"문구 테이블을 사용할 수 없습니다: {PHRASE_TABLE_PATH} ({e}) "
+                        f"- python3 -m scripts.build_phrase_table 로 먼저 생성하세요"
+                    )
+                    logger.error("Phrase table unavailable, using exact query embeddings",
+                                 extra={"error": _phrase_table_error})
+                    raise RuntimeError(_phrase_table_error)
+                logger.info("Phrase table loaded", extra={"phrases": len(_phrase_table), "model": _phrase_table.model})
+    return _phrase_table
+
+
+def _compose(field_values: FieldValues) -> Optional[np.ndarray]:
+    if QUERY_EMBEDDING_MODE != "compositional":
+        return None
+    try:
+        return load_phrase_table().compose(field_values)
+    except RuntimeError:
+        return None
+
+
+def _exact_label() -> str:
+    # compositional 모드인데 문장 임베딩으로 처리한 경우는 fallback으로 구분 (문구 테이블 커버리지 확인용)
+    return "fallback" if QUERY_EMBEDDING_MODE == "compositional" else "exact"
+
+
+def embed_survey_query(prompt: str, field_values: FieldValues) -> np.ndarray:
+    """설문 쿼리 하나를 설정된 방식으로 임베딩합니다."""
+    vector = _compose(field_values)
+    if vector is not None:
+        QUERY_EMBEDDINGS.inc(mode="compositional")
+        return vector
+    QUERY_EMBEDDINGS.inc(mode=_exact_label())
+    return embed_text(prompt)
+
+
+def embed_survey_queries(prompts: List[str], field_values_list: List[FieldValues]) -> np.ndarray:
+    """embed_survey_query의 배치 버전. 조합할 수 없는 쿼리만 모아 한 번에 임베딩합니다."""
+    vectors = [_compose(field_values) for field_values in field_values_list]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    QUERY_EMBEDDINGS.inc(len(vectors) - len(missing), mode="compositional")
+    QUERY_EMBEDDINGS.inc(len(missing), mode=_exact_label())
+
+    if missing:
+        for i, vector in zip(missing, embed_texts([prompts[i] for i in missing])):
+            vectors[i] = vector
+    return np.array(vectors, dtype="float32").reshape(len(prompts), EMBEDDING_DIM)
@@ -1,47 +1,370 @@
 # rag_recommender.py
 # RAG에서 Retrieve를 담당하는 부분
+# - 카탈로그 벡터를 정규화된 float32 행렬로 들고, 코사인 유사도를 행렬곱 한 번으로 계산 (여러 쿼리도 한 번에)
+# - 상위 후보는 argpartition으로 고르고, 카테고리별 상위 2개 다양성 필터도 정수 카테고리 배열 연산으로 처리
+# - 인덱스 파일이 flat이면 벡터만 꺼내 위 행렬 검색을 사용하고,
+#   ivf_flat / ivf_pq / hnsw(대규모 카탈로그, services/ann_index.py)면 FAISS로 후보를 찾은 뒤 같은 다양성 필터를 적용
+# - 카탈로그(인덱스 + 사운드 데이터)는 버전이 붙은 스냅샷으로 들고, 다시 읽을 때는 새 스냅샷을 다 만든 뒤 참조만 교체
+#   요청은 처음 사용한 스냅샷을 끝까지 사용 (pin_catalog)
 
 import faiss
+import hashlib
 import numpy as np
 import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
 
-# 미리 만들어둔 FAISS 인덱스, 원본 사운드 데이터 로드
-faiss_index = faiss.read_index("data/sound_index.faiss")
-with open("data/sound_pool.json", "r") as f:
-    sound_pool = json.load(f)
+from services.ann_index import index_type_of, search_parameters
+from services.logger import get_logger
+from services.metrics import Counter, Gauge
+
+logger = get_logger(__name__)
+
+INDEX_PATH = "data/sound_index.faiss"
+SOUND_POOL_PATH = "data/sound_pool.json"
+
+# 인덱스 파일을 mmap으로 읽음 (ANN 인덱스 로드가 빠르고, 교체 중 두 버전이 메모리를 두 배로 쓰지 않음)
+# 인덱스 파일은 덮어쓰지 말고 새 파일을 만든 뒤 os.replace로 교체해야 함 (scripts/index_builder.py는 그렇게 저장)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+
+CATALOG_INFO = Gauge(
+    "catalog_info",
+    "Active sound catalog snapshot (value is always 1).",
+    ["version", "index_type"]
+)
+CATALOG_SOUNDS = Gauge("catalog_sounds", "Sounds in the active catalog snapshot.")
+CATALOG_LOADED_AT = Gauge("catalog_loaded_timestamp_seconds", "Unix time the active catalog snapshot was loaded.")
+CATALOG_RELOADS = Counter(
+    "catalog_reloads_total",
+    "Catalog reload attempts by outcome (swapped, unchanged, failed).",
+    ["outcome"]
+)
+
+# 카테고리별로 남길 사운드 수 (다양성)
+CATEGORY_TOP_N = 2
+
+# category 필드가 없는 사운드의 카테고리
+DEFAULT_CATEGORY = "기타"
+
+
+# 요청 단위 ANN 검색 파라미터 (nprobe / ef_search, API 쿼리 파라미터로 설정)
+_search_params: ContextVar[Dict[str, Optional[int]]] = ContextVar("ann_search_params", default={})
+
+
+def set_search_params(nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """현재 요청의 ANN 검색 파라미터를 설정합니다. (flat 인덱스에서는 무시)"""
+    _search_params.set({"nprobe": nprobe, "ef_search": ef_search})
+
+
+class RetrievalEngine:
+    """
+    정규화된 카탈로그 벡터 행렬 + 정수 카테고리 배열로 검색과 다양성 필터를 처리합니다.
+    ann_index가 있으면 행렬 대신 FAISS 근사 검색으로 후보를 찾습니다. (vectors 불필요)
+    """
+
+    def __init__(
+        self,
+        vectors: Optional[np.ndarray],
+        sound_pool: list,
+        ann_index: Optional[faiss.Index] = None,
+        version: str = ""
+    ):
+        self.ann_index = ann_index
+        self.version = version
+        if ann_index is not None:
+            count = ann_index.ntotal
+            self.vectors = None
+        else:
+            vectors = np.asarray(vectors, dtype="float32")
+            count = len(vectors)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self.vectors = np.ascontiguousarray(vectors / np.maximum(norms, 1e-12))
+        if count != len(sound_pool):
+            raise ValueError(f"벡터 수({count})와 사운드 수({len(sound_pool)})가 다릅니다.")
+        self.sound_pool = sound_pool
+        # 카테고리 이름 → 0..C-1 정수 코드
+        self.category_names, self.categories = np.unique(
+            np.array([sound.get("category", DEFAULT_CATEGORY) for sound in sound_pool]), return_inverse=True
+        )
+        # 마지막 코드는 ANN 검색이 후보를 다 채우지 못한 자리(-1)용
+        self._category_codes = np.arange(len(self.category_names) + 1)
+        self._categories_padded = np.append(self.categories, len(self.category_names))
+        # filename → 정수 코드 (점수 계산에서 선호 / 이전 추천 사운드를 후보와 정수 비교)
+        codes: Dict[str, int] = {}
+        self.filename_codes = np.fromiter(
+            (codes.setdefault(sound.get("filename"), len(codes)) for sound in sound_pool), dtype=np.int64, count=len(sound_pool)
+        )
+        self._filename_code = codes
+
+    def __len__(self) -> int:
+        return len(self.sound_pool)
+
+    @property
+    def index_type(self) -> str:
+        return "flat" if self.ann_index is None else index_type_of(self.ann_index)
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        쿼리별 코사인 유사도 상위 top_k개의 (카탈로그 인덱스, 코사인) - 둘 다 (N, k), 유사도 내림차순
+        ANN 검색에서 후보가 모자란 자리는 인덱스 -1입니다.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype="float32"))
+        query_norms = np.sqrt(np.einsum("ij,ij->i", queries, queries))
+        if self.ann_index is not None:
+            return self._ann_search(queries / np.maximum(query_norms, 1e-12)[:, None], top_k, nprobe, ef_search)
+
+        # 카탈로그는 이미 정규화되어 있으므로 내적 결과를 쿼리 노름으로만 나눔
+        cosines = (queries @ self.vectors.T) / np.maximum(query_norms, 1e-12)[:, None]
+
+        rows = np.arange(len(cosines))[:, None]
+        k = min(top_k, len(self))
+        if k < len(self):
+            candidates = np.argpartition(-cosines, k - 1, axis=1)[:, :k]
+            order = np.argsort(-cosines[rows, candidates], axis=1, kind="stable")
+            indices = candidates[rows, order]
+        else:
+            indices = np.argsort(-cosines, axis=1, kind="stable")
+        return indices, cosines[rows, indices]
+
+    def _ann_search(self, queries: np.ndarray, top_k: int, nprobe: Optional[int], ef_search: Optional[int]):
+        overrides = _search_params.get()
+        params = search_parameters(
+            self.ann_index,
+            nprobe=nprobe or overrides.get("nprobe"),
+            ef_search=ef_search or overrides.get("ef_search")
+        )
+        distances, indices = self.ann_index.search(queries, min(top_k, len(self)), params=params)
+        # 정규화된 벡터의 L2² 거리 d = 2 - 2·cos (ivf_pq는 근사 거리)
+        return indices, 1.0 - distances / 2.0
+
+    def filename_codes_of(self, filenames: List[str]) -> np.ndarray:
+        """filename 목록의 정수 코드 (카탈로그에 없으면 -1)"""
+        return np.fromiter((self._filename_code.get(name, -1) for name in filenames), dtype=np.int64, count=len(filenames))
+
+    def diversity_mask(self, indices: np.ndarray) -> np.ndarray:
+        """유사도 순으로 정렬된 (N, k) 후보 중 카테고리마다 상위 CATEGORY_TOP_N개만 True"""
+        # 각 후보가 자기 카테고리에서 몇 번째인지 = 앞쪽(자기 포함)에 나온 같은 카테고리 수
+        one_hot = self._categories_padded[indices][..., None] == self._category_codes
+        seen = np.cumsum(one_hot, axis=1, dtype=np.int32)
+        # 후보마다 True는 정확히 하나이므로 불리언 인덱싱 결과가 (N, k) 순서 그대로 나옴
+        return seen[one_hot].reshape(indices.shape) <= CATEGORY_TOP_N
+
+    def candidates(self, query_vectors: np.ndarray, top_k: int, **search_kwargs) -> "Candidates":
+        """쿼리별로 다양성 필터를 통과한 후보 (카탈로그 인덱스 / similarity_score 배열)"""
+        indices, cosines = self.search(query_vectors, top_k, **search_kwargs)
+        keep = self.diversity_mask(indices) & (indices >= 0)
+        # 통과한 후보를 순서를 유지한 채 앞으로 모으고, 남는 자리는 -1
+        width = int(keep.sum(axis=1).max()) if keep.size else 0
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :width]
+        rows = np.arange(len(indices))[:, None]
+        packed = np.where(keep[rows, order], indices[rows, order], -1)
+        return Candidates(self, packed, similarity_scores(cosines[rows, order]))
+
+    def recommend(self, query_vectors: np.ndarray, top_k: int, **search_kwargs) -> List[list]:
+        """쿼리별로 다양성 필터를 적용한 사운드 목록 (유사도 내림차순)"""
+        candidates = self.candidates(query_vectors, top_k, **search_kwargs)
+        return [candidates.sounds(row) for row in range(len(candidates))]
+
+
+class Candidates:
+    """
+    쿼리별 검색 후보. indices / similarity는 (N, k) 배열이며 유사도 내림차순, 빈 자리는 인덱스 -1입니다.
+    점수 계산은 배열로 하고, 사운드 dict는 순위가 정해진 뒤 sounds()로 만듭니다.
+    """
+
+    def __init__(self, engine: RetrievalEngine, indices: np.ndarray, similarity: np.ndarray):
+        self.engine = engine
+        self.indices = indices
+        self.similarity = similarity
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @property
+    def filename_codes(self) -> np.ndarray:
+        """후보별 filename 코드 (빈 자리는 -1)"""
+        return np.where(self.indices >= 0, self.engine.filename_codes[self.indices], -1)
+
+    def sounds(self, row: int, order: Optional[np.ndarray] = None) -> List[dict]:
+        """row번째 쿼리의 사운드 목록 (order가 있으면 그 순서로, 빈 자리 제외)"""
+        indices, scores = self.indices[row], self.similarity[row]
+        if order is not None:
+            indices, scores = indices[order], scores[order]
+        keep = indices >= 0
+        # 응답 단계에서 rank 등을 덧붙이므로 원본은 건드리지 않도록 복사
+        pool = self.engine.sound_pool
+        return [
+            {**pool[index], 'similarity_score': score}
+            for index, score in zip(indices[keep].tolist(), scores[keep].tolist())
+        ]
+
+
+def similarity_scores(cosines: np.ndarray) -> np.ndarray:
+    """
+    코사인 유사도를 응답 / 점수 계산에 쓰는 similarity_score로 변환합니다.
+    점수 계산(score_calculator)의 가중치는 기존 L2 거리 점수 1/(1+d)에 맞춰져 있으므로,
+    정규화된 벡터에서 d = |q - x|² = 2 - 2·cos 인 관계로 같은 값을 계산합니다.
+    """
+    return 1.0 / (3.0 - 2.0 * cosines)
+
+
+def build_engine(index: faiss.Index, sound_pool: list, version: str = "") -> RetrievalEngine:
+    """flat 인덱스는 벡터를 꺼내 행렬 검색, 그 외에는 ANN 인덱스 검색 엔진을 만듭니다."""
+    if index_type_of(index) == "flat":
+        return RetrievalEngine(index.reconstruct_n(0, index.ntotal), sound_pool, version=version)
+    return RetrievalEngine(None, sound_pool, ann_index=index, version=version)
+
+
+def catalog_source_version(index_path: str = INDEX_PATH, sound_pool_path: str = SOUND_POOL_PATH) -> str:
+    """두 파일의 크기 / 수정 시각으로 만든 카탈로그 버전 (같은 파일을 읽은 워커끼리는 같은 값)"""
+    stats = [os.stat(path) for path in (index_path, sound_pool_path)]
+    key = "|".join(f"{stat.st_size}:{stat.st_mtime_ns}" for stat in stats)
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def read_catalog(index_path: str = INDEX_PATH, sound_pool_path: str = SOUND_POOL_PATH, attempts: int = 3) -> RetrievalEngine:
+    """
+    파일에서 카탈로그 스냅샷을 새로 만듭니다.
+    읽는 동안 파일이 교체되면 (읽기 전후 버전이 다르면) 다시 읽습니다.
+    """
+    for _ in range(attempts):
+        version = catalog_source_version(index_path, sound_pool_path)
+        with open(sound_pool_path, "r") as f:
+            sound_pool = json.load(f)
+        index = _read_index(index_path)
+        if catalog_source_version(index_path, sound_pool_path) == version:
+            return build_engine(index, sound_pool, version)
+    raise RuntimeError(f"카탈로그 파일이 읽는 동안 계속 바뀌었습니다. ({index_path}, {sound_pool_path})")
+
+
+def _read_index(index_path: str) -> faiss.Index:
+    if FAISS_MMAP:
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # mmap을 지원하지 않는 인덱스 형식이면 일반 읽기
+            logger.warning("FAISS mmap read failed, falling back to a regular read", extra={"path": index_path})
+    return faiss.read_index(index_path)
+
+
+class CatalogHolder:
+    """
+    현재 카탈로그 스냅샷을 들고 있는 객체.
+    reload()는 새 스냅샷을 완전히 만든 뒤 참조만 바꾸고, 검색은 락을 잡지 않으므로 교체 중에도 멈추지 않습니다.
+    새 스냅샷을 만들지 못하면 기존 스냅샷을 그대로 유지합니다.
+    """
+
+    def __init__(self, index_path: str = INDEX_PATH, sound_pool_path: str = SOUND_POOL_PATH):
+        self.index_path = index_path
+        self.sound_pool_path = sound_pool_path
+        self._engine: Optional[RetrievalEngine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded_version(self) -> Optional[str]:
+        engine = self._engine
+        return engine.version if engine is not None else None
+
+    def current(self) -> RetrievalEngine:
+        """현재 스냅샷 (첫 사용 시 로드)"""
+        engine = self._engine
+        if engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._swap(read_catalog(self.index_path, self.sound_pool_path))
+                engine = self._engine
+        return engine
+
+    def reload(self, force: bool = False) -> Tuple[RetrievalEngine, bool]:
+        """
+        파일을 다시 읽어 스냅샷을 교체합니다. (스냅샷, 교체 여부)를 반환합니다.
+        force=False면 파일 버전이 현재 스냅샷과 같을 때 다시 읽지 않습니다.
+        """
+        with self._lock:
+            previous = self._engine
+            try:
+                if (not force and previous is not None
+                        and catalog_source_version(self.index_path, self.sound_pool_path) == previous.version):
+                    CATALOG_RELOADS.inc(outcome="unchanged")
+                    return previous, False
+                engine = read_catalog(self.index_path, self.sound_pool_path)
+            except Exception as e:
+                CATALOG_RELOADS.inc(outcome="failed")
+                logger.error("Catalog reload failed, keeping the current snapshot", extra={
+                    "version": previous.version if previous else None, "error": str(e)
+                })
+                raise
+            self._swap(engine)
+        CATALOG_RELOADS.inc(outcome="swapped")
+        logger.info("Catalog reloaded", extra={
+            "previous_version": previous.version if previous else None,
+            "version": engine.version,
+            "index_type": engine.index_type,
+            "sounds": len(engine)
+        })
+        return engine, True
+
+    def _swap(self, engine: RetrievalEngine):
+        previous = self._engine
+        # 참조 교체만 하므로 이전 스냅샷을 쓰는 요청은 끝날 때까지 그대로 사용 (이후 GC가 정리)
+        self._engine = engine
+        if previous is not None:
+            CATALOG_INFO.remove(version=previous.version, index_type=previous.index_type)
+        CATALOG_INFO.set(1, version=engine.version, index_type=engine.index_type)
+        CATALOG_SOUNDS.set(len(engine))
+        CATALOG_LOADED_AT.set(time.time())
+
+
+# 전역 인스턴스 생성
+catalog_holder = CatalogHolder()
+
+
+# 요청이 사용 중인 스냅샷 (pin_catalog()로 요청마다 새 dict를 설정)
+# dict 객체를 공유하므로 CPU 스레드풀로 복사된 컨텍스트에서 고정한 스냅샷도 같은 요청 안에서 보임
+_pinned_catalog: ContextVar[Optional[dict]] = ContextVar("pinned_catalog", default=None)
+
+
+def pin_catalog():
+    """현재 요청이 처음 사용하는 카탈로그 스냅샷을 요청이 끝날 때까지 고정합니다. (중간에 교체되어도 섞이지 않음)"""
+    _pinned_catalog.set({})
+
+
+def pinned_catalog_version() -> Optional[str]:
+    """현재 요청이 사용한 카탈로그 버전 (아직 사용하지 않았으면 None)"""
+    pinned = _pinned_catalog.get()
+    engine = pinned.get("engine") if pinned else None
+    return engine.version if engine is not None else None
+
+
+def load_catalog() -> RetrievalEngine:
+    """카탈로그 검색 엔진 (요청에 고정된 스냅샷이 있으면 그것, 없으면 현재 스냅샷)"""
+    pinned = _pinned_catalog.get()
+    if pinned is None:
+        return catalog_holder.current()
+    engine = pinned.get("engine")
+    if engine is None:
+        engine = pinned.setdefault("engine", catalog_holder.current())
+    return engine
 
 # 유사도 검색 -> 유사도 높은 순으로 정렬된 사운드 리스트 리턴
-def recommend_by_vector(query_vector: np.ndarray, top_k: int = 22):
-    # 전체 사운드가 22개이므로 22개 검색
-    D, I = faiss_index.search(np.array([query_vector]), top_k)
-    
-    # 유사도 점수를 포함하여 결과 생성
-    results = []
-    for i, (distance, index) in enumerate(zip(D[0], I[0])):
-        sound = sound_pool[index].copy()
-        # 거리를 유사도 점수로 변환 (0~1 범위)
-        similarity_score = 1.0 / (1.0 + distance)
-        sound['similarity_score'] = similarity_score
-        results.append(sound)
-    
-    # 다양성을 위한 카테고리별 샘플링 (간단한 버전)
-    diverse_results = []
-    categories = {}
-    
-    # 카테고리별로 그룹화
-    for sound in results:
-        category = sound.get('category', '기타')
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(sound)
-    
-    # 각 카테고리에서 상위 2개씩 선택 (더 적게)
-    for category, sounds in categories.items():
-        top_sounds = sorted(sounds, key=lambda x: x['similarity_score'], reverse=True)[:2]
-        diverse_results.extend(top_sounds)
-    
-    # 유사도 점수로 재정렬
-    diverse_results = sorted(diverse_results, key=lambda x: x['similarity_score'], reverse=True)
-    
-    # 최종적으로 top_k개 반환
-    return diverse_results[:top_k]
\ No newline at end of file
+# (nprobe / ef_search는 ANN 인덱스에서만 사용, 없으면 요청 설정 → 환경 변수 기본값 순)
+def recommend_by_vector(query_vector: np.ndarray, top_k: int = 22, **search_kwargs):
+    # top_k가 전체 사운드 수보다 크면 전체를 대상으로 다양성 필터 적용
+    return recommend_by_vectors(np.array([query_vector]), top_k, **search_kwargs)[0]
+
+# 여러 사용자의 쿼리 벡터 (N, 384)를 한 번의 행렬곱(또는 ANN 배치 검색)으로 처리
+def recommend_by_vectors(query_vectors: np.ndarray, top_k: int = 22, **search_kwargs):
+    return load_catalog().recommend(query_vectors, top_k, **search_kwargs)
+
+# 쿼리 벡터 (384,) 또는 (N, 384)의 후보를 사운드 dict 없이 배열로 반환 (점수 계산 후 Candidates.sounds()로 변환)
+def search_candidates(query_vectors: np.ndarray, top_k: int = 22, **search_kwargs) -> Candidates:
+    return load_catalog().candidates(np.atleast_2d(query_vectors), top_k, **search_kwargs)
@@ -0,0 +1,59 @@
+# readiness.py
+# 무거운 리소스(임베딩 모델, FAISS 인덱스, LLM 자격 증명)의 로드 상태와 소요 시간 기록
+# /ready 엔드포인트에서 컴포넌트별 준비 상태를 보고하는 데 사용
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable
+
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReadinessRegistry:
+    """컴포넌트별 준비 상태 (ready / load_seconds / error)를 보관합니다."""
+
+    def __init__(self, components: Iterable[str]):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict] = {
+            name: {"ready": False, "load_seconds": None, "error": None} for name in components
+        }
+
+    def register(self, name: str):
+        """설정에 따라 추가로 준비가 필요한 컴포넌트를 등록합니다. (아직 준비되지 않은 상태로)"""
+        with self._lock:
+            self._components.setdefault(name, {"ready": False, "load_seconds": None, "error": None})
+
+    @contextmanager
+    def track(self, name: str):
+        """블록 실행 시간을 로드 시간으로 기록하고, 성공하면 ready로 표시합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self._components[name] = {
+                    "ready": False,
+                    "load_seconds": round(time.perf_counter() - start, 3),
+                    "error": str(e)
+                }
+            logger.error("Component failed to load", extra={"component": name, "error": str(e)})
+            raise
+        elapsed = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self._components[name] = {"ready": True, "load_seconds": elapsed, "error": None}
+        logger.info("Component ready", extra={"component": name, "load_seconds": elapsed})
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(c["ready"] for c in self._components.values())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: dict(state) for name, state in self._components.items()}
+
+
+# 전역 인스턴스 생성
+readiness = ReadinessRegistry(["embedding_model", "faiss_index", "llm_credentials", "warmup_inference"])
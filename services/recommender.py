@@ -1,41 +1,120 @@
 # recommender.py
 
-from services.embedding_service import embed_text
-from utils.prompt_builder import build_prompt, build_combined_prompt
-from services.rag_recommender import recommend_by_vector
-from services.llm_service import generate_recommendation_text
-from services.score_calculator import compute_final_scores
+import asyncio
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from services.embedding_service import embed_text, embed_texts
+from services.query_embedding import embed_survey_query, embed_survey_queries
+from utils.prompt_builder import (
+    build_combined_prompt, combine_prompts, join_phrases, prepare_survey_query, summarize_sleep_data,
+    survey_field_values, translate_noise_other
+)
+from services.rag_recommender import Candidates, load_catalog, search_candidates
+from services.pipeline import Stage, StageGraph
+from services.llm_service import stream_recommendation_text
+from services.bedrock_client import fallback_reason
+from services.deadline import DeadlineExceeded
+from services.text_cache import (
+    RECOMMENDATION_TEXTS, cached_recommendation_text, pick_cached_text, remember_text, text_fingerprint
+)
+from services.template_text import TEMPLATE_TEXTS, compose_text, template_reason
+from services.score_calculator import UserWeights, rank_order, score_matrix
+from services.metrics import stage_timer, LLM_FALLBACKS
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 임베딩 / FAISS 검색 같은 CPU 작업 전용 스레드풀
+# (이벤트 루프와 Starlette 기본 스레드풀을 막지 않도록 별도로 분리)
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "4"))
+_cpu_executor = ThreadPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu-stage")
+
+
+async def run_cpu_bound(func, *args):
+    """
+    CPU 작업을 전용 스레드풀에서 실행하고 결과를 기다립니다.
+    요청 컨텍스트(contextvars - ANN 검색 파라미터 등)를 복사해 스레드에서도 같은 값을 보게 합니다.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_cpu_executor, context.run, func, *args)
+
 
 # ------------------------------
 # 1. 설문 기반 추천
 # ------------------------------
-def recommend(user_input: dict):
-    # 1. 사용자의 설문 응답 → 자연어 쿼리 생성
-    prompt_for_rag = build_prompt(user_input)
-    embedding = embed_text(prompt_for_rag)  # 쿼리를 벡터로 임베딩
-
-    # 2. FAISS 유사도 반환
-    similar_sounds = recommend_by_vector(embedding)
-
-    # 3. preferredSounds가 있는 경우 점수 계산 적용
-    if user_input.get("preferredSounds") is not None:
-        print("[recommend] Using scoring with preferred sounds")
-        # 설문 기반 추천이지만 선호 사운드가 있는 경우 점수 계산 적용
-        scored = compute_final_scores(
-            candidates=similar_sounds,
-            preferred_ids=user_input["preferredSounds"],
-            effectiveness_input={
-                "prev_score": 70,  # 설문 기반이므로 기본값 사용
-                "curr_score": 70,  # 설문 기반이므로 기본값 사용
-                "main_sounds": user_input.get("previousRecommendations", [])[:1],
-                "sub_sounds": user_input.get("previousRecommendations", [])[1:]
-            },
-            balance=user_input.get("preferenceBalance", 0.5)
-        )
-        # 점수 계산 결과를 사용
-        similar_sounds = [s["sound"] for s in scored]
+async def recommend(user_input: dict):
+    # 1~3. 번역 → 쿼리 생성 → 임베딩 → FAISS 검색 → 점수 계산 (카탈로그 준비는 번역과 겹쳐 실행)
+    # 4. LLM 호출로 추천 멘트 생성 (남은 예산 안에서, 실패 / 시간 초과 시 기본 멘트)
+    results = await SURVEY_PIPELINE.run({"user_input": user_input}, targets=["text"])
+    final_recommendation_text, text_source = results["text"]
+
+    # 5. 최종 응답 리턴
+    return build_result(final_recommendation_text, results["score"], text_source)
+
+
+async def rank_for_survey(user_input: dict):
+    """설문 기반 추천의 순위 결정 단계 (LLM 멘트 제외). (prompt_for_rag, 순위가 매겨진 사운드 목록)을 반환합니다."""
+    results = await SURVEY_PIPELINE.run({"user_input": user_input}, targets=["score"])
+    ranked_sounds = results["score"]
+    assign_ranks(ranked_sounds)
+
+    prompt_for_rag, _ = results["prompt"]
+    return prompt_for_rag, ranked_sounds
+
+
+def survey_query(user_input: dict, translate: str) -> tuple:
+    """번역이 끝난 설문으로 RAG 쿼리 문장과 (필드, 템플릿, 값 목록)을 만듭니다."""
+    field_values = survey_field_values(user_input, translate)
+    return join_phrases(field_values), field_values
+
 
-    # 4. LLM 추천 멘트를 위해 Top 3만 추림
+def survey_weights(user_input: dict) -> UserWeights:
+    """설문 기반 추천의 점수 가중치 (preferredSounds가 없으면 검색 유사도 순서 그대로)"""
+    if user_input.get("preferredSounds") is None:
+        return UserWeights.similarity_only()
+
+    logger.debug("Using scoring with preferred sounds")
+    # 설문 기반 추천이지만 선호 사운드가 있는 경우 점수 계산 적용
+    return UserWeights(
+        preferred_ids=user_input["preferredSounds"],
+        effectiveness_input={
+            "prev_score": 70,  # 설문 기반이므로 기본값 사용
+            "curr_score": 70,  # 설문 기반이므로 기본값 사용
+            "main_sounds": user_input.get("previousRecommendations", [])[:1],
+            "sub_sounds": user_input.get("previousRecommendations", [])[1:]
+        },
+        balance=user_input.get("preferenceBalance", 0.5)
+    )
+
+
+def rank_candidates(candidates: Candidates, weights: list) -> list:
+    """
+    검색 후보 전체를 (사용자 × 후보) 점수 행렬 한 번으로 정렬해 사용자별 사운드 목록을 만듭니다.
+    weights[i]는 candidates의 i번째 쿼리(사용자) 가중치입니다.
+    """
+    scores = score_matrix(candidates.similarity, candidates.filename_codes, weights, candidates.engine.filename_codes_of)
+    order = rank_order(scores)
+    ranked = [candidates.sounds(row, order[row]) for row in range(len(candidates))]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Scoring done", extra={"top3": [
+            [{'filename': sound.get('filename'), 'score': float(score)} for sound, score in zip(sounds, row_scores[row_order[:3]])]
+            for sounds, row_scores, row_order in zip(ranked, scores, order)
+        ]})
+    return ranked
+
+
+def rank_survey_sounds(user_input: dict, candidates: Candidates) -> list:
+    """설문 기반 추천의 검색 결과에 선호 사운드 점수를 반영해 순위를 매깁니다."""
+    return rank_candidates(candidates, [survey_weights(user_input)])[0]
+
+
+def survey_text_request(user_input: dict, prompt_for_rag: str, similar_sounds: list) -> dict:
+    """설문 기반 추천 멘트 생성에 넘길 LLM 입력을 만듭니다."""
+    # LLM 추천 멘트를 위해 Top 3만 추림
     top_3_for_llm = similar_sounds[:3]
 
     # 사용자의 사운드 취향 정보 전달
@@ -43,33 +122,103 @@ def recommend(user_input: dict):
         "calmingSoundType": user_input.get("calmingSoundType")
     }
 
-    # 5. LLM 호출로 추천 멘트 생성
-    final_recommendation_text = ""
+    return {
+        "user_prompt": prompt_for_rag,
+        "sound_results": top_3_for_llm,
+        "user_preferences": user_preferences
+    }
+
+
+def survey_template_text(user_input: dict, similar_sounds: list) -> str:
+    """설문 기반 추천의 템플릿 멘트 (LLM 없이)"""
+    return compose_text(user_input, similar_sounds)
+
+
+async def generate_survey_text(user_input: dict, prompt_for_rag: str, similar_sounds: list) -> tuple:
+    """
+    설문 기반 추천 멘트를 생성합니다. LLM 실패 / 요청 예산 초과 시 템플릿 멘트로 대체합니다.
+    (멘트, 출처)를 반환합니다. 출처는 build_result의 text_source 참고.
+    """
+    text_request = survey_text_request(user_input, prompt_for_rag, similar_sounds)
+    reason = template_reason()
+    if reason is not None:
+        return await text_without_llm(text_request, lambda: survey_template_text(user_input, similar_sounds), reason)
     try:
-        final_recommendation_text = generate_recommendation_text(
-            user_prompt=prompt_for_rag, 
-            sound_results=top_3_for_llm,
-            user_preferences=user_preferences
-        )
+        return await cached_recommendation_text(**text_request)
     except Exception as e:
         # 실패 시 fallback 멘트 생성
-        print(f"LLM generation failed: {e}. Falling back to default text.")
-        sound_titles = similar_sounds[0]['filename'] if similar_sounds else "추천 사운드"
-        fallback_text = (
-            f"당신의 현재 상황을 고려하여 몇 가지 사운드를 찾아봤어요. "
-            f"'{sound_titles}' 같은 소리는 어떠신가요? "
-            f"오늘 밤, 이 소리들과 함께 편안한 시간을 보내시길 바래요."
-        )
-        final_recommendation_text = fallback_text
-    
-    # 6. 응답을 위해 rank 필드 추가
-    for i, sound_obj in enumerate(similar_sounds):
+        return fallback_text(e, survey_template_text(user_input, similar_sounds), "LLM generation failed, falling back to default text")
+
+
+async def stream_survey_text(user_input: dict, prompt_for_rag: str, similar_sounds: list):
+    """
+    generate_survey_text의 스트리밍 버전. 텍스트 조각을 도착하는 대로 내보냅니다.
+    첫 조각이 오기 전에 LLM이 실패하면 기본 멘트를 한 번에 내보냅니다.
+    """
+    text_request = survey_text_request(user_input, prompt_for_rag, similar_sounds)
+    reason = template_reason()
+    if reason is not None:
+        text, _ = await text_without_llm(text_request, lambda: survey_template_text(user_input, similar_sounds), reason)
+        yield text
+        return
+
+    started = False
+    try:
+        async for chunk in stream_cached_text(text_request):
+            started = True
+            yield chunk
+    except Exception as e:
+        # 이미 일부를 보냈다면 이어 붙일 수 없으므로 그대로 예외 전달
+        if started:
+            raise
+        text, _ = fallback_text(e, survey_template_text(user_input, similar_sounds), "LLM streaming failed, falling back to default text")
+        yield text
+
+
+def fallback_text(error: Exception, text: str, message: str) -> tuple:
+    """LLM 대신 기본 멘트(템플릿 멘트 text)를 사용합니다. (멘트, 출처)를 반환하고 대체 사유를 지표에 남깁니다."""
+    if isinstance(error, DeadlineExceeded):
+        # 예산 초과는 예상된 경로이므로 경고 없이 지표로만 확인
+        LLM_FALLBACKS.inc(reason="deadline")
+        return text, "deadline_fallback"
+    logger.warning(message, extra={"error": str(error)})
+    LLM_FALLBACKS.inc(reason=fallback_reason(error))
+    return text, "fallback"
+
+
+async def text_without_llm(text_request: dict, compose, reason: str) -> tuple:
+    """
+    LLM을 호출하지 않고 멘트를 만듭니다. (멘트, 출처)를 반환합니다.
+    LLM 부하로 전환된 경우(auto 모드)는 멘트 캐시에 모인 LLM 멘트가 있으면 먼저 사용하고, 없으면 템플릿 멘트.
+    """
+    if reason != "requested":
+        cached = await pick_cached_text(text_fingerprint(**text_request))
+        if cached is not None:
+            RECOMMENDATION_TEXTS.inc(source="cache")
+            return cached, "cache"
+    TEMPLATE_TEXTS.inc(reason=reason)
+    RECOMMENDATION_TEXTS.inc(source="template")
+    return compose(), "template"
+
+
+def assign_ranks(ranked_sounds: list):
+    """응답을 위해 rank 필드를 추가합니다. (1부터 시작)"""
+    for i, sound_obj in enumerate(ranked_sounds):
         sound_obj['rank'] = i + 1
 
-    # 7. 최종 응답 리턴
+
+def build_result(recommendation_text: str, ranked_sounds: list, text_source: str = None) -> dict:
+    """
+    최종 응답 형식으로 만듭니다.
+    text_source: 멘트를 만든 경로 - "llm" | "llm_hedge" | "cache" | "template"(템플릿 모드 / LLM 부하)
+                 | "fallback"(LLM 실패) | "deadline_fallback"(요청 예산 초과) | None(멘트를 따로 생성하는 경우)
+    """
+    assign_ranks(ranked_sounds)
+
     return {
-        "recommendation_text": final_recommendation_text,
-        "recommended_sounds": similar_sounds
+        "recommendation_text": recommendation_text,
+        "recommended_sounds": ranked_sounds,
+        "text_source": text_source
     }
 
 
@@ -78,10 +227,37 @@ def recommend(user_input: dict):
 # ------------------------------
 # 3. 통합 추천 (수면 데이터 + 설문 데이터)
 # ------------------------------
-def recommend_with_both_data(user_input: dict, is_new_user: bool = True):
-    print(f"[recommend_with_both_data] user_input: {user_input}, is_new_user: {is_new_user}")
+async def recommend_with_both_data(user_input: dict, is_new_user: bool = True):
+    # 1~4. (수면 요약 | 설문 번역 | 카탈로그 준비) → 통합 프롬프트 → 임베딩 → FAISS 검색 → 점수 계산
+    # 5. LLM으로 추천 텍스트 생성 (기존 추천 결과 유무에 따라 다른 프롬프트)
+    results = await run_combined_pipeline(user_input, is_new_user, target="text")
+    ranked_sounds = results["score"]
+    text, text_source = results["text"]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LLM text generated", extra={"text_length": len(text), "text_source": text_source})
     
-    # 1. 수면 데이터와 설문 데이터를 모두 사용한 프롬프트 생성
+    # 6. 응답 형식 맞추기
+    return build_result(text, ranked_sounds, text_source)
+
+
+async def rank_with_both_data(user_input: dict, is_new_user: bool = True):
+    """통합 추천의 순위 결정 단계 (LLM 멘트 제외). (prompt_for_rag, 순위가 매겨진 사운드 목록)을 반환합니다."""
+    results = await run_combined_pipeline(user_input, is_new_user, target="score")
+    ranked_sounds = results["score"]
+    assign_ranks(ranked_sounds)
+    
+    return results["prompt"], ranked_sounds
+
+
+async def run_combined_pipeline(user_input: dict, is_new_user: bool, target: str) -> dict:
+    """통합 추천 단계 그래프를 target 단계까지 실행합니다."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined recommendation started", extra={"user_id": user_input.get("userID"), "is_new_user": is_new_user})
+    return await COMBINED_PIPELINE.run({"user_input": user_input, "is_new_user": is_new_user}, targets=[target])
+
+
+def split_combined_input(user_input: dict) -> tuple:
+    """평탄화된 입력을 (수면 데이터, 설문 데이터)로 분리합니다."""
     sleep_data = {
         "previous": user_input.get("previous"),  # None일 수 있음
         "current": user_input["current"]
@@ -91,73 +267,68 @@ def recommend_with_both_data(user_input: dict, is_new_user: bool = True):
                    if k not in ["userId", "preferredSounds", 
                                "previous", "current", "previousRecommendations"]}
     
-    prompt_for_rag = build_combined_prompt(sleep_data, survey_data)
-    print("[recommend_with_both_data] prompt_for_rag:", prompt_for_rag)
-    
-    # 2. 통합 프롬프트로 임베딩 생성
-    embedding = embed_text(prompt_for_rag["summary"])
-    print("[recommend_with_both_data] embedding shape:", getattr(embedding, 'shape', None))
-    
-    # 3. FAISS 유사도 검색
-    similar_sounds = recommend_by_vector(embedding)
-    print(f"[recommend_with_both_data] similar_sounds (top 3): {[s.get('filename') for s in similar_sounds[:3]]}")
+    return sleep_data, survey_data
+
+
+async def build_combined_query(user_input: dict) -> dict:
+    """평탄화된 입력에서 수면 데이터와 설문 데이터를 분리해 통합 프롬프트를 만듭니다."""
+    sleep_data, survey_data = split_combined_input(user_input)
+    return await build_combined_prompt(sleep_data, survey_data)
+
+
+def combined_query(user_input: dict, sleep_summary: dict, translate: str) -> dict:
+    """수면 요약과 번역이 끝난 설문으로 통합 프롬프트를 만듭니다. (build_combined_query와 같은 결과)"""
+    _, survey_data = split_combined_input(user_input)
+    prompt_for_rag = combine_prompts(sleep_summary, join_phrases(survey_field_values(survey_data, translate)))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined prompt built", extra={"summary": prompt_for_rag["summary"]})
+    return prompt_for_rag
+
+
+def combined_weights(user_input: dict, is_new_user: bool) -> UserWeights:
+    """수면 점수 변화와 선호 사운드를 반영하는 통합 추천의 점수 가중치"""
+    # previous 데이터가 있는 경우에만 prev_score 사용
+    if user_input.get("previous"):
+        prev_score = user_input["previous"]["sleepScore"]
+        curr_score = user_input["current"]["sleepScore"]
+    else:
+        # previous 데이터가 없는 경우 오늘 데이터만 사용
+        prev_score = user_input["current"]["sleepScore"]  # 오늘 데이터를 기준으로 설정
+        curr_score = user_input["current"]["sleepScore"]
     
-    # 4. 점수 계산 (기존 추천 결과 유무에 따라 다른 방식 적용)
     if is_new_user:
         # 기존 추천 결과가 없는 경우: 기본 점수 계산
-        print("[recommend_with_both_data] New user: Using basic scoring")
-        
-        # previous 데이터가 있는 경우에만 prev_score 사용
-        if user_input.get("previous"):
-            prev_score = user_input["previous"]["sleepScore"]
-            curr_score = user_input["current"]["sleepScore"]
-        else:
-            # previous 데이터가 없는 경우 오늘 데이터만 사용
-            prev_score = user_input["current"]["sleepScore"]  # 오늘 데이터를 기준으로 설정
-            curr_score = user_input["current"]["sleepScore"]
-        
-        scored = compute_final_scores(
-            candidates=similar_sounds,
-            preferred_ids=user_input.get("preferredSounds", []),  # preferredSounds가 없으면 빈 리스트 사용
-            effectiveness_input={
-                "prev_score": prev_score,
-                "curr_score": curr_score,
-                "main_sounds": [],  # 기존 추천 결과 없음
-                "sub_sounds": []    # 기존 추천 결과 없음
-            },
-            balance=user_input.get("preferenceBalance", 0.5)  # 기본값 0.5 (균형)
-        )
+        logger.debug("New user: using basic scoring")
+        main_sounds = []  # 기존 추천 결과 없음
+        sub_sounds = []   # 기존 추천 결과 없음
     else:
         # 기존 추천 결과가 있는 경우: 기존 결과를 학습하여 개선된 점수 계산
-        print("[recommend_with_both_data] Existing user: Using enhanced scoring with previous recommendations")
-        
-        # previous 데이터가 있는 경우에만 prev_score 사용
-        if user_input.get("previous"):
-            prev_score = user_input["previous"]["sleepScore"]
-            curr_score = user_input["current"]["sleepScore"]
-        else:
-            # previous 데이터가 없는 경우 오늘 데이터만 사용
-            prev_score = user_input["current"]["sleepScore"]  # 오늘 데이터를 기준으로 설정
-            curr_score = user_input["current"]["sleepScore"]
-        
-        scored = compute_final_scores(
-            candidates=similar_sounds,
-            preferred_ids=user_input.get("preferredSounds", []),  # preferredSounds가 없으면 빈 리스트 사용
-            effectiveness_input={
-                "prev_score": prev_score,
-                "curr_score": curr_score,
-                "main_sounds": user_input.get("previousRecommendations", [])[:1],  
-                "sub_sounds": user_input.get("previousRecommendations", [])[1:]    
-            },
-            balance=user_input.get("preferenceBalance", 0.5)  # 0.0~1.0 소수값
-        )
+        logger.debug("Existing user: using enhanced scoring with previous recommendations")
+        main_sounds = user_input.get("previousRecommendations", [])[:1]
+        sub_sounds = user_input.get("previousRecommendations", [])[1:]
     
-    print(f"[recommend_with_both_data] scored (top 3): {[{'filename': s['sound'].get('filename'), 'score': s['score']} for s in scored[:3]]}")
-    
-    # 5. Top 3 추출
-    top3 = [s["sound"] for s in scored[:3]]
+    return UserWeights(
+        preferred_ids=user_input.get("preferredSounds", []),  # preferredSounds가 없으면 빈 리스트 사용
+        effectiveness_input={
+            "prev_score": prev_score,
+            "curr_score": curr_score,
+            "main_sounds": main_sounds,
+            "sub_sounds": sub_sounds
+        },
+        balance=user_input.get("preferenceBalance", 0.5)  # 0.0~1.0 소수값 (기본값 0.5 균형)
+    )
+
+
+def rank_combined_sounds(user_input: dict, candidates: Candidates, is_new_user: bool) -> list:
+    """수면 점수 변화와 선호 사운드를 반영해 통합 추천 순위를 매깁니다."""
+    return rank_candidates(candidates, [combined_weights(user_input, is_new_user)])[0]
+
+
+def combined_text_request(user_input: dict, prompt_for_rag: dict, ranked_sounds: list, is_new_user: bool) -> dict:
+    """통합 추천 멘트 생성에 넘길 LLM 입력을 만듭니다."""
+    # Top 3 추출
+    top3 = ranked_sounds[:3]
     
-    # 6. LLM으로 추천 텍스트 생성 (기존 추천 결과 유무에 따라 다른 프롬프트)
     user_preferences = {
         "calmingSoundType": user_input.get("calmingSoundType"),
         "noisePreference": user_input.get("noisePreference")
@@ -167,24 +338,215 @@ def recommend_with_both_data(user_input: dict, is_new_user: bool = True):
     if not is_new_user and user_input.get("previousRecommendations"):
         # 기존 추천 결과가 있는 경우: 개선된 추천 메시지
         context_info = f"이전에 추천받은 사운드들({', '.join(user_input['previousRecommendations'][:3])})을 바탕으로 더 나은 추천을 제공합니다."
-        print(f"[recommend_with_both_data] Context for existing user: {context_info}")
+        logger.debug("Context for existing user: %s", context_info)
     else:
         # 기존 추천 결과가 없는 경우: 첫 추천 메시지
         context_info = "수면 데이터와 설문 결과를 바탕으로 첫 번째 맞춤형 추천을 제공합니다."
-        print(f"[recommend_with_both_data] Context for new user: {context_info}")
-    
-    text = generate_recommendation_text(
-        user_prompt=prompt_for_rag,
-        sound_results=top3,
-        user_preferences=user_preferences
-    )
-    print("[recommend_with_both_data] LLM text:", text)
-    
-    # 7. 응답 형식 맞추기
-    for i, s in enumerate(scored):
-        s["sound"]["rank"] = i + 1
+        logger.debug("Context for new user: %s", context_info)
     
     return {
-        "recommendation_text": text,
-        "recommended_sounds": [s["sound"] for s in scored]
+        "user_prompt": prompt_for_rag,
+        "sound_results": top3,
+        "user_preferences": user_preferences
     }
+
+
+def combined_template_text(user_input: dict, prompt_for_rag: dict, ranked_sounds: list, is_new_user: bool) -> str:
+    """통합 추천의 템플릿 멘트 (수면 평가 등급 / 점수 변화 포함, LLM 없이)"""
+    return compose_text(
+        user_input, ranked_sounds,
+        evaluation=prompt_for_rag.get("evaluation"),
+        improvement=prompt_for_rag.get("improvement"),
+        is_new_user=is_new_user or not user_input.get("previousRecommendations")
+    )
+
+
+async def generate_combined_text(user_input: dict, prompt_for_rag: dict, ranked_sounds: list, is_new_user: bool) -> tuple:
+    """
+    통합 추천 멘트를 LLM으로 생성합니다. LLM 실패 / 요청 예산 초과 시 템플릿 멘트로 대체합니다.
+    (멘트, 출처)를 반환합니다.
+    """
+    text_request = combined_text_request(user_input, prompt_for_rag, ranked_sounds, is_new_user)
+    template = lambda: combined_template_text(user_input, prompt_for_rag, ranked_sounds, is_new_user)
+    reason = template_reason()
+    if reason is not None:
+        return await text_without_llm(text_request, template, reason)
+    try:
+        return await cached_recommendation_text(**text_request)
+    except Exception as e:
+        return fallback_text(e, template(), "LLM generation failed, falling back to default text")
+
+
+async def stream_combined_text(user_input: dict, prompt_for_rag: dict, ranked_sounds: list, is_new_user: bool):
+    """
+    generate_combined_text의 스트리밍 버전. 텍스트 조각을 도착하는 대로 내보냅니다.
+    첫 조각이 오기 전에 LLM이 실패하면 기본 멘트를 한 번에 내보냅니다.
+    """
+    text_request = combined_text_request(user_input, prompt_for_rag, ranked_sounds, is_new_user)
+    template = lambda: combined_template_text(user_input, prompt_for_rag, ranked_sounds, is_new_user)
+    reason = template_reason()
+    if reason is not None:
+        text, _ = await text_without_llm(text_request, template, reason)
+        yield text
+        return
+
+    started = False
+    try:
+        async for chunk in stream_cached_text(text_request):
+            started = True
+            yield chunk
+    except Exception as e:
+        if started:
+            raise
+        text, _ = fallback_text(e, template(), "LLM streaming failed, falling back to default text")
+        yield text
+
+
+async def stream_cached_text(text_request: dict):
+    """
+    멘트 캐시를 거치는 스트리밍. 캐시된 멘트가 있으면 한 번에 내보내고,
+    없으면 LLM 스트림을 그대로 전달한 뒤 완성된 멘트를 캐시에 추가합니다.
+    """
+    key = text_fingerprint(**text_request)
+    cached = await pick_cached_text(key)
+    if cached is not None:
+        RECOMMENDATION_TEXTS.inc(source="cache")
+        yield cached
+        return
+
+    chunks = []
+    with stage_timer("llm"):
+        async for chunk in stream_recommendation_text(**text_request):
+            chunks.append(chunk)
+            yield chunk
+    RECOMMENDATION_TEXTS.inc(source="llm")
+    await remember_text(key, "".join(chunks))
+
+
+# ------------------------------
+# 파이프라인 단계 그래프
+# ------------------------------
+# 각 단계는 deps가 끝나는 즉시 시작합니다. 번역(Bedrock 왕복)이 가장 오래 걸리므로
+# 수면 요약과 카탈로그(FAISS 인덱스) 준비는 번역과 겹쳐 실행되고, 이후 단계는 데이터 의존성대로 이어집니다.
+# LLM 멘트 단계("text")는 캐시 / LLM 구분을 위해 내부에서 "llm" 단계를 직접 측정합니다.
+SURVEY_PIPELINE = StageGraph("survey", [
+    Stage("translate", lambda user_input: translate_noise_other(user_input), deps=["user_input"]),
+    Stage("catalog", load_catalog, cpu=True),
+    Stage("prompt", survey_query, deps=["user_input", "translate"]),
+    # QUERY_EMBEDDING_MODE=compositional이면 문구 테이블로 조합
+    Stage("embed", lambda prompt: embed_survey_query(*prompt), deps=["prompt"], cpu=True),
+    Stage("search", lambda embed, catalog: search_candidates(embed), deps=["embed", "catalog"], cpu=True),
+    Stage("score", lambda user_input, search: rank_survey_sounds(user_input, search), deps=["user_input", "search"]),
+    Stage(
+        "text",
+        lambda user_input, prompt, score: generate_survey_text(user_input, prompt[0], score),
+        deps=["user_input", "prompt", "score"],
+        timed=False
+    ),
+], inputs=["user_input"], cpu_runner=run_cpu_bound)
+
+COMBINED_PIPELINE = StageGraph("combined", [
+    Stage("sleep_summary", lambda user_input: summarize_sleep_data(split_combined_input(user_input)[0]), deps=["user_input"]),
+    Stage("translate", lambda user_input: translate_noise_other(split_combined_input(user_input)[1]), deps=["user_input"]),
+    Stage("catalog", load_catalog, cpu=True),
+    Stage("prompt", combined_query, deps=["user_input", "sleep_summary", "translate"]),
+    Stage("embed", lambda prompt: embed_text(prompt["summary"]), deps=["prompt"], cpu=True),
+    Stage("search", lambda embed, catalog: search_candidates(embed), deps=["embed", "catalog"], cpu=True),
+    Stage(
+        "score",
+        lambda user_input, is_new_user, search: rank_combined_sounds(user_input, search, is_new_user),
+        deps=["user_input", "is_new_user", "search"]
+    ),
+    Stage(
+        "text",
+        lambda user_input, is_new_user, prompt, score: generate_combined_text(user_input, prompt, score, is_new_user),
+        deps=["user_input", "is_new_user", "prompt", "score"],
+        timed=False
+    ),
+], inputs=["user_input", "is_new_user"], cpu_runner=run_cpu_bound)
+
+
+# ------------------------------
+# 4. 배치 추천 (여러 사용자 동시 처리)
+# ------------------------------
+async def recommend_batch(user_inputs: list):
+    """
+    여러 사용자의 설문 기반 추천을 한 번에 처리합니다.
+    프롬프트는 병렬로 만들고, 임베딩은 한 번의 배치 encode, 검색은 한 번의 (N, 384) FAISS 검색으로 처리한 뒤
+    사용자별 LLM 멘트가 완성되는 순서대로 (index, result)를 내보냅니다.
+    실패한 사용자는 결과 대신 예외를 내보내 나머지 사용자 처리는 계속됩니다.
+    """
+    # 1. 모든 사용자의 RAG 쿼리 생성 (번역 호출은 동시에 진행)
+    with stage_timer("batch_prompt"):
+        queries = await asyncio.gather(*[prepare_survey_query(u) for u in user_inputs])
+    prompts = [prompt for prompt, _ in queries]
+
+    # 2. 배치 임베딩 + 행렬 검색
+    with stage_timer("batch_embed"):
+        embeddings = await run_cpu_bound(
+            embed_survey_queries, prompts, [field_values for _, field_values in queries]
+        )
+    with stage_timer("batch_search"):
+        candidates = await run_cpu_bound(search_candidates, embeddings)
+
+    # 3. 사용자별 가중치로 (사용자 × 후보) 점수 행렬을 한 번에 계산해 순위 결정
+    with stage_timer("batch_score"):
+        ranked_lists = rank_candidates(candidates, [survey_weights(u) for u in user_inputs])
+
+    # 4. LLM 멘트는 완료되는 순서대로 스트리밍
+    async def _finish(index: int):
+        try:
+            text, text_source = await generate_survey_text(user_inputs[index], prompts[index], ranked_lists[index])
+        except Exception as e:
+            return index, e
+        return index, build_result(text, ranked_lists[index], text_source)
+
+    async for item in _as_completed([_finish(i) for i in range(len(user_inputs))]):
+        yield item
+
+
+async def recommend_with_both_data_batch(user_inputs: list, is_new_user_flags: list):
+    """
+    여러 사용자의 통합 추천을 한 번에 처리합니다. (recommend_batch의 수면 데이터 버전)
+    실패한 사용자는 결과 대신 예외를 내보내 나머지 사용자 처리는 계속됩니다.
+    """
+    # 1. 모든 사용자의 통합 프롬프트 생성
+    with stage_timer("batch_prompt"):
+        prompts = await asyncio.gather(*[build_combined_query(u) for u in user_inputs])
+
+    # 2. 배치 임베딩 + 행렬 검색
+    with stage_timer("batch_embed"):
+        embeddings = await run_cpu_bound(embed_texts, [p["summary"] for p in prompts])
+    with stage_timer("batch_search"):
+        candidates = await run_cpu_bound(search_candidates, embeddings)
+
+    # 3. 사용자별 가중치로 (사용자 × 후보) 점수 행렬을 한 번에 계산해 순위 결정
+    with stage_timer("batch_score"):
+        ranked_lists = rank_candidates(
+            candidates, [combined_weights(u, is_new) for u, is_new in zip(user_inputs, is_new_user_flags)]
+        )
+
+    # 4. LLM 멘트는 완료되는 순서대로 스트리밍
+    async def _finish(index: int):
+        try:
+            text, text_source = await generate_combined_text(
+                user_inputs[index], prompts[index], ranked_lists[index], is_new_user_flags[index]
+            )
+        except Exception as e:
+            return index, e
+        return index, build_result(text, ranked_lists[index], text_source)
+
+    async for item in _as_completed([_finish(i) for i in range(len(user_inputs))]):
+        yield item
+
+
+async def _as_completed(coroutines: list):
+    """코루틴들을 동시에 실행하고 끝나는 순서대로 결과를 내보냅니다."""
+    tasks = [asyncio.create_task(c) for c in coroutines]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # 클라이언트 연결이 끊기는 등 중간에 종료되면 남은 LLM 호출 취소
+        for task in tasks:
+            task.cancel()
@@ -1,13 +1,32 @@
 # score_calculator.py
+# 검색 후보의 최종 점수 = similarity_score + alpha * 선호도 가중치 + beta * 효과성 가중치
+# - 사용자별 가중치는 UserWeights(filename 목록 + 가중치 배열, preferenceBalance의 alpha / beta)로 한 번 만들고,
+#   (사용자 수 × 후보 수) 점수 행렬을 한 번에 계산해 argsort로 순위를 정함 (단건 / 배치 추천 공통)
+# - 후보와 선호 / 이전 추천 사운드는 filename 대신 정수 코드로 비교 (rag_recommender.RetrievalEngine.filename_codes)
+
+import functools
+import logging
+from itertools import chain
+from typing import Callable, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-# 사용자의 사운드 선호 순위를 기반으로 softmax 가중치를 계산하는 함수 (filename 기준)
-def softmax_rank_weights(preferred_filenames):
-    n = len(preferred_filenames)
+from services.logger import get_logger, sampled
+
+logger = get_logger(__name__)
+
+
+@functools.lru_cache(maxsize=64)
+def _softmax_ranks(n: int) -> Tuple[float, ...]:
+    # 선호 사운드 수가 같으면 가중치도 같으므로 n별로 한 번만 계산
     ranks = np.arange(n)[::-1]  # 높은 순위일수록 큰 점수 부여
     weights = np.exp(ranks) / np.sum(np.exp(ranks))  # softmax 계산
-    return dict(zip(preferred_filenames, weights))  # 사운드 filename별 가중치 딕셔너리 반환
+    return tuple(weights.tolist())
+
+
+# 사용자의 사운드 선호 순위를 기반으로 softmax 가중치를 계산하는 함수 (filename 기준)
+def softmax_rank_weights(preferred_filenames):
+    return dict(zip(preferred_filenames, _softmax_ranks(len(preferred_filenames))))  # 사운드 filename별 가중치 딕셔너리 반환
 
 
 # 이전 수면 점수 대비 현재 점수의 변화량을 바탕으로 효과성 가중치 계산 (filename 기준)
@@ -30,37 +49,132 @@ def choose_weights(balance=None):
         alpha = (1.0 - balance) * 0.5  # 선호도 가중치 (0.5 ~ 0.0)
         beta = balance * 0.5  # 효과성 가중치 (0.0 ~ 0.5)
         return alpha, beta
-    
+
     # 기본값: 균형형 (0.5)
     return 0.25, 0.25
 
 
-# 후보 사운드 리스트에 대해 최종 점수 계산 후 정렬하는 메인 함수
+class UserWeights:
+    """
+    사용자 한 명의 점수 가중치.
+    선호 / 효과성 가중치는 filename 목록과 같은 순서의 가중치 목록으로 들고 있습니다. (같은 filename은 마지막 값)
+    배열 변환은 score_matrix에서 사용자 전체를 한 번에 합니다.
+    """
+
+    __slots__ = ("pref_names", "pref_weights", "eff_names", "eff_weights", "alpha", "beta")
+
+    def __init__(self, preferred_ids: Sequence[str] = (), effectiveness_input: Optional[dict] = None, balance=None):
+        pref = softmax_rank_weights(list(preferred_ids))
+        eff = compute_effectiveness(**effectiveness_input) if effectiveness_input else {}
+        self.pref_names = list(pref)
+        self.pref_weights = list(pref.values())
+        self.eff_names = list(eff)
+        self.eff_weights = list(eff.values())
+        self.alpha, self.beta = choose_weights(balance=balance)
+
+    @classmethod
+    def similarity_only(cls) -> "UserWeights":
+        """유사도 순서를 그대로 유지하는 가중치 (선호 / 효과성 반영 없음)"""
+        weights = cls()
+        weights.alpha = weights.beta = 0.0
+        return weights
+
+
+def score_matrix(
+    similarity: np.ndarray,
+    candidate_codes: np.ndarray,
+    users: Sequence[UserWeights],
+    codes_of: Callable[[List[str]], np.ndarray]
+) -> np.ndarray:
+    """
+    (사용자 수 U, 후보 수 K) 최종 점수 행렬을 계산합니다.
+    similarity / candidate_codes: (U, K) 후보 similarity_score와 filename 코드 (-1은 빈 자리 → -inf)
+    codes_of: filename 목록 → 같은 코드 체계의 정수 배열 (없는 사운드는 -1)
+    """
+    preference, effectiveness = weight_matrices(candidate_codes, users, codes_of)
+    alpha = np.array([u.alpha for u in users], dtype=np.float64)[:, None]
+    beta = np.array([u.beta for u in users], dtype=np.float64)[:, None]
+
+    scores = similarity + alpha * preference + beta * effectiveness
+    return np.where(candidate_codes >= 0, scores, -np.inf)
+
+
+def weight_matrices(
+    candidate_codes: np.ndarray,
+    users: Sequence[UserWeights],
+    codes_of: Callable[[List[str]], np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """후보별 선호도 / 효과성 가중치 (U, K) 행렬 (alpha / beta 곱하기 전, 해당 없으면 0)"""
+    pref_codes, pref_weights = _pack([u.pref_names for u in users], [u.pref_weights for u in users], codes_of)
+    eff_codes, eff_weights = _pack([u.eff_names for u in users], [u.eff_weights for u in users], codes_of)
+    return _gather(candidate_codes, pref_codes, pref_weights), _gather(candidate_codes, eff_codes, eff_weights)
+
+
+def rank_order(scores: np.ndarray) -> np.ndarray:
+    """행별 점수 내림차순 후보 순서 (같은 점수는 원래 후보 순서, 빈 자리는 맨 뒤)"""
+    return np.argsort(-scores, axis=1, kind="stable")
+
+
+def _pack(names: List[List[str]], weights: List[List[float]], codes_of) -> Tuple[np.ndarray, np.ndarray]:
+    # 사용자마다 길이가 다른 (filename, 가중치) 목록을 코드 -1 / 가중치 0으로 채운 (U, P) 배열로 (코드 변환은 한 번에)
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    width = int(lengths.max(initial=0))
+    codes = np.full((len(names), width), -1, dtype=np.int64)
+    packed = np.zeros((len(names), width), dtype=np.float64)
+    if width:
+        rows = np.repeat(np.arange(len(names)), lengths)
+        cols = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        codes[rows, cols] = codes_of(list(chain.from_iterable(names)))
+        packed[rows, cols] = list(chain.from_iterable(weights))
+    return codes, packed
+
+
+def _gather(candidate_codes: np.ndarray, codes: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # 후보마다 같은 코드의 가중치 (사용자별 코드는 중복이 없으므로 일치는 최대 1개, 없으면 0)
+    # 채운 자리(-1)는 가중치가 0이고, 카탈로그에 없는 사운드(-1)는 빈 후보 자리에만 일치하므로 (-inf 처리) 결과에 영향 없음
+    if codes.shape[1] == 0:
+        return np.zeros(candidate_codes.shape, dtype=np.float64)
+    match = candidate_codes[:, :, None] == codes[:, None, :]
+    return np.matmul(match.astype(np.float64), weights[:, :, None])[..., 0]
+
+
+# 후보 사운드 dict 리스트에 대해 최종 점수 계산 후 정렬 (score_matrix의 사용자 1명 버전)
 def compute_final_scores(candidates, preferred_ids, effectiveness_input, balance=None):
-    print("[compute_final_scores] candidates (top 3):", [c.get('filename') for c in candidates[:3]])
-    alpha, beta = choose_weights(balance=balance)
-    print(f"[compute_final_scores] alpha: {alpha}, beta: {beta}")
-    pref_weights = softmax_rank_weights(preferred_ids)
-    print("[compute_final_scores] pref_weights:", pref_weights)
-    eff_weights = compute_effectiveness(**effectiveness_input)
-    print("[compute_final_scores] eff_weights:", eff_weights)
-    scored = []
-    for sound in candidates:
-        sid = sound["filename"]
-        base = sound.get("similarity_score", 0)
-        pref = pref_weights.get(sid, 0)
-        eff = eff_weights.get(sid, 0)
-        score = base + alpha * pref + beta * eff
-        print(f"[compute_final_scores] sound: {sid}, base: {base}, pref: {pref}, eff: {eff}, score: {score}")
-        scored.append({
-            "sound": sound,
-            "score": score,
-            "id": sid,
+    weights = UserWeights(preferred_ids, effectiveness_input, balance)
+    # 후보 filename → 후보 목록 안에서의 코드
+    codes = {}
+    candidate_codes = np.array([[codes.setdefault(sound["filename"], len(codes)) for sound in candidates]], dtype=np.int64)
+    codes_of = lambda names: np.array([codes.get(name, -1) for name in names], dtype=np.int64)
+    similarity = np.array([[sound.get("similarity_score", 0) for sound in candidates]], dtype=np.float64)
+    scores = score_matrix(similarity, candidate_codes, [weights], codes_of)[0]
+    preference, effectiveness = (matrix[0].tolist() for matrix in weight_matrices(candidate_codes, [weights], codes_of))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        log_scores(candidates, weights, scores)
+    return [
+        {
+            "sound": candidates[i],
+            "score": float(scores[i]),
+            "id": candidates[i]["filename"],
             "components": {
-                "similarity": base,
-                "preference": pref,
-                "effectiveness": eff
+                "similarity": candidates[i].get("similarity_score", 0),
+                "preference": preference[i],
+                "effectiveness": effectiveness[i]
             }
-        })
-    print("[compute_final_scores] scored (top 3):", [{"filename": s["sound"].get("filename"), "score": s["score"]} for s in scored[:3]])
-    return sorted(scored, key=lambda x: x["score"], reverse=True)
\ No newline at end of file
+        }
+        for i in rank_order(scores[None, :])[0].tolist()
+    ]
+
+
+def log_scores(candidates: List[dict], weights: UserWeights, scores: np.ndarray):
+    """점수 계산 입력과 (요청 단위로 샘플링해) 후보별 점수를 DEBUG로 남깁니다."""
+    logger.debug("Scoring weights", extra={
+        "candidates_top3": [c.get('filename') for c in candidates[:3]],
+        "alpha": weights.alpha, "beta": weights.beta,
+        "pref_weights": dict(zip(weights.pref_names, weights.pref_weights)),
+        "eff_weights": dict(zip(weights.eff_names, weights.eff_weights))
+    })
+    # 후보별 로그는 양이 많으므로 요청 단위로 샘플링
+    if sampled():
+        for sound, score in zip(candidates, scores.tolist()):
+            logger.debug("Candidate scored", extra={"sound": sound.get("filename"), "score": score})
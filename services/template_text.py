@@ -0,0 +1,241 @@
+# template_text.py
+# LLM 없이 만드는 추천 멘트 (템플릿 모드)
+# - 설문 항목(스트레스 / 수면 문제 / 감정 / 선호 소리 / 수면 목표), 수면 평가 등급(build_combined_prompt의 evaluation)과
+#   점수 변화, 사운드별 문구(sound_pool.json의 title / effect에서 만듦)를 이어 붙여 여러 문장의 멘트를 만듦
+# - 같은 사용자 / 날짜 / 사운드면 같은 멘트 (문구 변형은 해시로 고름), 요청당 수십 µs
+# - 멘트 생성 방식: TEXT_MODE 또는 요청별 text_mode
+#   llm(기본) / template(항상 템플릿) / auto(LLM 동시 호출이 TEXT_AUTO_UTILIZATION 이상 차거나 서킷 브레이커가 열리면 템플릿)
+
+import os
+import re
+import zlib
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from services.llm_providers import get_provider
+from services.metrics import Counter
+
+# 멘트 생성 방식 ("llm" | "template" | "auto")
+TEXT_MODES = ("llm", "template", "auto")
+TEXT_MODE = os.getenv("TEXT_MODE", "llm").lower()
+
+# auto 모드: (사용 중 + 대기 중인 LLM 호출) / 동시 호출 상한이 이 비율 이상이면 템플릿 사용
+TEXT_AUTO_UTILIZATION = float(os.getenv("TEXT_AUTO_UTILIZATION", "0.8"))
+
+TEMPLATE_TEXTS = Counter(
+    "template_text_total",
+    "Recommendation texts composed from templates instead of the LLM, by reason (requested, llm_busy, llm_unavailable).",
+    ["reason"]
+)
+
+# 요청별 멘트 생성 방식 (없으면 TEXT_MODE)
+_text_mode: ContextVar[Optional[str]] = ContextVar("text_mode", default=None)
+
+
+def set_text_mode(mode: Optional[str]):
+    """현재 요청의 멘트 생성 방식을 설정합니다. (None이면 TEXT_MODE)"""
+    if mode is not None and mode not in TEXT_MODES:
+        raise ValueError(f"알 수 없는 text_mode: {mode} ({' | '.join(TEXT_MODES)})")
+    _text_mode.set(mode)
+
+
+def template_reason() -> Optional[str]:
+    """
+    이번 요청에서 LLM 대신 템플릿 멘트를 쓸 이유를 반환합니다. LLM을 쓰면 None.
+    "requested"(template 모드) | "llm_unavailable"(서킷 브레이커 열림) | "llm_busy"(동시 호출 포화)
+    """
+    mode = _text_mode.get() or TEXT_MODE
+    if mode == "template":
+        return "requested"
+    if mode != "auto":
+        return None
+    provider = get_provider()
+    if provider.circuit_open():
+        return "llm_unavailable"
+    if provider.utilization() >= TEXT_AUTO_UTILIZATION:
+        return "llm_busy"
+    return None
+
+
+# ------------------------------
+# 템플릿 문구
+# ------------------------------
+OPENINGS = {
+    "high": "요즘 마음이 많이 지치고 무거우셨죠? 쉽게 내려놓을 수 없는 하루들이 이어졌을 것 같아요.",
+    "medium": "오늘 하루도 신경 쓸 일이 많으셨죠? 그만큼 잘 버텨 온 자신에게 고생했다고 말해 주고 싶어요.",
+    "low": "비교적 차분한 하루를 보내셨다니 다행이에요. 오늘 밤은 그 평온함을 잠까지 이어 가 볼까요?",
+}
+DEFAULT_OPENING = "오늘 하루도 정말 고생 많으셨어요."
+
+SLEEP_ISSUE_LINES = {
+    "fallAsleepHard": "누워도 좀처럼 잠이 오지 않는 밤은 유난히 길게 느껴지지요.",
+    "wakeOften": "자다가 자꾸 깨는 밤이 이어지면 아침까지 개운함이 남지 않아요.",
+    "wakeEarly": "원하지 않는 이른 새벽에 눈이 떠지면 하루가 더 길게 느껴지지요.",
+    "nightmares": "뒤숭숭한 꿈에 시달린 밤은 깨어나서도 마음이 한동안 무겁지요.",
+    "snoring": "코골이로 뒤척인 밤은 충분히 잔 것 같아도 몸이 제대로 쉬지 못했을 수 있어요.",
+    "lightSleep": "얕은 잠이 이어지면 작은 소리에도 쉽게 깨어 버리곤 하지요.",
+}
+
+EMOTION_LINES = {
+    "stress": "쌓인 스트레스가 잠자리까지 따라오는 날도 있지요.",
+    "anxiety": "걱정이 꼬리를 물 때는 억지로 떨쳐 내려 하지 않아도 괜찮아요.",
+    "depression": "마음이 가라앉는 날에는 조용히 곁을 지켜 주는 소리가 작은 위로가 되어 줄 거예요.",
+    "loneliness": "혼자라는 느낌이 드는 밤에도 이 소리들이 곁에 머물러 줄 거예요.",
+}
+
+# 수면 점수 등급 / 부족한 수면 지표 (summarize_sleep_data의 evaluation, "bad"인 항목만 이 순서로 최대 2개)
+SCORE_LINES = {
+    "good": "최근 수면 점수는 안정적인 편이에요. 지금의 좋은 흐름을 이어 가는 데 집중해 볼게요.",
+    "warning": "수면 점수가 조금만 더 올라가면 훨씬 개운한 아침을 맞을 수 있을 것 같아요.",
+    "bad": "요즘 잠의 질이 많이 떨어져 있어서 몸과 마음이 충분히 쉬지 못했을 거예요.",
+}
+WEAK_METRIC_LINES = [
+    ("awake", "밤사이 자주 깨어났던 만큼, 바깥 소리를 부드럽게 덮어 줄 소리를 함께 담았어요."),
+    ("deep", "특히 깊은 잠이 부족했던 만큼, 몸이 천천히 가라앉을 수 있는 소리를 골랐어요."),
+    ("rem", "꿈을 꾸는 렘수면이 부족해 마음의 피로가 덜 풀렸을 수 있어요."),
+    ("light", "잠의 흐름이 고르지 않았던 만큼, 일정한 리듬의 소리로 잠을 이어 가도록 도와 드릴게요."),
+]
+
+CONTEXT_SURVEY = "들려주신 이야기를 바탕으로 오늘 밤에 어울릴 소리들을 골라 봤어요."
+CONTEXT_NEW_USER = "수면 기록과 설문을 바탕으로 지금의 상태에 맞는 소리들을 골라 봤어요."
+CONTEXT_EXISTING_USER = "지난번에 들으셨던 소리들을 바탕으로, 이번에는 조금 더 잘 맞을 소리들로 골라 봤어요."
+
+# 목적격 조사를 붙인 선호 소리
+CALMING_SOUNDS = {
+    "rain": "빗소리를", "waves": "파도 소리를", "nature": "자연의 소리를", "wind": "바람 소리를",
+    "fire": "장작 타는 소리를", "whiteNoise": "백색소음을", "music": "잔잔한 음악을", "asmr": "ASMR을",
+}
+
+SOUND_ORDINALS = ["먼저", "이어서", "마지막으로"]
+SOUND_INTROS = [
+    "{ordinal} '{title}'{object} 들어 보세요.",
+    "{ordinal} '{title}'{subject} 함께할 거예요.",
+]
+
+# 생활 습관 조언 (처음 해당하는 하나만)
+ADVICE_LINES = [
+    ("timeToFallAsleep", {"over30min"}, "잠들기까지 시간이 오래 걸리신다면, 불을 끄기 조금 전부터 소리를 미리 틀어 두셔도 좋아요."),
+    ("screenTimeBeforeSleep", {"1hto2h", "over2h"}, "잠들기 전에는 화면을 잠시 내려놓고 소리에만 귀를 기울여 보세요."),
+    ("caffeineIntakeLevel", {"3to4cups", "over5cups"}, "오후에는 카페인을 조금 줄여 보는 것도 잠드는 데 도움이 될 거예요."),
+]
+
+CLOSINGS = {
+    "fallAsleepFast": "오늘 밤은 소리에 몸을 맡기고 스르르 잠드시길 바라요.",
+    "improveSleepQuality": "오늘 밤은 한결 깊고 편안한 잠을 누리시길 바라요.",
+    "deepSleep": "소리와 함께 천천히 깊은 잠 속으로 가라앉아 보세요.",
+    "wakeUpRefreshed": "내일 아침엔 한결 가벼운 몸과 마음으로 눈을 뜨시길 바라요.",
+    "reduceAwakenings": "오늘 밤은 깨지 않고 아침까지 푹 주무시길 바라요.",
+    "relax": "아무 생각 없이 소리에 기대어 편히 쉬어 가세요.",
+}
+DEFAULT_CLOSING = "오늘 밤, 이 소리들과 함께 편안한 시간을 보내시길 바라요."
+
+# effect 문장의 설명체 어미 → 부드러운 말투 (앞에서부터 처음 맞는 것 하나)
+EFFECT_ENDINGS = [
+    (re.compile(r"효과적입니다\.?$"), "좋아요."),
+    (re.compile(r"줍니다\.?$"), "줘요."),
+    (re.compile(r"돕습니다\.?$"), "도와요."),
+    (re.compile(r"만듭니다\.?$"), "만들어요."),
+    (re.compile(r"합니다\.?$"), "해요."),
+]
+
+# 숫자를 한국어로 읽을 때 받침이 있는 숫자 (영, 일, 삼, 육, 칠, 팔)
+_DIGITS_WITH_FINAL = set("013678")
+
+
+def _has_final_consonant(word: str) -> bool:
+    last = word.rstrip()[-1:]
+    if "가" <= last <= "힣":
+        return (ord(last) - ord("가")) % 28 != 0
+    return last in _DIGITS_WITH_FINAL
+
+
+def _particle(word: str, with_final: str, without_final: str) -> str:
+    return with_final if _has_final_consonant(word) else without_final
+
+
+@lru_cache(maxsize=4096)
+def sound_fragment(title: str, effect: str) -> str:
+    """사운드 effect 설명을 멘트 말투로 바꾼 문장 (사운드마다 한 번만 계산)"""
+    sentence = " ".join((effect or "").split())
+    for pattern, ending in EFFECT_ENDINGS:
+        if pattern.search(sentence):
+            return pattern.sub(ending, sentence)
+    if sentence:
+        return sentence
+    return f"'{title}'{_particle(title, '은', '는')} 오늘 밤 마음을 편안하게 감싸 줄 거예요."
+
+
+def _values(user_input: Dict, field: str) -> List[str]:
+    value = user_input.get(field)
+    if not value:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+def _score_delta_line(improvement: Optional[Dict]) -> Optional[str]:
+    delta = (improvement or {}).get("score_delta")
+    if not delta:
+        return None
+    points = f"{abs(delta):g}"
+    if delta > 0:
+        return f"지난번보다 수면 점수가 {points}점 올랐어요. 작은 변화지만 분명히 좋아지고 있어요."
+    return f"지난번보다 수면 점수가 {points}점 낮아졌지만, 하루하루의 변화에 너무 마음 쓰지 않으셔도 괜찮아요."
+
+
+def compose_text(
+    user_input: Dict,
+    sounds: List[Dict],
+    evaluation: Optional[Dict] = None,
+    improvement: Optional[Dict] = None,
+    is_new_user: Optional[bool] = None
+) -> str:
+    """
+    템플릿 문구로 추천 멘트를 만듭니다.
+    user_input: 평탄화된 설문 (통합 추천은 수면 데이터 포함), sounds: 추천 순서대로의 사운드 dict (Top 3 사용)
+    evaluation / improvement: 통합 추천의 수면 평가 등급과 변화량, is_new_user: 통합 추천의 신규 사용자 여부 (설문 기반이면 None)
+    """
+    top3 = sounds[:3]
+    variant = zlib.crc32(
+        "|".join([str(user_input.get("userID", "")), str(user_input.get("date", ""))] + [s.get("filename", "") for s in top3])
+        .encode("utf-8")
+    )
+
+    lines = [OPENINGS.get(user_input.get("stressLevel"), DEFAULT_OPENING)]
+    lines += [SLEEP_ISSUE_LINES[issue] for issue in _values(user_input, "sleepIssues") if issue in SLEEP_ISSUE_LINES][:2]
+    lines += [EMOTION_LINES[emotion] for emotion in _values(user_input, "emotionalSleepInterference") if emotion in EMOTION_LINES][:1]
+
+    if evaluation:
+        if evaluation.get("score") in SCORE_LINES:
+            lines.append(SCORE_LINES[evaluation["score"]])
+        lines += [line for metric, line in WEAK_METRIC_LINES if evaluation.get(metric) == "bad"][:2]
+    score_delta = _score_delta_line(improvement)
+    if score_delta:
+        lines.append(score_delta)
+
+    if is_new_user is None:
+        lines.append(CONTEXT_SURVEY)
+    else:
+        lines.append(CONTEXT_NEW_USER if is_new_user else CONTEXT_EXISTING_USER)
+    calming = CALMING_SOUNDS.get(user_input.get("calmingSoundType"))
+    if calming:
+        lines.append(f"{calming} 좋아하신다고 하셔서, 그 취향도 함께 담았어요.")
+
+    for position, sound in enumerate(top3):
+        title = sound.get("title") or sound.get("filename", "추천 사운드")
+        intro = SOUND_INTROS[(variant >> position) % len(SOUND_INTROS)]
+        lines.append(intro.format(
+            ordinal=SOUND_ORDINALS[position] if len(top3) > 1 else "오늘은",
+            title=title,
+            object=_particle(title, "을", "를"),
+            subject=_particle(title, "이", "가")
+        ))
+        lines.append(sound_fragment(title, sound.get("effect", "")))
+
+    for field, values, line in ADVICE_LINES:
+        if user_input.get(field) in values:
+            lines.append(line)
+            break
+
+    lines.append(CLOSINGS.get(user_input.get("sleepGoal"), DEFAULT_CLOSING))
+    return " ".join(lines)
@@ -0,0 +1,133 @@
+# text_cache.py
+# 추천 멘트 캐시
+# - 키: (사용자 요약, Top 3 filename, 사용자 선호, 프롬프트 템플릿 버전, LLM 백엔드 fingerprint)의 정규화된 fingerprint
+# - 키마다 최대 TEXT_CACHE_VARIANTS개의 멘트를 모아두고, 다 모이면 그중 하나를 골라 LLM 호출 없이 응답
+#   (같은 조건의 재방문 사용자도 매번 같은 멘트만 받지 않도록)
+# - LLM 호출은 요청 예산(services/deadline.py) 안에서만 기다리고, 설정 시 헤지 호출을 함께 사용
+# - sqlite 조회 / 저장은 이벤트 루프를 막지 않도록 스레드에서 실행
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from services.cache import LazySqliteStore, LRUCache
+from services.deadline import LLM_MIN_BUDGET_MS, hedged, within_deadline
+from services.llm_providers import get_provider
+from services.llm_service import PROMPT_VERSION, generate_recommendation_text
+from services.metrics import Counter, stage_timer
+
+# 메모리에 보관할 키 수 / 유지 시간
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "2000"))
+TEXT_CACHE_TTL_SECONDS = float(os.getenv("TEXT_CACHE_TTL_SECONDS", "86400"))
+
+# 키마다 모아둘 멘트 수 (0이면 캐시 사용 안 함)
+TEXT_CACHE_VARIANTS = int(os.getenv("TEXT_CACHE_VARIANTS", "3"))
+
+# 멘트 캐시 sqlite 파일 경로 (비어 있으면 사용 안 함, 예: cache/texts.sqlite)
+TEXT_CACHE_PATH = os.getenv("TEXT_CACHE_PATH", "")
+
+RECOMMENDATION_TEXTS = Counter(
+    "recommendation_text_total",
+    "Recommendation texts by where they came from.",
+    ["source"]
+)
+
+# key → {"created": 생성 시각(epoch), "variants": [멘트, ...]}
+_memory_cache = LRUCache("recommendation_text", TEXT_CACHE_SIZE, TEXT_CACHE_TTL_SECONDS)
+_disk_cache = LazySqliteStore("recommendation_text_disk", TEXT_CACHE_PATH)
+_pool_lock = threading.Lock()
+
+
+def text_fingerprint(user_prompt: Union[str, Dict], sound_results: List[Dict], user_preferences: Dict) -> str:
+    """멘트 프롬프트에 들어가는 값들로 캐시 키를 만듭니다."""
+    summary = user_prompt.get("summary", "") if isinstance(user_prompt, dict) else (user_prompt or "")
+    canonical = json.dumps({
+        "summary": " ".join(summary.split()),
+        "sounds": [sound.get("filename") for sound in sound_results],
+        "preferences": user_preferences,
+        "prompt_version": PROMPT_VERSION,
+        # local 백엔드의 응답이 Bedrock 멘트 캐시(sqlite)에 섞이지 않도록
+        "model": get_provider().fingerprint,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def _load_pool(key: str) -> Optional[Dict]:
+    # 변형을 추가할 때마다 LRU의 TTL이 갱신되므로, 만료는 처음 만든 시각 기준으로 따로 확인
+    pool = _memory_cache.get(key)
+    if pool is not None:
+        return pool if not _expired(pool) else None
+
+    if _disk_cache.enabled:
+        blob = await asyncio.to_thread(_disk_cache.get, key)
+        if blob is not None:
+            pool = json.loads(blob)
+            if not _expired(pool):
+                _memory_cache.put(key, pool)
+                return pool
+    return None
+
+
+def _expired(pool: Dict) -> bool:
+    return pool["created"] + TEXT_CACHE_TTL_SECONDS <= time.time()
+
+
+async def pick_cached_text(key: str) -> Optional[str]:
+    """변형이 다 모인 키면 그중 하나를 반환합니다. 아직 모으는 중이면 None (LLM으로 새로 생성)."""
+    if TEXT_CACHE_VARIANTS <= 0:
+        return None
+    pool = await _load_pool(key)
+    if pool is None or len(pool["variants"]) < TEXT_CACHE_VARIANTS:
+        return None
+    return random.choice(pool["variants"])
+
+
+async def remember_text(key: str, text: str):
+    """LLM으로 새로 만든 멘트를 키의 변형 목록에 추가합니다."""
+    if TEXT_CACHE_VARIANTS <= 0 or not text:
+        return
+    loaded = await _load_pool(key)
+    with _pool_lock:
+        # 디스크를 읽는 동안 같은 키에 다른 멘트가 추가되었을 수 있으므로 메모리 값을 다시 확인
+        current = _memory_cache.peek(key)
+        pool = (current if current is not None and not _expired(current) else loaded) or {"created": time.time(), "variants": []}
+        if text in pool["variants"] or len(pool["variants"]) >= TEXT_CACHE_VARIANTS:
+            return
+        pool = {"created": pool["created"], "variants": pool["variants"] + [text]}
+        _memory_cache.put(key, pool)
+    # 디스크 쓰기는 잠금 밖에서 (동시에 쓰면 나중 쓰기가 남고, 빠진 변형은 다시 모임)
+    if _disk_cache.enabled:
+        await asyncio.to_thread(_disk_cache.put, key, json.dumps(pool, ensure_ascii=False).encode("utf-8"))
+
+
+async def cached_recommendation_text(
+    user_prompt: Union[str, Dict],
+    sound_results: List[Dict],
+    user_preferences: Dict
+) -> Tuple[str, str]:
+    """
+    generate_recommendation_text 앞단의 캐시. 변형이 다 모인 키는 LLM을 호출하지 않습니다.
+    (멘트, 출처)를 반환합니다. 출처: "cache" | "llm" | "llm_hedge"(헤지 호출이 먼저 응답)
+    요청 예산 안에 LLM이 응답하지 않으면 DeadlineExceeded.
+    """
+    key = text_fingerprint(user_prompt, sound_results, user_preferences)
+    cached = await pick_cached_text(key)
+    if cached is not None:
+        RECOMMENDATION_TEXTS.inc(source="cache")
+        return cached, "cache"
+
+    with stage_timer("llm"):
+        text, hedge_won = await within_deadline(
+            "llm",
+            hedged(lambda: generate_recommendation_text(user_prompt, sound_results, user_preferences)),
+            min_remaining_ms=LLM_MIN_BUDGET_MS
+        )
+    source = "llm_hedge" if hedge_won else "llm"
+    RECOMMENDATION_TEXTS.inc(source=source)
+    await remember_text(key, text)
+    return text, source
@@ -0,0 +1,89 @@
+# text_jobs.py
+# 추천 멘트를 백그라운드에서 생성하는 작업 저장소 (프로세스 내 메모리, TTL 만료)
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Coroutine, Dict, Optional
+
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 완료된 작업 결과를 보관하는 시간 (초)
+TEXT_JOB_TTL_SECONDS = float(os.getenv("TEXT_JOB_TTL_SECONDS", "600"))
+
+
+class TextJobStore:
+    """
+    추천 멘트 생성 작업을 asyncio 태스크로 실행하고, 결과를 job_id로 조회할 수 있게 보관합니다.
+    만료된 작업은 submit / get 시점에 정리합니다. (별도 정리 루프 없음)
+    """
+
+    def __init__(self, ttl_seconds: float = TEXT_JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, coroutine: Coroutine) -> str:
+        """멘트 생성 코루틴((멘트, 출처)를 반환)을 백그라운드로 실행하고 job_id를 반환합니다."""
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "status": "pending",
+            "text": None,
+            "text_source": None,
+            "error": None,
+            "created_at": time.monotonic(),
+            "finished_at": None,
+        }
+        # 태스크 참조를 저장해두지 않으면 GC로 중간에 사라질 수 있음
+        job["task"] = asyncio.create_task(coroutine)
+        job["task"].add_done_callback(lambda task: self._on_done(job, task))
+        self._jobs[job_id] = job
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """작업 상태를 반환합니다. 없거나 만료된 작업이면 None"""
+        self._purge_expired()
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "recommendation_text": job["text"],
+            "text_source": job["text_source"],
+            "error": job["error"],
+        }
+
+    def _on_done(self, job: Dict[str, Any], task: asyncio.Task):
+        job["finished_at"] = time.monotonic()
+        if task.cancelled():
+            job["status"] = "failed"
+            job["error"] = "cancelled"
+        elif task.exception() is not None:
+            logger.error("Text job failed", extra={"error": str(task.exception())})
+            job["status"] = "failed"
+            job["error"] = str(task.exception())
+        else:
+            job["status"] = "done"
+            job["text"], job["text_source"] = task.result()
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if now - (job["finished_at"] or job["created_at"]) > self.ttl_seconds
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            # TTL 동안 끝나지 않은 작업은 더 기다리지 않음
+            if not job["task"].done():
+                job["task"].cancel()
+
+
+# 전역 인스턴스 생성
+text_job_store = TextJobStore()
@@ -0,0 +1,136 @@
+# translation_service.py
+# 설문 자유 입력(noisePreferenceOther 등)의 한→영 번역 앞단
+# 1. 한글이 없으면 그대로 사용
+# 2. 자주 나오는 답변은 로컬 사전으로 바로 번역
+# 3. LLM 번역 결과는 TTL LRU (+ 선택적으로 sqlite) 에 캐시
+#    sqlite 조회 / 저장은 스레드에서 실행하고, 오류는 미스 / 저장 생략으로 처리 (캐시 때문에 요청이 실패하지 않도록)
+# 4. 같은 문장을 동시에 번역 중이면 LLM 호출 하나를 같이 기다림
+
+import asyncio
+import os
+import re
+from typing import Dict, Optional
+
+from services.cache import LazySqliteStore, LRUCache
+from services.llm_service import translate_korean_to_english
+from services.metrics import Counter
+
+# 메모리 캐시 크기 / 유지 시간
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+TRANSLATION_CACHE_TTL_SECONDS = float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", "86400"))
+
+# 번역 캐시 sqlite 파일 경로 (비어 있으면 사용 안 함, 예: cache/translations.sqlite)
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "")
+
+# 자주 나오는 답변 (공백 제거한 형태로 조회)
+SEED_TRANSLATIONS = {
+    "팝송": "pop songs",
+    "가요": "K-pop songs",
+    "케이팝": "K-pop songs",
+    "발라드": "ballads",
+    "클래식": "classical music",
+    "재즈": "jazz",
+    "피아노": "piano music",
+    "로파이": "lo-fi music",
+    "명상음악": "meditation music",
+    "자장가": "lullabies",
+    "빗소리": "rain sounds",
+    "비소리": "rain sounds",
+    "천둥소리": "thunder sounds",
+    "파도소리": "ocean waves",
+    "바다소리": "ocean waves",
+    "시냇물소리": "stream sounds",
+    "계곡물소리": "stream sounds",
+    "물소리": "water sounds",
+    "바람소리": "wind sounds",
+    "새소리": "birdsong",
+    "풀벌레소리": "crickets",
+    "귀뚜라미소리": "crickets",
+    "자연소리": "nature sounds",
+    "모닥불소리": "crackling fire",
+    "장작소리": "crackling fire",
+    "백색소음": "white noise",
+    "핑크노이즈": "pink noise",
+    "선풍기소리": "fan noise",
+    "에어컨소리": "air conditioner hum",
+    "고양이골골송": "cat purring",
+    "라디오": "radio",
+    "팟캐스트": "podcasts",
+    "유튜브": "YouTube videos",
+    "없음": "",
+    "없어요": "",
+}
+
+HANGUL_PATTERN = re.compile(r"[\u1100-\u11ff\u3130-\u318f\uac00-\ud7a3]")
+
+TRANSLATIONS = Counter(
+    "translation_requests_total",
+    "Free-text translations by how they were answered.",
+    ["source"]
+)
+
+_memory_cache = LRUCache("translation", TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_TTL_SECONDS)
+_disk_cache = LazySqliteStore("translation_disk", TRANSLATION_CACHE_PATH)
+
+# 진행 중인 LLM 번역 (같은 문장 요청은 이 Task를 함께 기다림)
+_in_flight: Dict[str, asyncio.Task] = {}
+
+
+def translate_locally(text: str) -> Optional[str]:
+    """LLM 없이 번역할 수 있으면 결과를, 아니면 None을 반환합니다."""
+    if not HANGUL_PATTERN.search(text):
+        TRANSLATIONS.inc(source="passthrough")
+        return text
+    seeded = SEED_TRANSLATIONS.get(re.sub(r"\s+", "", text))
+    if seeded is not None:
+        TRANSLATIONS.inc(source="dictionary")
+        return seeded
+    return None
+
+
+async def translate_to_english(text: str) -> str:
+    """
+    한국어 자유 입력을 영어로 번역합니다.
+    로컬 처리 → 캐시 → (동시 요청 합치기) → Bedrock 순서로 시도합니다.
+    """
+    text = " ".join((text or "").split())
+    if not text:
+        return ""
+
+    local = translate_locally(text)
+    if local is not None:
+        return local
+
+    cached = _memory_cache.get(text)
+    if cached is not None:
+        TRANSLATIONS.inc(source="cache")
+        return cached
+
+    if _disk_cache.enabled:
+        blob = await asyncio.to_thread(_disk_cache.get, text)
+        if blob is not None:
+            translated = blob.decode("utf-8")
+            _memory_cache.put(text, translated)
+            TRANSLATIONS.inc(source="cache")
+            return translated
+
+    task = _in_flight.get(text)
+    if task is not None:
+        TRANSLATIONS.inc(source="coalesced")
+    else:
+        TRANSLATIONS.inc(source="llm")
+        task = asyncio.ensure_future(_translate_and_cache(text))
+        _in_flight[text] = task
+        task.add_done_callback(lambda _: _in_flight.pop(text, None))
+    # 한 요청이 취소되어도 같이 기다리는 다른 요청의 번역은 계속되도록 shield
+    return await asyncio.shield(task)
+
+
+async def _translate_and_cache(text: str) -> str:
+    translated = await translate_korean_to_english(text)
+    # translate_korean_to_english는 실패 시 원문을 그대로 돌려주므로, 그 경우는 캐시하지 않음
+    if translated and translated != text:
+        _memory_cache.put(text, translated)
+        if _disk_cache.enabled:
+            await asyncio.to_thread(_disk_cache.put, text, translated.encode("utf-8"))
+    return translated
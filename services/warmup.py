@@ -0,0 +1,50 @@
+# warmup.py
+# 서버 시작 후 백그라운드에서 무거운 리소스를 미리 로드하고 더미 추론으로 워밍업
+
+import threading
+
+from services.embedding_backends import get_backend
+from services.embedding_service import embed_text
+from services.query_embedding import QUERY_EMBEDDING_MODE, load_phrase_table
+from services.rag_recommender import load_catalog, recommend_by_vector
+from services.llm_providers import get_provider
+from services.readiness import readiness
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 워밍업용 더미 쿼리
+WARMUP_QUERY = "A user who wants to achieve the goal of 'fallAsleepFast' and has a 'medium' stress level."
+
+
+def warm_up():
+    """임베딩 모델, FAISS 인덱스, LLM 자격 증명을 각각 로드한 뒤 더미 임베딩+검색을 한 번 실행합니다."""
+    model_ready = _load("embedding_model", lambda: get_backend().load())
+    index_ready = _load("faiss_index", load_catalog)
+    # Bedrock은 AWS 자격 증명 조회, local 백엔드는 준비할 것이 없음
+    _load("llm_credentials", lambda: get_provider().load())
+    if QUERY_EMBEDDING_MODE == "compositional":
+        _load("phrase_table", load_phrase_table)
+
+    if model_ready and index_ready:
+        _load("warmup_inference", lambda: recommend_by_vector(embed_text(WARMUP_QUERY)))
+
+
+def _load(component: str, loader) -> bool:
+    # 실패 내용은 readiness에 기록되므로 (/ready에서 확인) 여기서는 성공 여부만 반환
+    try:
+        with readiness.track(component):
+            loader()
+        return True
+    except Exception:
+        return False
+
+
+def start_background_warmup() -> threading.Thread:
+    """워밍업을 데몬 스레드로 시작합니다. (liveness 체크와 요청 처리를 막지 않음)"""
+    if QUERY_EMBEDDING_MODE == "compositional":
+        readiness.register("phrase_table")
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    logger.info("Background warm-up started")
+    return thread
@@ -8,69 +8,91 @@
 # - 각성(WASO): 15% 미만 정상 (10%↓ 우수, 15%↑ 경고)
 # - 수면 점수: 80점↑ 좋음, 65-80점 애매, 65점↓ 나쁨
 
-from typing import Dict, List, Optional
-from services.llm_service import translate_korean_to_english
+import logging
+from typing import Dict, List, Optional, Tuple
+from services.translation_service import translate_to_english
+from services.deadline import DeadlineExceeded, within_deadline
+from services.metrics import stage_timer
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 설문 값이 하나도 없을 때의 쿼리 문장
+EMPTY_SURVEY_QUERY = "A user seeking better sleep."
+
+# RAG 쿼리 문장 템플릿 (필드, 문장 템플릿) - 이 순서대로 이어 붙임
+# noisePreferenceOther는 번역된 값을 사용
+SURVEY_PHRASES = [
+    ("sleepGoal", "wants to achieve the goal of '{}'"),
+    ("sleepIssues", "is experiencing sleep issues like '{}'"),
+    ("stressLevel", "and has a '{}' stress level."),
+    ("calmingSoundType", "They find '{}' sounds most calming."),
+    ("noisePreferenceOther", "and also likes '{}'."),
+    ("usualBedtime", "They usually go to bed around '{}'."),
+    ("usualWakeupTime", "They usually wake up around '{}'."),
+    ("dayActivityType", "They have '{}' daily activities."),
+    ("caffeineIntakeLevel", "They consume '{}' caffeine."),
+    ("exerciseFrequency", "They exercise '{}'."),
+    ("screenTimeBeforeSleep", "They use screens '{}' before sleep."),
+]
 
 # 설문 응답 데이터를 자연어 영어 문장으로 바꿔서 LLM에게 넘겨줄 프롬프트 생성
-def build_prompt(user_survey: Dict[str, any]) -> str:
-    phrases = []
+async def build_prompt(user_survey: Dict[str, any]) -> str:
+    prompt, _ = await prepare_survey_query(user_survey)
+    return prompt
+
 
+# RAG 쿼리 문장과 함께, 문장을 만든 (필드, 템플릿, 값 목록)도 반환 (조합 임베딩 모드에서 사용)
+async def prepare_survey_query(user_survey: Dict[str, any]) -> Tuple[str, List[Tuple[str, str, List[str]]]]:
+    with stage_timer("translate"):
+        translated_noise_other = await translate_noise_other(user_survey)
+
+    field_values = survey_field_values(user_survey, translated_noise_other)
+    return join_phrases(field_values), field_values
+
+
+# 설문의 기타 항목(자유 입력)을 영어로 번역 (쿼리 문장 조립과 분리해 다른 단계와 겹쳐 실행할 수 있음)
+async def translate_noise_other(user_survey: Dict[str, any]) -> str:
     # 1. 한글이 포함될 수 있는 기타 항목 추출 (값이 없을 경우 빈 문자열로 대체함)
     noise_other = user_survey.get("noisePreferenceOther") or ""
 
-    # 2. 번역 수행 (한글 -> 영어)
-    translated_noise_other = translate_korean_to_english(noise_other)
+    # 2. 번역 수행 (한글 -> 영어, 로컬 사전 / 캐시에 없을 때만 Bedrock 비동기 호출)
+    #    요청 예산 안에 끝나지 않으면 기타 항목 없이 쿼리를 만듦 (사운드 순위는 예산 안에 응답)
+    try:
+        return await within_deadline("translate", translate_to_english(noise_other))
+    except DeadlineExceeded:
+        logger.warning("Translation skipped, request deadline exceeded")
+        return ""
 
-    # 3. 주요 필드를 더 구체적으로 문장으로 조립
-    if goal := user_survey.get("sleepGoal"):
-        if isinstance(goal, list):
-            goal_text = ", ".join(goal)
-        else:
-            goal_text = goal
-        phrases.append(f"wants to achieve the goal of '{goal_text}'")
-    
-    if issues := user_survey.get("sleepIssues"):
-        if isinstance(issues, list):
-            issues_text = ", ".join(issues)
-        else:
-            issues_text = issues
-        phrases.append(f"is experiencing sleep issues like '{issues_text}'")
-    
-    if stress := user_survey.get("stressLevel"):
-        phrases.append(f"and has a '{stress}' stress level.")
-    
-    if calming_type := user_survey.get("calmingSoundType"):
-        phrases.append(f"They find '{calming_type}' sounds most calming.")
-    
-    if translated_noise_other:
-        phrases.append(f"and also likes '{translated_noise_other}'.")
-    
-    # 추가적인 구체적인 정보들
-    if bedtime := user_survey.get("usualBedtime"):
-        phrases.append(f"They usually go to bed around '{bedtime}'.")
-    
-    if wakeup := user_survey.get("usualWakeupTime"):
-        phrases.append(f"They usually wake up around '{wakeup}'.")
-    
-    if activity := user_survey.get("dayActivityType"):
-        phrases.append(f"They have '{activity}' daily activities.")
-    
-    if caffeine := user_survey.get("caffeineIntakeLevel"):
-        phrases.append(f"They consume '{caffeine}' caffeine.")
-    
-    if exercise := user_survey.get("exerciseFrequency"):
-        phrases.append(f"They exercise '{exercise}'.")
-    
-    if screen_time := user_survey.get("screenTimeBeforeSleep"):
-        phrases.append(f"They use screens '{screen_time}' before sleep.")
+
+# 번역이 끝난 값을 받아 RAG 쿼리 문장을 조립 (I/O 없는 순수 함수)
+def assemble_prompt(user_survey: Dict[str, any], translated_noise_other: str = "") -> str:
+    return join_phrases(survey_field_values(user_survey, translated_noise_other))
+
+
+# 템플릿 순서대로 값이 있는 필드만 (필드, 템플릿, 값 목록)으로 추림 (리스트가 아닌 값은 한 개짜리 목록)
+def survey_field_values(user_survey: Dict[str, any], translated_noise_other: str = "") -> List[Tuple[str, str, List[str]]]:
+    field_values = []
+    for field, template in SURVEY_PHRASES:
+        value = translated_noise_other if field == "noisePreferenceOther" else user_survey.get(field)
+        if not value:
+            continue
+        values = [str(v) for v in value] if isinstance(value, list) else [str(value)]
+        field_values.append((field, template, values))
+    return field_values
+
+
+def join_phrases(field_values: List[Tuple[str, str, List[str]]]) -> str:
+    # 3. 주요 필드를 더 구체적으로 문장으로 조립 (리스트 값은 쉼표로 연결)
+    phrases = [template.format(", ".join(values)) for _, template, values in field_values]
 
     # 4. 아무 정보도 없을 경우 fallback 문장
     if not phrases:
-        return "A user seeking better sleep."
+        return EMPTY_SURVEY_QUERY
 
     # 5. 모든 문장을 하나의 문장으로 연결
     final_prompt = "A user who " + " ".join(phrases)
-    print(f"DEBUG: Generated RAG Query: {final_prompt}")
+    logger.debug("Generated RAG query: %s", final_prompt)
     return final_prompt
 
 # 상태 평가해서 프롬프트에 추가해주는 함수
@@ -85,11 +107,21 @@ def evaluate_status(metric: float, thresholds: Dict[str, float]) -> str:
 
 
 # 수면 데이터와 설문 데이터를 모두 사용하는 통합 프롬프트 생성
-def build_combined_prompt(sleep_data: Dict, survey_data: Dict) -> Dict:
-    print("[build_combined_prompt] sleep_data:", sleep_data)
-    print("[build_combined_prompt] survey_data:", survey_data)
+async def build_combined_prompt(sleep_data: Dict, survey_data: Dict) -> Dict:
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Building combined prompt", extra={"sleep_data": sleep_data})
     
     # 1. 수면 데이터 기반 요약 생성
+    sleep_summary = summarize_sleep_data(sleep_data)
+    
+    # 2. 설문 데이터 기반 요약 생성
+    survey_summary = await build_prompt(survey_data)
+    
+    return combine_prompts(sleep_summary, survey_summary)
+
+
+# 수면 데이터 등급 평가 및 변화량 요약 (I/O 없는 순수 함수)
+def summarize_sleep_data(sleep_data: Dict) -> Dict:
     previous = sleep_data.get("previous")  # None일 수 있음
     current = sleep_data["current"]
     
@@ -163,13 +195,15 @@ def build_combined_prompt(sleep_data: Dict, survey_data: Dict) -> Dict:
             }
         }
     
-    # 2. 설문 데이터 기반 요약 생성
-    survey_summary = build_prompt(survey_data)
-    
+    return sleep_summary
+
+
+# 수면 요약과 설문 요약을 하나의 통합 프롬프트로 합침
+def combine_prompts(sleep_summary: Dict, survey_summary: str) -> Dict:
     # 3. 통합 요약 생성
     combined_summary = f"{sleep_summary['summary']} {survey_summary}"
     
-    print("[build_combined_prompt] combined_summary:", combined_summary)
+    logger.debug("Combined summary: %s", combined_summary)
     
     return {
         "summary": combined_summary,
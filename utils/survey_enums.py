@@ -0,0 +1,52 @@
+# survey_enums.py
+# RAG 쿼리 문장에 들어가는 설문 항목의 선택지 목록
+# - 조합 임베딩용 문구 테이블(scripts/build_phrase_table.py)과 벤치마크에서 사용
+# - 메인 서버 설문 선택지 기준 (API 예시에 나온 값 + 같은 규칙의 나머지 구간)
+# - 여기 없는 값이 들어와도 해당 요청만 전체 문장 임베딩(exact)으로 처리되므로 안전함.
+#   실제 요청 로그로 누락된 값을 보충하려면 build_phrase_table.py --surveys 옵션 사용
+
+from services.translation_service import SEED_TRANSLATIONS
+
+SURVEY_ENUMS = {
+    "sleepGoal": [
+        "fallAsleepFast", "improveSleepQuality", "deepSleep", "wakeUpRefreshed", "reduceAwakenings", "relax",
+    ],
+    "sleepIssues": [
+        "fallAsleepHard", "wakeOften", "wakeEarly", "nightmares", "snoring", "lightSleep", "none",
+    ],
+    "stressLevel": ["low", "medium", "high"],
+    "calmingSoundType": [
+        "rain", "waves", "nature", "wind", "fire", "whiteNoise", "music", "asmr", "other",
+    ],
+    "usualBedtime": ["before10pm", "10to12pm", "12to2am", "after2am"],
+    "usualWakeupTime": ["before5am", "5to7am", "7to9am", "after9am"],
+    "dayActivityType": ["indoor", "outdoor", "mixed"],
+    "caffeineIntakeLevel": ["none", "1to2cups", "3to4cups", "over5cups"],
+    "exerciseFrequency": ["none", "sometimes", "1perWeek", "2to3week", "daily"],
+    "screenTimeBeforeSleep": ["none", "under30min", "30minTo1hour", "1hto2h", "over2h"],
+    # 자유 입력을 번역한 값 - 로컬 번역 사전에 있는 값만 미리 계산 가능
+    "noisePreferenceOther": sorted({value for value in SEED_TRANSLATIONS.values() if value}),
+}
+
+# 여러 개를 고를 수 있는 항목
+MULTI_SELECT_FIELDS = {"sleepIssues"}
+
+# API 설문 스키마(app.py SurveyData)에서 RAG 쿼리에 쓰이지 않는 나머지 항목의 선택지
+# - 부하 테스트 요청 생성용 (benchmarks/traffic.py), API 예시에 나온 값 기준
+SURVEY_FORM_ENUMS = {
+    "sleepLightUsage": ["none", "moodLight", "smallLight", "fullLight"],
+    "lightColorTemperature": ["warmYellow", "neutralWhite", "coolWhite"],
+    "noisePreference": ["silence", "whiteNoise", "nature", "music", "other"],
+    "morningSunlightExposure": ["under1", "between1to3", "over3"],
+    "napFrequency": ["none", "1to2perWeek", "3to4perWeek", "daily"],
+    "napDuration": ["under15", "15to30", "30to60", "over60"],
+    "mostDrowsyTime": ["morning", "afternoon", "evening", "night"],
+    "averageSleepDuration": ["under4h", "4to6h", "6to8h", "over8h"],
+    "emotionalSleepInterference": ["stress", "anxiety", "depression", "loneliness", "none"],
+    "sleepDevicesUsed": ["watch", "app", "ring", "none"],
+    "timeToFallAsleep": ["under10min", "10to30min", "over30min"],
+    "exerciseWhen": ["none", "morning", "afternoon", "evening"],
+}
+
+# SURVEY_FORM_ENUMS 중 여러 개를 고를 수 있는 항목
+FORM_MULTI_SELECT_FIELDS = {"emotionalSleepInterference", "sleepDevicesUsed"}